@@ -0,0 +1,140 @@
+"""Benchmark of the API-only allow-list against the EXCLUDED_RESOURCES_TYPES deny-list.
+
+A local test site loads stylesheets, images, fonts, a video, a web manifest, a beacon,
+a slow third-party script and a first-party script calling its hidden JSON API. For each
+blocking mode, it measures the bytes served to the browser and the time from the start
+of the navigation to the API response (needs a Playwright Chromium).
+
+Run from the repository root: python benchmarks/bench_allow_list.py
+"""
+
+# Built-in imports
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "playwright_plus"))
+
+NB_IMAGES = 10
+TRACKER_DELAY = 0.3
+ASSET_SIZES = {
+    "/style.css": 50_000,
+    "/font.woff2": 100_000,
+    "/intro.mp4": 2_000_000,
+    "/manifest.json": 2_000,
+    **{f"/img{i}.png": 100_000 for i in range(NB_IMAGES)},
+}
+PAGE = """
+<html>
+<head>
+<link rel="stylesheet" href="/style.css">
+<link rel="manifest" href="/manifest.json">
+<script src="http://cdn.tracker.test:{port}/tag.js"></script>
+</head>
+<body>
+{images}
+<video src="/intro.mp4" preload="auto"></video>
+<script src="/app.js"></script>
+</body>
+</html>
+"""
+APP_SCRIPT = """
+navigator.sendBeacon("/collect", "visit");
+fetch("/api/items").then((response) => response.json());
+"""
+BLOCKING_MODES = [
+    ("deny-list (block_resources=True)", {"block_resources": True}),
+    (
+        "allow-list (allow_resources=True)",
+        {"block_resources": False, "allow_resources": True},
+    ),
+    (
+        "allow-list + allow_hosts",
+        {
+            "block_resources": False,
+            "allow_resources": True,
+            "allow_hosts": ["site.test"],
+        },
+    ),
+]
+
+
+class ApiSiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        port = self.server.server_port
+        if self.headers.get("Host", "").startswith("cdn.tracker.test"):
+            time.sleep(TRACKER_DELAY)
+            body, content_type = b"window.tracked = true;", "application/javascript"
+        elif self.path == "/app.js":
+            body, content_type = APP_SCRIPT.encode(), "application/javascript"
+        elif self.path == "/api/items":
+            body, content_type = b'{"items": [1, 2, 3]}', "application/json"
+        elif self.path in ASSET_SIZES:
+            body, content_type = b"0" * ASSET_SIZES[self.path], "application/octet-stream"
+        else:
+            images = "".join(f'<img src="/img{i}.png">' for i in range(NB_IMAGES))
+            body = PAGE.format(port=port, images=images).encode()
+            content_type = "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+            self.server.bytes_served += len(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_POST(self):
+        # beacons
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_blocking_modes(nb_loads: int = 5):
+    from playwright.sync_api import sync_playwright
+    from browser_surf import _new_context, _new_page
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ApiSiteHandler)
+    server.bytes_served = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    page_url = f"http://www.site.test:{server.server_port}/"
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(
+            args=["--host-resolver-rules=MAP *.test 127.0.0.1"]
+        )
+        for label, options in BLOCKING_MODES:
+            durations, nb_bytes = [], []
+            for _ in range(nb_loads):
+                context = _new_context(browser)
+                page = _new_page(context, **options)
+                server.bytes_served = 0
+                start = time.perf_counter()
+                with page.expect_response(lambda r: "/api/items" in r.url):
+                    page.goto(page_url, wait_until="commit")
+                durations.append(time.perf_counter() - start)
+                # let the remaining resources load before counting the bytes
+                page.wait_for_load_state("load")
+                nb_bytes.append(server.bytes_served)
+                context.close()
+            print(
+                f"{label:35} API response after {statistics.median(durations) * 1000:7.1f} ms,"
+                f" {statistics.median(nb_bytes) / 1024:8.1f} KiB served"
+            )
+        browser.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    try:
+        bench_blocking_modes()
+    except Exception as err:
+        print(f"benchmark skipped: {err.__class__.__name__}: {str(err).splitlines()[0]}")
@@ -0,0 +1,129 @@
+"""Benchmark of the domain and URL pattern blocklists.
+
+1. Per-request matching cost of DomainMatcher and UrlPatternMatcher loaded with large
+   lists, compared to a linear scan of the lists.
+2. Page load time of a local test site calling slow third-party trackers, with and
+   without `block_domains` (needs a Playwright Chromium).
+
+Run from the repository root: python benchmarks/bench_blocklist.py
+"""
+
+# Built-in imports
+import os
+import random
+import string
+import sys
+import threading
+import time
+import timeit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "playwright_plus"))
+
+# Local functions and relative imports
+from utils.blocklist import DomainMatcher, UrlPatternMatcher
+
+NB_DOMAINS = 50000
+NB_PATTERNS = 10000
+NB_TRACKERS = 20
+TRACKER_DELAY = 0.3
+
+
+def random_label(length: int = 8) -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=length))
+
+
+def bench_matching():
+    random.seed(0)
+    domains = [f"{random_label()}.{random_label(3)}" for _ in range(NB_DOMAINS)]
+    patterns = [f"/{random_label(6)}/{random_label(4)}.js" for _ in range(NB_PATTERNS)]
+    urls = [
+        f"https://cdn.{random_label()}.com/static/{random_label(12)}.js?v=3"
+        for _ in range(500)
+    ] + [f"https://stats.{domain}/collect?id=1" for domain in domains[:500]]
+
+    hosts = [urlsplit(url).hostname for url in urls]
+
+    start = time.perf_counter()
+    domain_matcher = DomainMatcher(domains)
+    url_matcher = UrlPatternMatcher(patterns)
+    print(
+        f"compiled {NB_DOMAINS} domains and {NB_PATTERNS} patterns in {time.perf_counter() - start:.2f} s"
+    )
+
+    def per_request_us(func, nb_urls, number=1):
+        return timeit.timeit(func, number=number) / (nb_urls * number) * 1e6
+
+    print(
+        f"DomainMatcher:       {per_request_us(lambda: [domain_matcher.matches_url(u) for u in urls], len(urls), 20):8.2f} us/request"
+    )
+    print(
+        f"UrlPatternMatcher:   {per_request_us(lambda: [url_matcher.matches(u) for u in urls], len(urls), 20):8.2f} us/request"
+    )
+    print(
+        f"linear domain scan:  {per_request_us(lambda: [any(h.endswith(d) for d in domains) for h in hosts[:50]], 50):8.2f} us/request"
+    )
+    print(
+        f"linear pattern scan: {per_request_us(lambda: [any(p in u for p in patterns) for u in urls[:50]], 50):8.2f} us/request"
+    )
+
+
+class TrackerSiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        host = self.headers.get("Host", "")
+        if host.endswith("tracker.test"):
+            # slow third-party script
+            time.sleep(TRACKER_DELAY)
+            body, content_type = "window.tracked = true;", "application/javascript"
+        else:
+            scripts = "".join(
+                f'<script src="http://t{i}.tracker.test:{self.server.server_port}/tag.js"></script>'
+                for i in range(NB_TRACKERS)
+            )
+            body, content_type = f"<html><body>{scripts}</body></html>", "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_page_load(nb_loads: int = 5):
+    from playwright.sync_api import sync_playwright
+    from browser_surf import _new_context, _new_page
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TrackerSiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    page_url = f"http://site.test:{server.server_port}/"
+    block_domains = DomainMatcher(["tracker.test"])
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(
+            args=["--host-resolver-rules=MAP *.test 127.0.0.1"]
+        )
+        for label, options in [
+            ("without block_domains", {}),
+            ("with block_domains", {"block_domains": block_domains}),
+        ]:
+            durations = []
+            for _ in range(nb_loads):
+                context = _new_context(browser)
+                page = _new_page(context, **options)
+                start = time.perf_counter()
+                page.goto(page_url, wait_until="load")
+                durations.append(time.perf_counter() - start)
+                context.close()
+            print(f"page load {label}: {sorted(durations)[nb_loads // 2] * 1000:8.1f} ms")
+        browser.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    bench_matching()
+    try:
+        bench_page_load()
+    except Exception as err:
+        print(f"page load benchmark skipped: {err.__class__.__name__}: {str(err).splitlines()[0]}")
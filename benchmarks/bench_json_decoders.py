@@ -0,0 +1,97 @@
+"""Benchmark of the JSON decoders of captured bodies on representative hidden API payloads.
+
+For a small search response, a catalog page and a multi-megabyte full catalog, it
+measures the decoding time of each installed decoder of utils.json_decoder. It then
+measures the longest stall of an asyncio event loop while the large payload is decoded
+inline and in a thread, as the async intercept functions can with OFF_THREAD_DECODE_SIZE.
+
+Run from the repository root: python benchmarks/bench_json_decoders.py
+"""
+
+# Built-in imports
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "playwright_plus"))
+
+from utils.json_decoder import JSON_DECODERS
+
+NB_PRODUCTS = {"search": 10, "catalog page": 500, "full catalog": 20_000}
+
+
+def build_payload(nb_products: int) -> bytes:
+    rng = random.Random(nb_products)
+    products = [
+        {
+            "id": i,
+            "sku": f"SKU-{rng.randrange(10**8):08d}",
+            "title": f"Product {i} " + "lorem ipsum " * rng.randint(1, 5),
+            "price": {"amount": round(rng.uniform(1, 500), 2), "currency": "EUR"},
+            "in_stock": rng.random() > 0.2,
+            "rating": rng.randint(0, 50) / 10,
+            "tags": [f"tag{rng.randrange(100)}" for _ in range(rng.randint(0, 6))],
+            "images": [
+                f"https://cdn.example.com/img/{i}/{j}.jpg" for j in range(3)
+            ],
+            "seller": {"id": rng.randrange(1000), "name": "Seller é ü ß"},
+        }
+        for i in range(nb_products)
+    ]
+    return json.dumps({"total": nb_products, "products": products}).encode()
+
+
+def bench_decoders():
+    for label, nb_products in NB_PRODUCTS.items():
+        body = build_payload(nb_products)
+        number = max(1, 2_000_000 // len(body))
+        print(f"{label} ({len(body) / 1024:.0f} KiB)")
+        for name, decoder in JSON_DECODERS.items():
+            durations = timeit.repeat(lambda: decoder(body), number=number, repeat=5)
+            print(f"  {name:8} {min(durations) / number * 1000:8.3f} ms")
+
+
+async def max_loop_stall(decode) -> float:
+    """Return the longest interval in seconds between two ticks of the loop during `decode`."""
+    stalls = []
+
+    async def ticker():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    await decode()
+    await asyncio.sleep(0.01)
+    task.cancel()
+    return max(stalls)
+
+
+def bench_off_thread_decoding():
+    body = build_payload(NB_PRODUCTS["full catalog"])
+    decoder = JSON_DECODERS["json"]
+
+    async def inline():
+        decoder(body)
+
+    async def in_thread():
+        await asyncio.to_thread(decoder, body)
+
+    print(f"event loop stall while decoding {len(body) / 1024**2:.1f} MiB with json")
+    for label, decode in [("inline", inline), ("in a thread", in_thread)]:
+        stalls = [asyncio.run(max_loop_stall(decode)) for _ in range(5)]
+        print(f"  {label:12} {statistics.median(stalls) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    bench_decoders()
+    bench_off_thread_decoding()
@@ -0,0 +1,112 @@
+"""Benchmark of the `wait_until` navigation strategies of the intercept functions.
+
+A local test site calls its hidden JSON API from an inline script, while its slow images
+delay the load event and a long-polling request delays the network idle state. For each
+strategy, it measures the time `intercept_json_playwright` takes to return the API data,
+and compares it with a navigation waiting for the load before the capture, as the intercept
+functions did before the capture ran during the navigation (needs a Playwright Chromium).
+
+Run from the repository root: python benchmarks/bench_wait_until.py
+"""
+
+# Built-in imports
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "playwright_plus"))
+
+NB_IMAGES = 5
+IMAGE_DELAY = 1.0
+POLL_DELAY = 2.0
+PAGE = """
+<html>
+<head>
+<script>fetch("/api/items").then((response) => response.json());</script>
+</head>
+<body>
+{images}
+<script>setTimeout(() => fetch("/poll"), 100);</script>
+</body>
+</html>
+"""
+
+
+class SlowAssetsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/api/items":
+            body, content_type = b'{"items": [1, 2, 3]}', "application/json"
+        elif self.path.startswith("/img"):
+            time.sleep(IMAGE_DELAY)
+            body, content_type = b"0" * 1000, "image/png"
+        elif self.path == "/poll":
+            time.sleep(POLL_DELAY)
+            body, content_type = b"{}", "application/json"
+        else:
+            images = "".join(f'<img src="/img{i}.png">' for i in range(NB_IMAGES))
+            body, content_type = PAGE.format(images=images).encode(), "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_wait_until(nb_loads: int = 3):
+    from browser_surf import BrowserPool
+    from web_intercept import WAIT_UNTIL_STATES, intercept_json_playwright
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowAssetsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    page_url = f"http://127.0.0.1:{server.server_port}/"
+
+    with BrowserPool() as pool:
+        # launch the browser before measuring
+        with pool.page():
+            pass
+
+        durations = []
+        for _ in range(nb_loads):
+            with pool.page(block_resources=False) as page:
+                start = time.perf_counter()
+                with page.expect_response(lambda r: "/api/items" in r.url):
+                    page.goto(page_url)
+                durations.append(time.perf_counter() - start)
+        print(
+            f"{'goto(load), then capture':26} {statistics.median(durations) * 1000:7.1f} ms"
+        )
+
+        for wait_until in WAIT_UNTIL_STATES:
+            durations = []
+            for _ in range(nb_loads):
+                start = time.perf_counter()
+                result = intercept_json_playwright(
+                    page_url,
+                    "/api/items",
+                    pool=pool,
+                    block_resources=False,
+                    wait_until=wait_until,
+                    coalesce=False,
+                )
+                durations.append(time.perf_counter() - start)
+                assert result == {"items": [1, 2, 3]}, result
+            print(
+                f"{'wait_until=' + wait_until:26} {statistics.median(durations) * 1000:7.1f} ms"
+            )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    try:
+        bench_wait_until()
+    except Exception as err:
+        print(f"benchmark skipped: {err.__class__.__name__}: {str(err).splitlines()[0]}")
@@ -1,2 +1,3 @@
 from .browser_surf import *
-from .web_intercept import *
\ No newline at end of file
+from .web_intercept import *
+from .worker_farm import *
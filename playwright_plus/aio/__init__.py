@@ -0,0 +1,2 @@
+from .browser_surf import *
+from .web_intercept import *
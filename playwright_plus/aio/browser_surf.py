@@ -0,0 +1,811 @@
+# Built-in imports
+import asyncio
+import functools
+import json
+import logging
+import sys
+from contextlib import asynccontextmanager
+from random import randint
+
+# Public 3rd party packages imports
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import async_playwright, Page, Locator
+
+# Private packages imports
+# Local functions and relative imports
+from browser_surf import (
+    API_RESOURCES_TYPES,
+    CACHED_RESOURCES_TYPES,
+    EXCLUDED_RESOURCES_TYPES,
+    CLEAR_STORAGE_SCRIPT,
+    EARLY_STOP_MODES,
+    REPLAY_HAR_NOT_FOUND,
+    ROUTE_OPTIONS,
+    _as_asset_cache,
+    _as_domain_matcher,
+    _as_url_pattern_matcher,
+    _check_pool_settings,
+    _cookies_to_storage_state,
+    _page_url_site,
+    _resources_url_regex,
+    _url_origin,
+)
+from utils.asset_cache import AssetCache
+from utils.blocklist import DomainMatcher, UrlPatternMatcher
+
+# Constants imports
+# New constants
+
+__all__ = [
+    "BrowserPool",
+    "check_for_loaded_marker",
+    "get_default_pool",
+    "set_default_pool",
+    "wait_after_execution",
+    "with_api_request",
+    "with_page",
+]
+
+
+def create_block_resources(
+    resources_to_block: list,
+    block_domains: DomainMatcher = None,
+    block_url_patterns: UrlPatternMatcher = None,
+    asset_cache: AssetCache = None,
+    allow_resources: list = None,
+    allow_hosts: DomainMatcher = None,
+):
+    """Create an async resource blocking function based on a list of resource types.
+
+    Args:
+        resources_to_block (list): List of resource types to block.
+        block_domains (DomainMatcher, optional): Domains whose requests are blocked (default None).
+        block_url_patterns (UrlPatternMatcher, optional): URL substrings whose requests are blocked (default None).
+        asset_cache (AssetCache, optional): Cache answering the allowed GET requests of static assets (default None).
+        allow_resources (list, optional): The only resource types allowed, the others are blocked (default None, i.e. all).
+        allow_hosts (DomainMatcher, optional): The only domains allowed, with their subdomains, the others are blocked (default None, i.e. all).
+
+    Returns:
+        callable: A route handling coroutine function that blocks specified resource types, domains and URL patterns and allows others to continue.
+    """
+
+    async def _block_resources(route):
+        try:
+            request = route.request
+            if (
+                request.resource_type in resources_to_block
+                or (allow_resources and request.resource_type not in allow_resources)
+                or (allow_hosts and not allow_hosts.matches_url(request.url))
+                or (block_domains and block_domains.matches_url(request.url))
+                or (block_url_patterns and block_url_patterns.matches(request.url))
+            ):
+                await route.abort()
+
+            elif (
+                asset_cache
+                and request.method == "GET"
+                and request.resource_type in CACHED_RESOURCES_TYPES
+            ):
+                try:
+                    await _fulfill_from_asset_cache(route, asset_cache)
+                except PlaywrightError as err:
+                    logging.debug(f"[playwright_plus] asset not fetched: {err}")
+                    await route.abort()
+
+            else:
+                await route.continue_()
+
+        except asyncio.CancelledError:
+            logging.debug("block_resources was correctly canceled")
+
+    return _block_resources
+
+
+async def _fulfill_from_asset_cache(route, asset_cache: AssetCache):
+    """Answer a request from the asset cache, fetching and storing the asset if it is missing or stale.
+
+    Args:
+        route: Route of the request.
+        asset_cache (AssetCache): Cache in which the assets are stored, accessed from a worker thread.
+    """
+    request = route.request
+    cached = await asyncio.to_thread(asset_cache.get, request.url)
+    if cached and cached["fresh"]:
+        await route.fulfill(
+            status=cached["status"], headers=cached["headers"], body=cached["body"]
+        )
+        return
+
+    headers = request.headers
+    if cached:
+        # revalidate the stale entry instead of downloading it again
+        if "etag" in cached["headers"]:
+            headers["if-none-match"] = cached["headers"]["etag"]
+        if "last-modified" in cached["headers"]:
+            headers["if-modified-since"] = cached["headers"]["last-modified"]
+    response = await route.fetch(headers=headers)
+    if cached and response.status == 304:
+        await asyncio.to_thread(asset_cache.refresh, request.url, response.headers)
+        await route.fulfill(
+            status=cached["status"], headers=cached["headers"], body=cached["body"]
+        )
+        return
+
+    body = await response.body()
+    await asyncio.to_thread(
+        asset_cache.put, request.url, response.status, response.headers, body
+    )
+    await route.fulfill(response=response, body=body)
+
+
+### WEB BROWSER AND PAGE OPENING
+
+
+async def _launch_browser(
+    p,
+    proxy_info: dict = None,
+    headless: bool = True,
+    browser_type: str = "chromium",
+):
+    """Launch a browser with the given async Playwright instance.
+
+    Args:
+        p: Async Playwright instance.
+        proxy_info (dict, optional): Proxy information (e.g., {"server": "http://proxyserver:port"}).
+        headless (bool, optional): Whether to run the browser in headless mode (default True).
+        browser_type (str, optional): Type of browser to launch ("chromium" or "firefox", default "chromium").
+
+    Returns:
+        Browser: The launched browser.
+    """
+    logging.debug(
+        f"[playwright_plus] open a browser : headless={headless}, proxy_info={proxy_info.get('server') if isinstance(proxy_info, dict) else None}"
+    )
+    match browser_type:
+        case "chromium":
+            browser = await p.chromium.launch(headless=headless, proxy=proxy_info)
+        case "firefox":
+            browser = await p.firefox.launch(headless=headless, proxy=proxy_info)
+    return browser
+
+
+async def _new_context(
+    browser,
+    accept_downloads: bool = True,
+    cookies: list[dict] = None,
+    proxy_info: dict = None,
+    record_har: str = None,
+):
+    """Create a browser context with the webdriver flag hidden and the given cookies set.
+
+    Args:
+        browser: Browser in which to create the context.
+        accept_downloads (bool, optional): Whether to accept downloads (default True).
+        cookies (list[dict], optional): List of cookies to set in the browser context (default None).
+        proxy_info (dict, optional): Proxy used by this context only (default None, i.e. the browser proxy).
+        record_har (str, optional): Path of a .har or .zip file where the network traffic of the context is saved when it is closed (default None).
+
+    Returns:
+        BrowserContext: The configured browser context.
+    """
+    logging.debug(
+        f"[playwright_plus] open a browser context: accept_downloads={accept_downloads}, with {len(cookies) if cookies else 0} cookies set(s)"
+    )
+    context = await browser.new_context(
+        accept_downloads=accept_downloads, proxy=proxy_info, record_har_path=record_har
+    )
+    await context.add_init_script(
+        """
+            navigator.webdriver = false
+            Object.defineProperty(navigator, 'webdriver', {
+                get: () => false
+            })
+        """
+    )
+    if cookies:
+        await context.add_cookies(cookies)
+
+    return context
+
+
+async def _route_resources(
+    target,
+    block_resources: bool | list = True,
+    allow_resources: bool | list = None,
+    allow_hosts: list | DomainMatcher = None,
+    blocking_engine: str = "route",
+    block_domains: list | str | DomainMatcher = None,
+    block_url_patterns: list | str | UrlPatternMatcher = None,
+    asset_cache: str | AssetCache = None,
+    replay_har: str = None,
+    replay_har_mode: str = "strict",
+    **kwargs,
+):
+    """Block the requested resource types, domains and URLs on a page or on a whole browser context.
+
+    Args:
+        target: Page or browser context on which to install the route.
+        block_resources (bool | list, optional): Whether to block specific resource types or a list of resource types to block (default True).
+        allow_resources (bool | list, optional): The only resource types allowed, or True for API_RESOURCES_TYPES (default None, i.e. all).
+        allow_hosts (list | DomainMatcher, optional): The only domains allowed, with their subdomains (default None, i.e. all). `with_page` replaces True by the site of the `page_url` argument; True is ignored elsewhere.
+        blocking_engine (str, optional): "route" to send every request to the route handler, or "native" to let the browser send only the requests whose URL extension belongs to a blocked resource type (default "route").
+        block_domains (list | str | DomainMatcher, optional): Domains whose requests are blocked, with their subdomains, or the path of a blocklist file (default None).
+        block_url_patterns (list | str | UrlPatternMatcher, optional): URL substrings whose requests are blocked, or the path of a blocklist file (default None).
+        asset_cache (str | AssetCache, optional): Directory of an on-disk cache, or an AssetCache, serving the scripts, stylesheets, fonts and images which are not blocked (default None).
+        replay_har (str, optional): Path of a HAR file recorded with `record_har`, answering the requests it contains instead of the network (default None).
+        replay_har_mode (str, optional): "strict" to abort the requests missing from the HAR, or "fallback" to send them to the network (default "strict").
+        **kwargs: Additional keyword arguments, ignored.
+    """
+    logging.debug(
+        f"[playwright_plus] blocked resources={EXCLUDED_RESOURCES_TYPES if block_resources==True else block_resources}"
+    )
+    block_domains = _as_domain_matcher(block_domains)
+    block_url_patterns = _as_url_pattern_matcher(block_url_patterns)
+    asset_cache = _as_asset_cache(asset_cache)
+    if allow_resources == True:
+        allow_resources = API_RESOURCES_TYPES
+    allow_hosts = _as_domain_matcher(allow_hosts if allow_hosts != True else None)
+    allow_list = allow_resources or allow_hosts
+    if (
+        block_resources
+        or block_domains
+        or block_url_patterns
+        or asset_cache
+        or allow_list
+    ):
+        resources_to_block = (
+            EXCLUDED_RESOURCES_TYPES if block_resources == True else block_resources
+        ) or []
+        url_pattern = "**/*"
+        if blocking_engine == "native" and not (
+            block_domains or block_url_patterns or asset_cache or allow_list
+        ):
+            # the browser matches the regex itself, the other requests never reach python
+            url_pattern = _resources_url_regex(resources_to_block) or url_pattern
+        await target.route(
+            url_pattern,
+            create_block_resources(
+                resources_to_block,
+                block_domains,
+                block_url_patterns,
+                asset_cache,
+                allow_resources,
+                allow_hosts,
+            ),
+        )
+    if replay_har:
+        # the last installed route runs first: the HAR answers before the blocking handler
+        await target.route_from_har(
+            replay_har, not_found=REPLAY_HAR_NOT_FOUND[replay_har_mode]
+        )
+
+
+async def _stop_page(page, early_stop=True):
+    """Stop the loading and the scripts of a page whose target responses are captured.
+
+    Args:
+        page: Web page to stop.
+        early_stop (bool | str, optional): A mode of EARLY_STOP_MODES, True for "blank" which leaves the page reusable, or False to do nothing (default True). The "abort" mode is meant for pages which are closed next.
+    """
+    if not early_stop:
+        return
+    mode = "blank" if early_stop is True else early_stop
+    if mode not in EARLY_STOP_MODES:
+        raise ValueError(f"early_stop must be one of {EARLY_STOP_MODES}, not {mode}")
+    try:
+        if mode == "blank":
+            await page.goto("about:blank")
+            return
+        await page.evaluate("window.stop()")
+        if mode == "abort":
+            await page.route("**/*", lambda route: route.abort())
+    except PlaywrightError as err:
+        # the page may be closed or navigating
+        logging.debug(f"[playwright_plus] could not stop the page: {err}")
+
+
+class BrowserPool:
+    """Async counterpart of `playwright_plus.BrowserPool`.
+
+    Keep launched browsers warm and hand out fresh contexts and pages to the tasks of one
+    event loop. With `keep_contexts` > 0, the contexts are reset and kept for reuse instead
+    of being closed, and closed after serving `recycle_after` pages.
+
+    Args:
+        size (int, optional): Maximum number of browsers kept open (default 1).
+        headless (bool, optional): Whether to run the browsers in headless mode (default True).
+        browser_type (str, optional): Type of browser to launch ("chromium" or "firefox", default "chromium").
+        keep_contexts (int, optional): Maximum number of idle contexts kept for reuse (default 0).
+        recycle_after (int, optional): Number of pages after which a context is closed instead of reused (default 50).
+
+    Note:
+        Playwright's async API is bound to the event loop which started it, so a pool can only be used from one event loop.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        headless: bool = True,
+        browser_type: str = "chromium",
+        keep_contexts: int = 0,
+        recycle_after: int = 50,
+    ):
+        self.size = size
+        self.headless = headless
+        self.browser_type = browser_type
+        self.keep_contexts = keep_contexts
+        self.recycle_after = recycle_after
+        self._playwright = None
+        self._lock = None
+        # number of pages currently open on each browser
+        self._browsers = {}
+        # (settings key, context) pairs ready for reuse, the most recently released last
+        self._idle_contexts = []
+        # number of pages served and cookies to restore for each pooled context
+        self._contexts_info = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _acquire_browser(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # several tasks may ask for a browser while the first one is launching: each one
+        # reserves its browser before releasing the lock, so that the next ones see it busy
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            # forget the browsers which crashed or were closed
+            for browser in [b for b in self._browsers if not b.is_connected()]:
+                del self._browsers[browser]
+
+            idle = [b for b, nb_pages in self._browsers.items() if nb_pages == 0]
+            if idle or len(self._browsers) >= self.size:
+                browser = (idle or sorted(self._browsers, key=self._browsers.get))[0]
+                self._browsers[browser] += 1
+                return browser
+
+            # a per-context proxy needs a global proxy placeholder on Windows
+            proxy_info = (
+                {"server": "http://per-context"} if sys.platform == "win32" else None
+            )
+            browser = await _launch_browser(
+                self._playwright,
+                proxy_info=proxy_info,
+                headless=self.headless,
+                browser_type=self.browser_type,
+            )
+            self._browsers[browser] = 1
+            return browser
+
+    def _release_browser(self, browser):
+        if browser in self._browsers:
+            self._browsers[browser] -= 1
+
+    async def _acquire_context(self, key: str, **settings):
+        # reuse the most recently released context with the same settings
+        for i in range(len(self._idle_contexts) - 1, -1, -1):
+            idle_key, context = self._idle_contexts[i]
+            if idle_key == key:
+                del self._idle_contexts[i]
+                if context.browser.is_connected():
+                    self._browsers[context.browser] = (
+                        self._browsers.get(context.browser, 0) + 1
+                    )
+                    return context
+                self._contexts_info.pop(context, None)
+
+        browser = await self._acquire_browser()
+        try:
+            context = await _new_context(
+                browser,
+                accept_downloads=settings["accept_downloads"],
+                cookies=settings["cookies"],
+                proxy_info=settings["proxy_info"],
+                record_har=settings["record_har"],
+            )
+            await _route_resources(context, **settings)
+        except BaseException:
+            self._release_browser(browser)
+            raise
+        # origins the context sent requests to, which may hold data after its pages left
+        # them, e.g. redirects, frames or pages stopped early on about:blank
+        origins = set()
+        context.on("request", lambda request: origins.add(_url_origin(request.url)))
+        self._contexts_info[context] = {
+            "nb_pages": 0,
+            "cookies": settings["cookies"],
+            "record_har": settings["record_har"],
+            "origins": origins,
+        }
+        return context
+
+    async def _release_context(self, key: str, context):
+        info = self._contexts_info.get(context)
+        if info is not None:
+            info["nb_pages"] += 1
+        # a recording context is closed to save its HAR file
+        reusable = (
+            info is not None
+            and not info["record_har"]
+            and self.keep_contexts > 0
+            and info["nb_pages"] < self.recycle_after
+            and context.browser.is_connected()
+        )
+        if reusable:
+            try:
+                await self._reset_context(context, info["cookies"], info["origins"])
+            except Exception as err:
+                logging.debug(f"[playwright_plus] failed to reset context: {err}")
+                reusable = False
+
+        if reusable:
+            self._idle_contexts.append((key, context))
+            if len(self._idle_contexts) <= self.keep_contexts:
+                return
+            # too many idle contexts: close the least recently used one
+            key, context = self._idle_contexts.pop(0)
+
+        await self._close_context(context)
+
+    async def _reset_context(
+        self, context, cookies: list[dict] = None, origins: set = None
+    ):
+        """Clear the cookies, storage and permissions of a context and close its pages.
+
+        The storage is cleared for the given origins, which are then forgotten, and for
+        the origins of the frames still open.
+        """
+        to_clear = set(origins or ())
+        for page in context.pages:
+            to_clear.update(_url_origin(frame.url) for frame in page.frames)
+        to_clear.discard(None)
+        if to_clear:
+            page = context.pages[0] if context.pages else await context.new_page()
+            if self.browser_type == "chromium":
+                cdp_session = await context.new_cdp_session(page)
+                for origin in sorted(to_clear):
+                    await cdp_session.send(
+                        "Storage.clearDataForOrigin",
+                        {"origin": origin, "storageTypes": "all"},
+                    )
+                await cdp_session.detach()
+            else:
+                # without CDP, clear the storage from an empty document of each origin
+                await page.route(
+                    "**/*",
+                    lambda route: route.fulfill(body="", content_type="text/html"),
+                )
+                for origin in sorted(to_clear):
+                    await page.goto(origin)
+                    await page.evaluate(CLEAR_STORAGE_SCRIPT)
+        for page in context.pages:
+            await page.close()
+        if origins is not None:
+            origins.clear()
+
+        await context.clear_cookies()
+        await context.clear_permissions()
+        if cookies:
+            await context.add_cookies(cookies)
+
+    async def _close_context(self, context):
+        self._contexts_info.pop(context, None)
+        try:
+            await context.close()
+        except Exception as err:
+            logging.debug(f"[playwright_plus] failed to close context: {err}")
+
+    @asynccontextmanager
+    async def context(
+        self,
+        proxy_info: dict = None,
+        accept_downloads: bool = True,
+        cookies: list[dict] = None,
+        record_har: str = None,
+        **kwargs,
+    ):
+        """Take a fresh or reset context of one of the pooled browsers.
+
+        Args:
+            proxy_info (dict, optional): Proxy information (e.g., {"server": "http://proxyserver:port"}).
+            accept_downloads (bool, optional): Whether to accept downloads (default True).
+            cookies (list[dict], optional): List of cookies to set in the browser context (default None).
+            record_har (str, optional): Path of a .har or .zip file where the network traffic is saved. The context is then closed on exit instead of being reused (default None).
+            **kwargs: Resource blocking options (see ROUTE_OPTIONS), other keyword arguments are ignored.
+
+        Yields:
+            BrowserContext: The browser context. It is closed or reset for reuse on exit.
+        """
+        settings = {
+            "proxy_info": proxy_info,
+            "accept_downloads": accept_downloads,
+            "cookies": cookies,
+            "record_har": record_har,
+            **{k: kwargs.get(k, v) for k, v in ROUTE_OPTIONS.items()},
+        }
+        key = json.dumps(settings, sort_keys=True, default=str)
+        # the browser of the context is reserved until the context is released
+        context = await self._acquire_context(key, **settings)
+        try:
+            yield context
+        finally:
+            self._release_browser(context.browser)
+            await self._release_context(key, context)
+
+    @asynccontextmanager
+    async def page(self, **kwargs):
+        """Open a page in a fresh or reset context of one of the pooled browsers.
+
+        Args:
+            **kwargs: Browser context settings, see `BrowserPool.context`.
+
+        Yields:
+            Page: The new web page. Its context is closed or reset for reuse on exit.
+        """
+        async with self.context(**kwargs) as context:
+            yield await context.new_page()
+
+    async def close(self):
+        """Close the pooled browsers and stop the Playwright driver."""
+        for browser in self._browsers:
+            try:
+                await browser.close()
+            except Exception as err:
+                logging.debug(f"[playwright_plus] failed to close browser: {err}")
+        self._browsers = {}
+        self._idle_contexts = []
+        self._contexts_info = {}
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+_default_pool = None
+
+
+def set_default_pool(pool: BrowserPool = None):
+    """Set the async browser pool used by `with_page` when no `pool` is given.
+
+    Args:
+        pool (BrowserPool, optional): The pool to use by default, or None to open a new browser per call (default None).
+    """
+    global _default_pool
+    _default_pool = pool
+
+
+def get_default_pool() -> BrowserPool:
+    """Return the async browser pool used by `with_page` when no `pool` is given, if any."""
+    return _default_pool
+
+
+def with_page(**kwargs):
+    """Decorator for automating web interactions in a coroutine function.
+
+    Args:
+        **kwargs: Keyword arguments for customizing browser behavior.
+
+    Returns:
+        callable: A decorator function that wraps a coroutine function for web automation.
+
+    Note:
+        Async counterpart of `playwright_plus.with_page`, taking the same browser settings. The page is taken from `pool` (an async BrowserPool) if given, else from the default pool set with `set_default_pool`, whose `headless` and `browser_type` settings apply: a call passing other ones raises a ValueError. Pass `pool=False` to open a new browser for the call.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def func_wrapper(*func_args, **func_kwargs):
+            # by default, accept_downloads=True, headless=True, block_resources=True, no proxy, no cookies
+            options = {
+                "accept_downloads": True,
+                "headless": True,
+                "block_resources": True,
+                "proxy_info": None,
+                **kwargs,
+            }
+
+            # overwrite the decorator kwargs if the ones specified by the wrapped function
+            options.update(func_kwargs)
+            pool = options.pop("pool", None)
+            func_kwargs.pop("pool", None)
+            if pool is None:
+                pool = _default_pool
+            if options.get("allow_hosts") == True:
+                options["allow_hosts"] = _page_url_site(func, func_args, func_kwargs)
+
+            if pool:
+                _check_pool_settings(pool, func_kwargs)
+                # take a fresh context and page from the warm browsers of the pool
+                async with pool.page(**options) as page:
+                    func_kwargs["page"] = page
+                    return await func(*func_args, **func_kwargs)
+
+            # open browser, context and page with the conditions specified in the options dictionary
+            async with async_playwright() as p:
+                browser = await _launch_browser(
+                    p,
+                    proxy_info=options.get("proxy_info"),
+                    headless=options.get("headless"),
+                    browser_type=options.get("browser_type", "chromium"),
+                )
+                context = await _new_context(
+                    browser,
+                    accept_downloads=options.get("accept_downloads"),
+                    cookies=options.get("cookies"),
+                    record_har=options.get("record_har"),
+                )
+                page = await context.new_page()
+                await _route_resources(page, **options)
+
+                # add the new page to the wrapped function kwargs
+                func_kwargs["page"] = page
+
+                try:
+                    # execute the function with the open page
+                    return await func(*func_args, **func_kwargs)
+                finally:
+                    # close the page, context (saving the recorded HAR) and browser
+                    await page.close()
+                    await context.close()
+                    await browser.close()
+
+        return func_wrapper
+
+    return decorator
+
+
+def with_api_request(**kwargs):
+    """Decorator giving an async APIRequestContext to a coroutine function which only sends HTTP requests.
+
+    Args:
+        **kwargs: Keyword arguments for customizing the requests (proxy_info, cookies, pool).
+
+    Returns:
+        callable: A decorator function that wraps a coroutine function and passes it an `api_request` kwarg.
+
+    Note:
+        Async counterpart of `playwright_plus.with_api_request`: no page is opened, and no browser is launched without a pool.
+    """
+
+    def decorator(func):
+        async def func_wrapper(*func_args, **func_kwargs):
+            options = {"proxy_info": None, **kwargs}
+            options.update(func_kwargs)
+            pool = options.pop("pool", None)
+            func_kwargs.pop("pool", None)
+            if pool is None:
+                pool = _default_pool
+
+            if pool:
+                async with pool.context(**options) as context:
+                    func_kwargs["api_request"] = context.request
+                    return await func(*func_args, **func_kwargs)
+
+            async with async_playwright() as p:
+                api_request = await p.request.new_context(
+                    proxy=options["proxy_info"],
+                    storage_state=_cookies_to_storage_state(options.get("cookies")),
+                )
+                func_kwargs["api_request"] = api_request
+                try:
+                    return await func(*func_args, **func_kwargs)
+                finally:
+                    await api_request.dispose()
+
+        return func_wrapper
+
+    return decorator
+
+
+### WEB SURFING
+def _get_page_arg(func_args: list, func_kwargs: dict, func_name: str) -> Page:
+    """Retrieve an async Playwright Page object from function arguments or keyword arguments.
+
+    Args:
+        func_args (list): List of function arguments.
+        func_kwargs (dict): Dictionary of function keyword arguments.
+        func_name (str): The name of the decorated function.
+
+    Returns:
+        Page: An async Playwright Page object.
+
+    Raises:
+        Exception: If the Page object is not found in function arguments or keyword arguments.
+    """
+    page = None
+    if func_kwargs:
+        page = func_kwargs.get("page")
+    if (not page) and func_args:
+        page = func_args[0]
+    if not isinstance(page, Page):
+        raise Exception(
+            f"One of the decorator expects the function `{func_name}` to have a page as first arg or as kwarg."
+        )
+    return page
+
+
+def wait_after_execution(wait_ms: int = 2000, randomized: bool = True):
+    """Decorator for adding a waiting period after executing a coroutine function on a web page.
+
+    Args:
+        wait_ms (int, optional): Time in milliseconds to wait after executing the function (default 2000 ms).
+        randomized (bool, optional): Whether to randomize the waiting time within a range (default True).
+
+    Returns:
+        callable: A decorator function that wraps a coroutine function and adds a waiting period.
+    """
+
+    def decorator(func):
+        async def func_wrapper(*func_args, **func_kwargs):
+            # get the page object. Check the kwargs first, then the first args
+            page = _get_page_arg(func_args, func_kwargs, func.__name__)
+
+            # execute the function
+            output = await func(*func_args, **func_kwargs)
+
+            # the wait_ms value can be overwritten if it is specified as a kwarg in the wrapped function
+            wait = func_kwargs.get("wait_ms", wait_ms)
+
+            if randomized:
+                # take a random number in the 15% range around the input time in millisecond
+                wait = randint(int(wait * 0.85 + 0.5), int(wait * 1.15 + 0.5))
+            # wait for the given time before moving to the next command
+            await page.wait_for_timeout(wait)
+
+            return output
+
+        return func_wrapper
+
+    return decorator
+
+
+def check_for_loaded_marker(
+    marker: str | Locator = None,
+    marker_strict: bool = False,
+    load_message: str = None,
+    timeout: int = 10000,
+):
+    """Decorator for checking the presence of a loaded marker on a web page.
+
+    Args:
+        marker (str | Locator, optional): The marker to check, either as a string selector or a Playwright Locator (default None).
+        marker_strict (bool, optional): Whether to use strict marker selection (default False).
+        load_message (str, optional): Custom message to log when the marker is loaded (default None).
+        timeout (int, optional): Maximum time to wait for the marker to appear (default 10000 ms).
+
+    Returns:
+        callable: A decorator function that wraps a coroutine function and checks for a loaded marker.
+    """
+
+    def decorator(func):
+        async def func_wrapper(*func_args, **func_kwargs):
+            # get the page object. Check the kwargs first, then the first args
+            page = _get_page_arg(func_args, func_kwargs, func.__name__)
+
+            # execute the function
+            output = await func(*func_args, **func_kwargs)
+
+            # build the marker locator if needed
+            if isinstance(marker, str):
+                selector = marker
+                # add a dot before the marker if it misses it
+                if not (marker_strict) and not (selector.startswith(".")):
+                    selector = "." + selector
+                # wait for the marker to be visible
+                await page.locator(selector).wait_for(timeout=timeout)
+                logging.debug(
+                    load_message
+                    if load_message
+                    else "[playwright_plus] loaded marker visible."
+                )
+
+            return output
+
+        return func_wrapper
+
+    return decorator
@@ -0,0 +1,418 @@
+import asyncio
+import logging
+import time
+from playwright.async_api import (
+    APIRequestContext,
+    Page,
+    TimeoutError as PlaywrightTimeoutError,
+)
+from utils.exceptions import PlaywrightInterceptError
+from utils.json_decoder import decode_json
+from utils.latency_tracker import LatencyTracker, get_default_latency_tracker
+from utils.matchers import ResponseMatcher, as_response_matcher
+from utils.proxy_pool import with_proxy_pool
+from utils.result_cache import with_result_cache
+from utils.retry_policy import with_retry
+from utils.single_flight import with_single_flight
+from web_intercept import (
+    FETCH_MODES,
+    WAIT_UNTIL_STATES,
+    _check_response_headers,
+    _record_latencies,
+    _resolve_auto_timeouts,
+    _target_json_to_result,
+)
+from .browser_surf import (
+    BrowserPool,
+    _stop_page,
+    get_default_pool,
+    with_api_request,
+    with_page,
+)
+
+# Size in bytes from which the JSON bodies are decoded in a thread, None to decode them in
+# the event loop. The stdlib, orjson and ujson decoders hold the GIL, so a thread only lets
+# the loop dispatch events meanwhile with a decoder releasing it or a free-threaded Python
+# (see benchmarks/bench_json_decoders.py).
+OFF_THREAD_DECODE_SIZE = None
+
+
+async def _wait_for_target_response(
+    page: Page, captured: list, is_target: callable, timeout: float
+):
+    """Wait until a matching response is captured or the timeout expires.
+
+    Args:
+        page (Page): Async Playwright Page object on which the responses are captured.
+        captured (list): Matching responses captured so far and not processed yet.
+        is_target (callable): Function telling whether a response is a matching one.
+        timeout (float): Maximum time to wait in milliseconds.
+    """
+    if captured or timeout <= 0:
+        return
+    try:
+        response = await page.wait_for_event(
+            "response", predicate=is_target, timeout=timeout
+        )
+        if response not in captured:
+            captured.append(response)
+    except PlaywrightTimeoutError:
+        pass
+
+
+async def _wait_for_decoded_response(
+    page: Page, captured: list, is_target: callable, timeout: float, is_done: callable
+):
+    """Wait until the captured responses complete the capture or the timeout expires.
+
+    Args:
+        page (Page): Async Playwright Page object on which the responses are captured.
+        captured (list): Matching responses captured so far and not processed yet.
+        is_target (callable): Function telling whether a response is a matching one.
+        timeout (float): Maximum time to wait in milliseconds.
+        is_done (callable): Coroutine function reading the captured responses and telling whether the capture is done.
+    """
+    deadline = time.perf_counter() + timeout / 1000
+    while not await is_done():
+        remaining = (deadline - time.perf_counter()) * 1000
+        if remaining <= 0:
+            return
+        await _wait_for_target_response(page, captured, is_target, remaining)
+
+
+async def _goto_and_wait_for_target_response(
+    page: Page,
+    page_url: str,
+    captured: list,
+    is_target: callable,
+    timeout: float,
+    wait_until: str = "load",
+    goto_timeout=30000,
+    is_done: callable = None,
+) -> dict:
+    """Navigate to a page while waiting for a matching response, until `timeout` ms after it loaded.
+
+    Args:
+        page (Page): Async Playwright Page object to navigate.
+        page_url (str): The URL of the web page.
+        captured (list): Matching responses captured so far and not processed yet.
+        is_target (callable): Function telling whether a response is a matching one.
+        timeout (float): Maximum time to wait after the page reached `wait_until`, in milliseconds.
+        wait_until (str): Load state of WAIT_UNTIL_STATES awaited by the navigation (default "load").
+        goto_timeout: Timeout for page navigation (default 30000 milliseconds).
+        is_done (callable): Coroutine function reading the captured responses and telling whether the capture is done (default: a matching response is captured).
+
+    Returns:
+        dict: The navigation, as returned by the sync `_start_navigation`: its "started_at" time, its "loaded_at" time unless the capture was done first, its "error", if any, and its "captured_at" time if the capture was done.
+    """
+    if wait_until not in WAIT_UNTIL_STATES:
+        raise ValueError(
+            f"wait_until must be one of {WAIT_UNTIL_STATES}, not {wait_until}"
+        )
+    navigation = {
+        "started_at": time.perf_counter(),
+        "loaded_at": None,
+        "goto_timeout": goto_timeout,
+        "error": None,
+        "captured_at": None,
+    }
+    if is_done is None:
+
+        async def is_done():
+            return bool(captured)
+
+    goto = asyncio.ensure_future(
+        page.goto(page_url, timeout=goto_timeout, wait_until=wait_until)
+    )
+    target = asyncio.ensure_future(
+        _wait_for_decoded_response(
+            page, captured, is_target, goto_timeout + timeout, is_done
+        )
+    )
+    await asyncio.wait([goto, target], return_when=asyncio.FIRST_COMPLETED)
+    if goto.done():
+        navigation["loaded_at"] = time.perf_counter()
+        navigation["error"] = goto.exception()
+    else:
+        # the navigation keeps going in the browser, only its waiting is cancelled
+        goto.cancel()
+    target.cancel()
+    # retrieve the navigation errors, which are ignored as by page.goto callers
+    await asyncio.gather(goto, target, return_exceptions=True)
+    await _wait_for_decoded_response(page, captured, is_target, timeout, is_done)
+    if await is_done():
+        navigation["captured_at"] = time.perf_counter()
+    return navigation
+
+
+async def _decode_response_json(response, max_body_size: int = None):
+    """Read and decode the JSON body of a response, raising if it cannot be decoded.
+
+    The headers are checked first, so that the body of an HTML page or of a response larger
+    than `max_body_size` bytes is never fetched from the browser. The body bytes are decoded
+    by the decoder of `utils.json_decoder`, in a thread from OFF_THREAD_DECODE_SIZE bytes.
+    """
+    _check_response_headers(response, max_body_size)
+    body = await response.body()
+    if max_body_size is not None and len(body) > max_body_size:
+        raise ValueError(f"the body of {len(body)} bytes exceeds max_body_size")
+    if OFF_THREAD_DECODE_SIZE is not None and len(body) >= OFF_THREAD_DECODE_SIZE:
+        return await asyncio.to_thread(decode_json, body)
+    return decode_json(body)
+
+
+async def _read_response_json(response, max_body_size: int = None) -> dict:
+    """Read the JSON body of a response, or an error dict if it cannot be decoded."""
+    try:
+        return await _decode_response_json(response, max_body_size)
+    except Exception as jde:
+        return {"error": f"exception when trying to intercept:{str(jde)}"}
+
+
+async def _read_target_json(response, max_body_size: int = None) -> tuple:
+    """Read the target json of a response and whether it decoded, as in the sync API."""
+    try:
+        buffer = await _decode_response_json(response, max_body_size)
+    except Exception as jde:
+        buffer = {"error": f"exception when trying to intercept:{str(jde)}"}
+        is_json = False
+    else:
+        is_json = True
+    if not "error" in buffer:
+        return buffer, is_json
+    return PlaywrightInterceptError(message=buffer["error"]).get_response(), is_json
+
+
+@with_result_cache(
+    "page_url", "json_url_subpart", "json_detect_error", "json_parse_result"
+)
+@with_single_flight()
+@with_retry(BrowserPool, get_default_pool)
+@with_proxy_pool()
+@with_page(headless=True)
+async def intercept_json_playwright(
+    page_url: str,
+    json_url_subpart: str | ResponseMatcher,
+    page: Page = None,
+    json_detect_error: callable = None,
+    json_parse_result: callable = None,
+    captcha_solver_function: callable = None,
+    max_refresh: int = 1,
+    timeout: int | str = 4000,
+    goto_timeout=30000,
+    wait_until: str = "load",
+    latency_tracker: LatencyTracker = None,
+    max_body_size: int = None,
+    early_stop: bool | str = False,
+    **kwargs,
+) -> dict:
+    """Intercept JSON data using async Playwright, handle errors, and parse the result.
+
+    Args:
+        page_url (str): The URL of the web page.
+        json_url_subpart (str | ResponseMatcher): Subpart of the JSON URL to intercept, or a ResponseMatcher also checking the method, status, resource type or content type before the body is read.
+        page (Page): Async Playwright Page object (optional).
+        json_detect_error (callable): Function to detect and handle JSON errors (optional).
+        json_parse_result (callable): Function to parse the JSON result (optional).
+        captcha_solver_function (callable): Coroutine function to solve captchas (optional).
+        max_refresh (int): Maximum number of page refresh attempts (default 1).
+        timeout (int | str): Maximum time to wait for JSON data, or "auto" for the timeout that the latency tracker derives for the domain (default 4000 milliseconds).
+        goto_timeout: Timeout for page navigation, or "auto" as for `timeout` (default 30000 milliseconds).
+        wait_until (str): Load state of WAIT_UNTIL_STATES ("commit", "domcontentloaded", "load" or "networkidle") after which `timeout` starts; the capture runs during the navigation and completes as soon as a target response decodes as JSON, an error body included, else returns the error of the last one (default "load").
+        latency_tracker (LatencyTracker): Tracker recording the navigation and capture times of the domain, from which the "auto" timeouts are derived (optional, default `get_default_latency_tracker()` for the "auto" timeouts).
+        max_body_size (int): Maximum size in bytes of the JSON body, larger responses are an error without being read (optional).
+        early_stop (bool | str): Once the capture is over, stop the page loading: "stop", "abort", "blank" or True for "blank", see EARLY_STOP_MODES (default False).
+        **kwargs: Browser settings of `with_page`, `result_cache` (a ResultCache) to reuse a recent result for the same page_url and json_url_subpart, `coalesce=False` not to share the navigation of an identical call in progress, `retry_policy` (a RetryPolicy) to retry the errors, possibly with another proxy of the policy, in the same browser, and `proxy_pool` (a ProxyPool) to use a proxy picked by recent performance and record how it went.
+
+    Returns:
+        dict: The intercepted JSON data or an error message.
+    """
+    time_spent = 0
+    nb_refresh = 0
+    captcha_to_solve = False
+    is_error = False
+    # matching responses not processed yet, in arrival order
+    captured = []
+
+    # target jsons of the matching responses read and not processed yet, which decoded,
+    # JSON error bodies included
+    decoded = []
+    # error response of the last matching response which was not JSON or did not decode
+    last_error = {}
+
+    is_target = as_response_matcher(json_url_subpart)
+
+    def handle_response(response):
+        if is_target(response):
+            captured.append(response)
+
+    page.on("response", handle_response)
+
+    async def read_captured() -> bool:
+        # a redirect or an HTML error page may precede the answer of the API: the
+        # capture completes on a body which decodes, else ends with the last error
+        nonlocal last_error
+        while captured:
+            target_json, is_json = await _read_target_json(captured[0], max_body_size)
+            # removed once read, so that a cancelled read is done again
+            captured.pop(0)
+            if is_json:
+                decoded.append(target_json)
+            else:
+                last_error = target_json
+        return bool(decoded)
+
+    if latency_tracker is None and "auto" in [timeout, goto_timeout]:
+        latency_tracker = get_default_latency_tracker()
+    if latency_tracker is not None:
+        timeout, goto_timeout = _resolve_auto_timeouts(
+            latency_tracker, page_url, wait_until, timeout, goto_timeout
+        )
+
+    navigation = await _goto_and_wait_for_target_response(
+        page,
+        page_url,
+        captured,
+        is_target,
+        timeout,
+        wait_until,
+        goto_timeout,
+        is_done=read_captured,
+    )
+    if latency_tracker is not None:
+        _record_latencies(latency_tracker, page_url, wait_until, navigation)
+
+    start = navigation["loaded_at"] or time.perf_counter()
+    while (time_spent <= timeout) and (nb_refresh < max_refresh):
+        # wait until a matching response decodes, instead of polling for it
+        remaining = timeout - (time.perf_counter() - start) * 1000
+        await _wait_for_decoded_response(
+            page, captured, is_target, remaining, read_captured
+        )
+        # the last matching response wins
+        target_json = decoded[-1] if decoded else last_error
+        decoded.clear()
+        last_error = {}
+        logging.debug(
+            f"time_spent : {time_spent}. target_json keys: {target_json.keys()}"
+        )
+
+        result = target_json
+        is_error = False
+
+        if not target_json:
+            result = PlaywrightInterceptError(
+                message="An empty json was collected after calling the hidden API."
+            ).get_response()
+        elif result.get("error") == "CaptchaRaisedError":
+            captcha_to_solve = True
+        else:
+            break
+
+        if callable(json_detect_error):
+            is_error, result = json_detect_error(result)
+
+        if captcha_to_solve and callable(captcha_solver_function):
+            ask_for_refresh, captcha_solved = await captcha_solver_function(page)
+            if captcha_solved:
+                captcha_to_solve = False
+                result = {}
+
+            if ask_for_refresh:
+                try:
+                    logging.debug("refresh")
+                    nb_refresh += 1
+                    ask_for_refresh = False
+                    await page.goto(page_url, timeout=3000)
+                except:
+                    pass
+
+        time_spent = (time.perf_counter() - start) * 1000
+    await _stop_page(page, early_stop)
+    if (not is_error) and callable(json_parse_result):
+        result = json_parse_result(result)
+
+    return result
+
+
+async def request_json_playwright(
+    json_url: str,
+    json_detect_error: callable = None,
+    json_parse_result: callable = None,
+    fetch_mode: str = "page",
+    **kwargs,
+) -> dict:
+    """Request JSON data using async Playwright, handle errors, and parse the result.
+
+    Args:
+        json_url (str): The URL of the JSON data.
+        json_detect_error (callable): Function to detect and handle JSON errors (optional).
+        json_parse_result (callable): Function to parse the JSON result (optional).
+        fetch_mode (str): One of FETCH_MODES, "page" to open the URL in a web page, or "api" to send a plain request through Playwright's APIRequestContext, without rendering (default "page").
+        **kwargs: Additional keyword arguments to pass to `intercept_json_playwright`, `result_cache` (a ResultCache) to reuse a recent result for the same json_url, and `coalesce=False` not to share an identical call in progress.
+
+    Returns:
+        dict: The intercepted JSON data or an error message.
+
+    Raises:
+        ValueError: If `fetch_mode` is not one of FETCH_MODES.
+    """
+    if fetch_mode not in FETCH_MODES:
+        raise ValueError(f"fetch_mode must be one of {FETCH_MODES}, not {fetch_mode}")
+    # the page mode is cached and coalesced by `intercept_json_playwright`
+    if fetch_mode == "api":
+        return await _request_json_api(
+            json_url=json_url,
+            json_detect_error=json_detect_error,
+            json_parse_result=json_parse_result,
+            **kwargs,
+        )
+
+    result = await intercept_json_playwright(
+        page_url=json_url,
+        json_url_subpart=json_url,
+        json_detect_error=json_detect_error,
+        json_parse_result=json_parse_result,
+        **kwargs,
+    )
+
+    return result
+
+
+@with_result_cache("json_url", "json_detect_error", "json_parse_result")
+@with_single_flight()
+@with_api_request()
+async def _request_json_api(
+    json_url: str,
+    api_request: APIRequestContext = None,
+    json_detect_error: callable = None,
+    json_parse_result: callable = None,
+    goto_timeout=30000,
+    **kwargs,
+) -> dict:
+    """Request JSON data with an async APIRequestContext and build the same result as `intercept_json_playwright`.
+
+    Args:
+        json_url (str): The URL of the JSON data.
+        api_request (APIRequestContext): Async Playwright APIRequestContext object (optional).
+        json_detect_error (callable): Function to detect and handle JSON errors (optional).
+        json_parse_result (callable): Function to parse the JSON result (optional).
+        goto_timeout: Timeout for the request (default 30000 milliseconds).
+
+    Returns:
+        dict: The requested JSON data or an error message.
+    """
+    target_json = {}
+    try:
+        response = await api_request.get(json_url, timeout=goto_timeout)
+        buffer = await _read_response_json(response)
+        if not "error" in buffer:
+            target_json = buffer
+        else:
+            target_json = PlaywrightInterceptError(
+                message=buffer["error"]
+            ).get_response()
+    except Exception as err:
+        logging.debug(f"[playwright_plus] request to {json_url} failed: {err}")
+
+    return _target_json_to_result(target_json, json_detect_error, json_parse_result)
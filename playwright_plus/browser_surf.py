@@ -1,41 +1,198 @@
 # Built-in imports
+import functools
+import inspect
+import json
 import logging
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
 from random import randint
+from urllib.parse import urlparse
 
 # Public 3rd party packages imports
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import Error as PlaywrightError, sync_playwright
 from playwright.sync_api._generated import Page, Locator
 from asyncio.exceptions import CancelledError
 
 # Private packages imports
 # Local functions and relative imports
+from utils.asset_cache import AssetCache
+from utils.blocklist import DomainMatcher, UrlPatternMatcher, read_blocklist
+from utils.exceptions import PlaywrightPoolError
+
 # Constants imports
 # New constants
 EXCLUDED_RESOURCES_TYPES = ["stylesheet", "image", "font", "svg"]
+# Resource types needed to trigger and receive the hidden API calls of a page
+API_RESOURCES_TYPES = ["document", "script", "xhr", "fetch"]
+# URL extensions of the resource types, used by the "native" blocking engine
+RESOURCES_TYPES_EXTENSIONS = {
+    "stylesheet": ["css"],
+    "image": ["avif", "bmp", "gif", "ico", "jpeg", "jpg", "png", "svg", "webp"],
+    "svg": ["svg"],
+    "font": ["eot", "otf", "ttf", "woff", "woff2"],
+    "media": ["avi", "m4a", "mov", "mp3", "mp4", "ogg", "wav", "webm"],
+    "script": ["js", "mjs"],
+}
+# Resource blocking options of a browser context and their default values
+ROUTE_OPTIONS = {
+    "block_resources": True,
+    "allow_resources": None,
+    "allow_hosts": None,
+    "blocking_engine": "route",
+    "block_domains": None,
+    "block_url_patterns": None,
+    "asset_cache": None,
+    "replay_har": None,
+    "replay_har_mode": "strict",
+}
+# How route_from_har handles the requests missing from the HAR, for each replay mode
+REPLAY_HAR_NOT_FOUND = {"strict": "abort", "fallback": "fallback"}
+# Resource types served from the asset cache, when it is enabled and they are not blocked
+CACHED_RESOURCES_TYPES = ["font", "image", "script", "stylesheet"]
+# How a page stops once its target responses are captured: "stop" halts the pending loads,
+# "abort" also aborts every later request and "blank" unloads the page and its scripts
+EARLY_STOP_MODES = ["stop", "abort", "blank"]
+# Second level labels under which the country code top level domains register the sites,
+# e.g. co.uk or com.au: the site of www.example.co.uk is example.co.uk
+SECOND_LEVEL_SUFFIXES = {
+    "ac",
+    "co",
+    "com",
+    "edu",
+    "gob",
+    "gouv",
+    "gov",
+    "govt",
+    "gv",
+    "ltd",
+    "mil",
+    "ne",
+    "net",
+    "nic",
+    "nom",
+    "or",
+    "org",
+    "plc",
+    "sch",
+}
+# Hosting domains under which each subdomain is a site of its own
+SHARED_HOSTING_SUFFIXES = {
+    "appspot.com",
+    "azurewebsites.net",
+    "blogspot.com",
+    "cloudfront.net",
+    "firebaseapp.com",
+    "github.io",
+    "herokuapp.com",
+    "netlify.app",
+    "pages.dev",
+    "vercel.app",
+    "web.app",
+}
+CLEAR_STORAGE_SCRIPT = """
+    async () => {
+        localStorage.clear();
+        sessionStorage.clear();
+        for (const db of await indexedDB.databases()) {
+            indexedDB.deleteDatabase(db.name);
+        }
+    }
+"""
 
 __all__ = [
+    "BrowserPool",
     "check_for_loaded_marker",
+    "get_default_pool",
     "open_new_page",
+    "set_default_pool",
     "wait_after_execution",
+    "with_api_request",
     "with_page",
 ]
 
 
-def create_block_resources(resources_to_block: list):
+# (matcher class, blocklist path) -> (modification time, matcher), one read per file
+_blocklist_matchers = {}
+_blocklist_matchers_lock = threading.Lock()
+
+
+def _read_blocklist_matcher(matcher_class, path: str):
+    """Build the matcher of a blocklist file, only once per file until it changes."""
+    mtime = os.path.getmtime(path)
+    with _blocklist_matchers_lock:
+        cached = _blocklist_matchers.get((matcher_class, path))
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, matcher_class(read_blocklist(path)))
+            _blocklist_matchers[(matcher_class, path)] = cached
+        return cached[1]
+
+
+def _as_domain_matcher(block_domains) -> DomainMatcher:
+    """Build a DomainMatcher from a list of domains or the path of a blocklist file."""
+    if block_domains is None or isinstance(block_domains, DomainMatcher):
+        return block_domains
+    if isinstance(block_domains, str):
+        return _read_blocklist_matcher(DomainMatcher, block_domains)
+    return DomainMatcher(block_domains)
+
+
+def _as_url_pattern_matcher(block_url_patterns) -> UrlPatternMatcher:
+    """Build a UrlPatternMatcher from a list of patterns or the path of a blocklist file."""
+    if block_url_patterns is None or isinstance(block_url_patterns, UrlPatternMatcher):
+        return block_url_patterns
+    if isinstance(block_url_patterns, str):
+        return _read_blocklist_matcher(UrlPatternMatcher, block_url_patterns)
+    return UrlPatternMatcher(block_url_patterns)
+
+
+def create_block_resources(
+    resources_to_block: list,
+    block_domains: DomainMatcher = None,
+    block_url_patterns: UrlPatternMatcher = None,
+    asset_cache: AssetCache = None,
+    allow_resources: list = None,
+    allow_hosts: DomainMatcher = None,
+):
     """Create a resource blocking function based on a list of resource types.
 
     Args:
         resources_to_block (list): List of resource types to block.
+        block_domains (DomainMatcher, optional): Domains whose requests are blocked (default None).
+        block_url_patterns (UrlPatternMatcher, optional): URL substrings whose requests are blocked (default None).
+        asset_cache (AssetCache, optional): Cache answering the allowed GET requests of static assets (default None).
+        allow_resources (list, optional): The only resource types allowed, the others are blocked (default None, i.e. all).
+        allow_hosts (DomainMatcher, optional): The only domains allowed, with their subdomains, the others are blocked (default None, i.e. all).
 
     Returns:
-        callable: A route handling function that blocks specified resource types and allows others to continue.
+        callable: A route handling function that blocks specified resource types, domains and URL patterns and allows others to continue.
     """
 
     def _block_resources(route):
         try:
-            if route.request.resource_type in resources_to_block:
+            request = route.request
+            if (
+                request.resource_type in resources_to_block
+                or (allow_resources and request.resource_type not in allow_resources)
+                or (allow_hosts and not allow_hosts.matches_url(request.url))
+                or (block_domains and block_domains.matches_url(request.url))
+                or (block_url_patterns and block_url_patterns.matches(request.url))
+            ):
                 route.abort()
 
+            elif (
+                asset_cache
+                and request.method == "GET"
+                and request.resource_type in CACHED_RESOURCES_TYPES
+            ):
+                try:
+                    _fulfill_from_asset_cache(route, asset_cache)
+                except PlaywrightError as err:
+                    logging.debug(f"[playwright_plus] asset not fetched: {err}")
+                    route.abort()
+
             else:
                 route.continue_()
 
@@ -48,32 +205,22 @@ def create_block_resources(resources_to_block: list):
 ### WEB BROWSER AND PAGE OPENING
 
 
-def _instantiate_browser_context_page(
+def _launch_browser(
     p,
     proxy_info: dict = None,
     headless: bool = True,
-    accept_downloads: bool = True,
-    block_resources: bool | list = True,
-    cookies: list[dict] = None,
     browser_type: str = "chromium",
-    **kwargs,
 ):
-    """Instantiate a browser, browser context, and web page for automated web interactions.
+    """Launch a browser with the given Playwright instance.
 
     Args:
         p: Playwright instance.
         proxy_info (dict, optional): Proxy information (e.g., {"server": "http://proxyserver:port"}).
         headless (bool, optional): Whether to run the browser in headless mode (default True).
-        accept_downloads (bool, optional): Whether to accept downloads (default True).
-        block_resources (bool | list, optional): Whether to block specific resource types or a list of resource types to block (default True).
-        cookies (list[dict], optional): List of cookies to set in the browser context (default None).
         browser_type (str, optional): Type of browser to launch ("chromium" or "firefox", default "chromium").
 
     Returns:
-        tuple: A tuple containing the browser instance, browser context, and web page.
-
-    Note:
-        This function sets up a browser with specific configurations and can block resources as specified. It is intended for automated web interactions.
+        Browser: The launched browser.
     """
     logging.debug(
         f"[playwright_plus] open a browser : headless={headless}, proxy_info={proxy_info.get('server') if isinstance(proxy_info, dict) else None}"
@@ -83,11 +230,34 @@ def _instantiate_browser_context_page(
             browser = p.chromium.launch(headless=headless, proxy=proxy_info)
         case "firefox":
             browser = p.firefox.launch(headless=headless, proxy=proxy_info)
-    # create the browser context
+    return browser
+
+
+def _new_context(
+    browser,
+    accept_downloads: bool = True,
+    cookies: list[dict] = None,
+    proxy_info: dict = None,
+    record_har: str = None,
+):
+    """Create a browser context with the webdriver flag hidden and the given cookies set.
+
+    Args:
+        browser: Browser in which to create the context.
+        accept_downloads (bool, optional): Whether to accept downloads (default True).
+        cookies (list[dict], optional): List of cookies to set in the browser context (default None).
+        proxy_info (dict, optional): Proxy used by this context only (default None, i.e. the browser proxy).
+        record_har (str, optional): Path of a .har or .zip file where the network traffic of the context is saved when it is closed (default None).
+
+    Returns:
+        BrowserContext: The configured browser context.
+    """
     logging.debug(
         f"[playwright_plus] open a browser context: accept_downloads={accept_downloads}, with {len(cookies) if cookies else 0} cookies set(s)"
     )
-    context = browser.new_context(accept_downloads=accept_downloads)
+    context = browser.new_context(
+        accept_downloads=accept_downloads, proxy=proxy_info, record_har_path=record_har
+    )
     context.add_init_script(
         """
             navigator.webdriver = false
@@ -99,32 +269,555 @@ def _instantiate_browser_context_page(
     if cookies:
         context.add_cookies(cookies)
 
-    # open a web page
+    return context
+
+
+def _resources_url_regex(resources_to_block: list):
+    """Build a regex matching the URLs whose extension belongs to the given resource types.
+
+    Args:
+        resources_to_block (list): List of resource types to block.
+
+    Returns:
+        re.Pattern: The regex, or None if one of the types has no known extension.
+    """
+    extensions = set()
+    for resource_type in resources_to_block:
+        if resource_type not in RESOURCES_TYPES_EXTENSIONS:
+            return None
+        extensions.update(RESOURCES_TYPES_EXTENSIONS[resource_type])
+    return re.compile(
+        r"\.(?:" + "|".join(sorted(extensions)) + r")(?:[?#]|$)", re.IGNORECASE
+    )
+
+
+_asset_caches = {}
+_asset_caches_lock = threading.Lock()
+
+
+def _as_asset_cache(asset_cache) -> AssetCache:
+    """Open the AssetCache of a directory, only once per directory."""
+    if asset_cache is None or isinstance(asset_cache, AssetCache):
+        return asset_cache
+    with _asset_caches_lock:
+        if asset_cache not in _asset_caches:
+            _asset_caches[asset_cache] = AssetCache(asset_cache)
+        return _asset_caches[asset_cache]
+
+
+def _fulfill_from_asset_cache(route, asset_cache: AssetCache):
+    """Answer a request from the asset cache, fetching and storing the asset if it is missing or stale.
+
+    Args:
+        route: Route of the request.
+        asset_cache (AssetCache): Cache in which the assets are stored.
+    """
+    request = route.request
+    cached = asset_cache.get(request.url)
+    if cached and cached["fresh"]:
+        route.fulfill(
+            status=cached["status"], headers=cached["headers"], body=cached["body"]
+        )
+        return
+
+    headers = request.headers
+    if cached:
+        # revalidate the stale entry instead of downloading it again
+        if "etag" in cached["headers"]:
+            headers["if-none-match"] = cached["headers"]["etag"]
+        if "last-modified" in cached["headers"]:
+            headers["if-modified-since"] = cached["headers"]["last-modified"]
+    response = route.fetch(headers=headers)
+    if cached and response.status == 304:
+        asset_cache.refresh(request.url, response.headers)
+        route.fulfill(
+            status=cached["status"], headers=cached["headers"], body=cached["body"]
+        )
+        return
+
+    body = response.body()
+    asset_cache.put(request.url, response.status, response.headers, body)
+    route.fulfill(response=response, body=body)
+
+
+def _route_resources(
+    target,
+    block_resources: bool | list = True,
+    allow_resources: bool | list = None,
+    allow_hosts: list | DomainMatcher = None,
+    blocking_engine: str = "route",
+    block_domains: list | str | DomainMatcher = None,
+    block_url_patterns: list | str | UrlPatternMatcher = None,
+    asset_cache: str | AssetCache = None,
+    replay_har: str = None,
+    replay_har_mode: str = "strict",
+    **kwargs,
+):
+    """Block the requested resource types, domains and URLs on a page or on a whole browser context.
+
+    Args:
+        target: Page or browser context on which to install the route.
+        block_resources (bool | list, optional): Whether to block specific resource types or a list of resource types to block (default True).
+        allow_resources (bool | list, optional): The only resource types allowed, or True for API_RESOURCES_TYPES, e.g. to load only what triggers the hidden API calls (default None, i.e. all).
+        allow_hosts (list | DomainMatcher, optional): The only domains allowed, with their subdomains (default None, i.e. all). `with_page` replaces True by the site of the `page_url` argument; True is ignored elsewhere.
+        blocking_engine (str, optional): "route" to send every request to the route handler, or "native" to let the browser send only the requests whose URL extension belongs to a blocked resource type (default "route").
+        block_domains (list | str | DomainMatcher, optional): Domains whose requests are blocked, with their subdomains, or the path of a blocklist file (default None). Pass a DomainMatcher to compile a large list only once.
+        block_url_patterns (list | str | UrlPatternMatcher, optional): URL substrings whose requests are blocked, or the path of a blocklist file (default None). Pass a UrlPatternMatcher to compile a large list only once.
+        asset_cache (str | AssetCache, optional): Directory of an on-disk cache, or an AssetCache, serving the scripts, stylesheets, fonts and images which are not blocked (default None).
+        replay_har (str, optional): Path of a HAR file recorded with `record_har`, answering the requests it contains instead of the network (default None).
+        replay_har_mode (str, optional): "strict" to abort the requests missing from the HAR, or "fallback" to send them to the network (default "strict").
+        **kwargs: Additional keyword arguments, ignored.
+    """
     logging.debug(
-        f"[playwright_plus] open a new page: blocked resources={EXCLUDED_RESOURCES_TYPES if block_resources==True else block_resources}"
+        f"[playwright_plus] blocked resources={EXCLUDED_RESOURCES_TYPES if block_resources==True else block_resources}"
     )
-    page = context.new_page()
-    if block_resources:
+    block_domains = _as_domain_matcher(block_domains)
+    block_url_patterns = _as_url_pattern_matcher(block_url_patterns)
+    asset_cache = _as_asset_cache(asset_cache)
+    if allow_resources == True:
+        allow_resources = API_RESOURCES_TYPES
+    allow_hosts = _as_domain_matcher(allow_hosts if allow_hosts != True else None)
+    allow_list = allow_resources or allow_hosts
+    if (
+        block_resources
+        or block_domains
+        or block_url_patterns
+        or asset_cache
+        or allow_list
+    ):
         resources_to_block = (
             EXCLUDED_RESOURCES_TYPES if block_resources == True else block_resources
+        ) or []
+        url_pattern = "**/*"
+        if blocking_engine == "native" and not (
+            block_domains or block_url_patterns or asset_cache or allow_list
+        ):
+            # the browser matches the regex itself, the other requests never reach python
+            url_pattern = _resources_url_regex(resources_to_block) or url_pattern
+        target.route(
+            url_pattern,
+            create_block_resources(
+                resources_to_block,
+                block_domains,
+                block_url_patterns,
+                asset_cache,
+                allow_resources,
+                allow_hosts,
+            ),
+        )
+    if replay_har:
+        # the last installed route runs first: the HAR answers before the blocking handler
+        target.route_from_har(
+            replay_har, not_found=REPLAY_HAR_NOT_FOUND[replay_har_mode]
         )
 
-        def _block_resources(route):
-            try:
-                if route.request.resource_type in resources_to_block:
-                    route.abort()
 
-                else:
-                    route.continue_()
+def _url_origin(url: str) -> str:
+    """Return the origin of an http(s) URL, or None for the other URLs."""
+    if not url.startswith("http"):
+        return None
+    return "{0.scheme}://{0.netloc}".format(urlparse(url))
+
+
+def _check_pool_settings(pool, func_kwargs: dict):
+    """Raise a ValueError if a call asks for other browsers than its pool ones."""
+    for name in ["headless", "browser_type"]:
+        if name in func_kwargs and func_kwargs[name] != getattr(pool, name):
+            raise ValueError(
+                f"the call asks for {name}={func_kwargs[name]!r} but its pool launches "
+                f"its browsers with {name}={getattr(pool, name)!r}"
+            )
+
+
+def _page_url_site(func, func_args: tuple, func_kwargs: dict) -> list:
+    """Return the site of the `page_url` argument of a call, allowed by `allow_hosts=True`.
+
+    The site is the registrable domain of the host, so that the API subdomains of the
+    page are allowed too (e.g. api.example.com for www.example.com, api.example.co.uk
+    for www.example.co.uk). When the public suffix of the host is unknown, e.g. a second
+    level label of a country code domain missing from SECOND_LEVEL_SUFFIXES, only the
+    host is.
+    """
+    arguments = inspect.signature(func).bind_partial(*func_args, **func_kwargs)
+    host = urlparse(arguments.arguments.get("page_url") or "").hostname
+    if not host:
+        return None
+    labels = host.split(".")
+    if host.replace(".", "").isdigit() or len(labels) < 3:
+        return [host]
+    nb_site_labels = 2
+    if ".".join(labels[-2:]) in SHARED_HOSTING_SUFFIXES:
+        nb_site_labels = 3
+    elif len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_SUFFIXES:
+        nb_site_labels = 3
+    elif len(labels[-1]) == 2 and len(labels[-2]) <= 3:
+        # may be a second level suffix, e.g. qc.ca: allowing it would allow other sites
+        return [host]
+    return [".".join(labels[-nb_site_labels:])]
+
+
+def _new_page(context, **route_options):
+    """Open a web page in the given context, blocking the requested resource types.
+
+    Args:
+        context: Browser context in which to open the page.
+        **route_options: Resource blocking options, see `_route_resources`.
+
+    Returns:
+        Page: The new web page.
+    """
+    logging.debug("[playwright_plus] open a new page")
+    page = context.new_page()
+    _route_resources(page, **route_options)
+
+    return page
+
+
+def _stop_page(page, early_stop=True):
+    """Stop the loading and the scripts of a page whose target responses are captured.
+
+    Args:
+        page: Web page to stop.
+        early_stop (bool | str, optional): A mode of EARLY_STOP_MODES, True for "blank" which leaves the page reusable, or False to do nothing (default True). The "abort" mode is meant for pages which are closed next.
+    """
+    if not early_stop:
+        return
+    mode = "blank" if early_stop is True else early_stop
+    if mode not in EARLY_STOP_MODES:
+        raise ValueError(f"early_stop must be one of {EARLY_STOP_MODES}, not {mode}")
+    try:
+        if mode == "blank":
+            page.goto("about:blank")
+            return
+        page.evaluate("window.stop()")
+        if mode == "abort":
+            page.route("**/*", lambda route: route.abort())
+    except PlaywrightError as err:
+        # the page may be closed or navigating
+        logging.debug(f"[playwright_plus] could not stop the page: {err}")
+
+
+def _instantiate_browser_context_page(
+    p,
+    proxy_info: dict = None,
+    headless: bool = True,
+    accept_downloads: bool = True,
+    block_resources: bool | list = True,
+    cookies: list[dict] = None,
+    browser_type: str = "chromium",
+    record_har: str = None,
+    **kwargs,
+):
+    """Instantiate a browser, browser context, and web page for automated web interactions.
+
+    Args:
+        p: Playwright instance.
+        proxy_info (dict, optional): Proxy information (e.g., {"server": "http://proxyserver:port"}).
+        headless (bool, optional): Whether to run the browser in headless mode (default True).
+        accept_downloads (bool, optional): Whether to accept downloads (default True).
+        block_resources (bool | list, optional): Whether to block specific resource types or a list of resource types to block (default True).
+        cookies (list[dict], optional): List of cookies to set in the browser context (default None).
+        browser_type (str, optional): Type of browser to launch ("chromium" or "firefox", default "chromium").
+        record_har (str, optional): Path of a .har or .zip file where the network traffic is saved when the context is closed (default None).
+        **kwargs: Resource blocking options, see `_route_resources`, e.g. `allow_resources` to block every resource type but the given ones.
 
-            except CancelledError as err:
-                logging.debug("block_resources was correctly canceled")
+    Returns:
+        tuple: A tuple containing the browser instance, browser context, and web page.
 
-        page.route("**/*", _block_resources)
+    Note:
+        This function sets up a browser with specific configurations and can block resources as specified. It is intended for automated web interactions.
+    """
+    browser = _launch_browser(
+        p, proxy_info=proxy_info, headless=headless, browser_type=browser_type
+    )
+    context = _new_context(
+        browser,
+        accept_downloads=accept_downloads,
+        cookies=cookies,
+        record_har=record_har,
+    )
+    page = _new_page(context, block_resources=block_resources, **kwargs)
 
     return browser, context, page
 
 
+class BrowserPool:
+    """Keep launched browsers warm and hand out fresh contexts and pages.
+
+    A single Playwright driver is started on first use and up to `size` browsers are
+    launched lazily. Each page is opened in its own browser context, on the least busy
+    browser. The proxy is set per context, so one browser serves every proxy.
+
+    With `keep_contexts` > 0, the contexts are not closed when their page is given back:
+    their cookies, storage and permissions are cleared and they wait, with their init
+    script, cookies and route handler already installed, for the next page asking for the
+    same settings. A context is closed after serving `recycle_after` pages.
+
+    Args:
+        size (int, optional): Maximum number of browsers kept open (default 1).
+        headless (bool, optional): Whether to run the browsers in headless mode (default True).
+        browser_type (str, optional): Type of browser to launch ("chromium" or "firefox", default "chromium").
+        keep_contexts (int, optional): Maximum number of idle contexts kept for reuse (default 0).
+        recycle_after (int, optional): Number of pages after which a context is closed instead of reused (default 50).
+
+    Note:
+        Playwright's sync API is bound to the thread which started it, so a pool can only be used from the thread that first used it.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        headless: bool = True,
+        browser_type: str = "chromium",
+        keep_contexts: int = 0,
+        recycle_after: int = 50,
+    ):
+        self.size = size
+        self.headless = headless
+        self.browser_type = browser_type
+        self.keep_contexts = keep_contexts
+        self.recycle_after = recycle_after
+        self._playwright = None
+        self._thread_id = None
+        # number of pages currently open on each browser
+        self._browsers = {}
+        # (settings key, context) pairs ready for reuse, the most recently released last
+        self._idle_contexts = []
+        # number of pages served and cookies to restore for each pooled context
+        self._contexts_info = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _check_thread(self):
+        thread_id = threading.get_ident()
+        if self._thread_id is None:
+            self._thread_id = thread_id
+        elif self._thread_id != thread_id:
+            raise PlaywrightPoolError(
+                "The browser pool can only be used from the thread that started it."
+            )
+
+    def _acquire_browser(self):
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+
+        # forget the browsers which crashed or were closed
+        for browser in [b for b in self._browsers if not b.is_connected()]:
+            del self._browsers[browser]
+
+        idle = [b for b, nb_pages in self._browsers.items() if nb_pages == 0]
+        if idle or len(self._browsers) >= self.size:
+            return (idle or sorted(self._browsers, key=self._browsers.get))[0]
+
+        # a per-context proxy needs a global proxy placeholder on Windows
+        proxy_info = {"server": "http://per-context"} if sys.platform == "win32" else None
+        browser = _launch_browser(
+            self._playwright,
+            proxy_info=proxy_info,
+            headless=self.headless,
+            browser_type=self.browser_type,
+        )
+        self._browsers[browser] = 0
+        return browser
+
+    def _acquire_context(self, key: str, **settings):
+        # reuse the most recently released context with the same settings
+        for i in range(len(self._idle_contexts) - 1, -1, -1):
+            idle_key, context = self._idle_contexts[i]
+            if idle_key == key:
+                del self._idle_contexts[i]
+                if context.browser.is_connected():
+                    return context
+                self._contexts_info.pop(context, None)
+
+        browser = self._acquire_browser()
+        context = _new_context(
+            browser,
+            accept_downloads=settings["accept_downloads"],
+            cookies=settings["cookies"],
+            proxy_info=settings["proxy_info"],
+            record_har=settings["record_har"],
+        )
+        _route_resources(context, **settings)
+        # origins the context sent requests to, which may hold data after its pages left
+        # them, e.g. redirects, frames or pages stopped early on about:blank
+        origins = set()
+        context.on("request", lambda request: origins.add(_url_origin(request.url)))
+        self._contexts_info[context] = {
+            "nb_pages": 0,
+            "cookies": settings["cookies"],
+            "record_har": settings["record_har"],
+            "origins": origins,
+        }
+        return context
+
+    def _release_context(self, key: str, context):
+        info = self._contexts_info.get(context)
+        if info is not None:
+            info["nb_pages"] += 1
+        # a recording context is closed to save its HAR file
+        reusable = (
+            info is not None
+            and not info["record_har"]
+            and self.keep_contexts > 0
+            and info["nb_pages"] < self.recycle_after
+            and context.browser.is_connected()
+        )
+        if reusable:
+            try:
+                self._reset_context(context, info["cookies"], info["origins"])
+            except Exception as err:
+                logging.debug(f"[playwright_plus] failed to reset context: {err}")
+                reusable = False
+
+        if reusable:
+            self._idle_contexts.append((key, context))
+            if len(self._idle_contexts) <= self.keep_contexts:
+                return
+            # too many idle contexts: close the least recently used one
+            key, context = self._idle_contexts.pop(0)
+
+        self._close_context(context)
+
+    def _reset_context(
+        self, context, cookies: list[dict] = None, origins: set = None
+    ):
+        """Clear the cookies, storage and permissions of a context and close its pages.
+
+        The storage is cleared for the given origins, which are then forgotten, and for
+        the origins of the frames still open.
+        """
+        to_clear = set(origins or ())
+        for page in context.pages:
+            to_clear.update(_url_origin(frame.url) for frame in page.frames)
+        to_clear.discard(None)
+        if to_clear:
+            page = context.pages[0] if context.pages else context.new_page()
+            if self.browser_type == "chromium":
+                cdp_session = context.new_cdp_session(page)
+                for origin in sorted(to_clear):
+                    cdp_session.send(
+                        "Storage.clearDataForOrigin",
+                        {"origin": origin, "storageTypes": "all"},
+                    )
+                cdp_session.detach()
+            else:
+                # without CDP, clear the storage from an empty document of each origin
+                page.route(
+                    "**/*",
+                    lambda route: route.fulfill(body="", content_type="text/html"),
+                )
+                for origin in sorted(to_clear):
+                    page.goto(origin)
+                    page.evaluate(CLEAR_STORAGE_SCRIPT)
+        for page in context.pages:
+            page.close()
+        if origins is not None:
+            origins.clear()
+
+        context.clear_cookies()
+        context.clear_permissions()
+        if cookies:
+            context.add_cookies(cookies)
+
+    def _close_context(self, context):
+        self._contexts_info.pop(context, None)
+        try:
+            context.close()
+        except Exception as err:
+            logging.debug(f"[playwright_plus] failed to close context: {err}")
+
+    @contextmanager
+    def context(
+        self,
+        proxy_info: dict = None,
+        accept_downloads: bool = True,
+        cookies: list[dict] = None,
+        record_har: str = None,
+        **kwargs,
+    ):
+        """Take a fresh or reset context of one of the pooled browsers.
+
+        Args:
+            proxy_info (dict, optional): Proxy information (e.g., {"server": "http://proxyserver:port"}).
+            accept_downloads (bool, optional): Whether to accept downloads (default True).
+            cookies (list[dict], optional): List of cookies to set in the browser context (default None).
+            record_har (str, optional): Path of a .har or .zip file where the network traffic is saved. The context is then closed on exit instead of being reused (default None).
+            **kwargs: Resource blocking options (see ROUTE_OPTIONS), other keyword arguments are ignored.
+
+        Yields:
+            BrowserContext: The browser context. It is closed or reset for reuse on exit.
+        """
+        self._check_thread()
+        settings = {
+            "proxy_info": proxy_info,
+            "accept_downloads": accept_downloads,
+            "cookies": cookies,
+            "record_har": record_har,
+            **{k: kwargs.get(k, v) for k, v in ROUTE_OPTIONS.items()},
+        }
+        key = json.dumps(settings, sort_keys=True, default=str)
+        context = self._acquire_context(key, **settings)
+        browser = context.browser
+        self._browsers[browser] = self._browsers.get(browser, 0) + 1
+        try:
+            yield context
+        finally:
+            if browser in self._browsers:
+                self._browsers[browser] -= 1
+            self._release_context(key, context)
+
+    @contextmanager
+    def page(self, **kwargs):
+        """Open a page in a fresh or reset context of one of the pooled browsers.
+
+        Args:
+            **kwargs: Browser context settings, see `BrowserPool.context`.
+
+        Yields:
+            Page: The new web page. Its context is closed or reset for reuse on exit.
+        """
+        with self.context(**kwargs) as context:
+            yield context.new_page()
+
+    def close(self):
+        """Close the pooled browsers and stop the Playwright driver."""
+        for browser in self._browsers:
+            try:
+                browser.close()
+            except Exception as err:
+                logging.debug(f"[playwright_plus] failed to close browser: {err}")
+        self._browsers = {}
+        self._idle_contexts = []
+        self._contexts_info = {}
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+        self._thread_id = None
+
+
+_default_pool = None
+
+
+def set_default_pool(pool: BrowserPool = None):
+    """Set the browser pool used by `with_page` when no `pool` is given.
+
+    Args:
+        pool (BrowserPool, optional): The pool to use by default, or None to open a new browser per call (default None).
+    """
+    global _default_pool
+    _default_pool = pool
+
+
+def get_default_pool() -> BrowserPool:
+    """Return the browser pool used by `with_page` when no `pool` is given, if any."""
+    return _default_pool
+
+
 def open_new_page(
     proxy_info: dict = None,
     headless: bool = True,
@@ -141,7 +834,7 @@ def open_new_page(
         accept_downloads (bool, optional): Whether to accept downloads (default True).
         block_resources (bool | list, optional): Whether to block specific resource types or a list of resource types to block (default True).
         cookies (list[dict], optional): List of cookies to set in the browser context (default None).
-        **kwargs: Additional keyword arguments.
+        **kwargs: Additional keyword arguments, such as the resource blocking options (see ROUTE_OPTIONS).
 
     Returns:
         tuple: A tuple containing the browser instance, browser context, and web page.
@@ -158,6 +851,7 @@ def open_new_page(
         accept_downloads=accept_downloads,
         block_resources=block_resources,
         cookies=cookies,
+        **kwargs,
     )
 
     return browser, context, page
@@ -174,39 +868,138 @@ def with_page(**kwargs):
 
     Note:
         This decorator allows you to specify various browser settings such as accepting downloads, running in headless mode, blocking resources, using a proxy, and setting cookies. The wrapped function can access a preconfigured web page for web automation.
+        The page is taken from `pool` (a BrowserPool) if given, else from the default pool set with `set_default_pool`, whose `headless` and `browser_type` settings apply: a call passing other ones raises a ValueError. Pass `pool=False` to open a new browser for the call.
+        Pass `allow_resources=True` to load only the document, scripts and XHR/fetch requests, and `allow_hosts=True` to load only the site of the `page_url` argument.
+        Pass `record_har` (a .har or .zip path) to save the network traffic of the call, and `replay_har` to answer the requests from such a file offline: `replay_har_mode="strict"` aborts the requests missing from it, `"fallback"` sends them to the network.
+        A generator function keeps its page until it is exhausted or closed.
     """
 
     def decorator(func):
-        def func_wrapper(*func_args, **func_kwargs):
+        @contextmanager
+        def open_page(func_args, func_kwargs):
             # by default, accept_downloads=True, headless=True, block_resources=True, no proxy, no cookies
-            default = {
+            options = {
                 "accept_downloads": True,
                 "headless": True,
                 "block_resources": True,
                 "proxy_info": None,
+                **kwargs,
             }
-            for k, v in default.items():
-                if k not in kwargs:
-                    kwargs[k] = v
 
             # overwrite the decorator kwargs if the ones specified by the wrapped function
-            kwargs.update(func_kwargs)
-
-            # open browser, context and page with the conditions specified in the kwargs dictionary
+            options.update(func_kwargs)
+            pool = options.pop("pool", None)
+            func_kwargs.pop("pool", None)
+            if pool is None:
+                pool = _default_pool
+            if options.get("allow_hosts") == True:
+                options["allow_hosts"] = _page_url_site(func, func_args, func_kwargs)
+
+            if pool:
+                _check_pool_settings(pool, func_kwargs)
+                # take a fresh context and page from the warm browsers of the pool
+                with pool.page(**options) as page:
+                    yield page
+                return
+
+            # open browser, context and page with the conditions specified in the options dictionary
             with sync_playwright() as p:
-                browser, context, page = _instantiate_browser_context_page(p, **kwargs)
-
+                browser, context, page = _instantiate_browser_context_page(p, **options)
+                try:
+                    yield page
+                finally:
+                    # close the page, context (saving the recorded HAR) and browser
+                    page.close()
+                    context.close()
+                    browser.close()
+
+        @functools.wraps(func)
+        def func_wrapper(*func_args, **func_kwargs):
+            with open_page(func_args, func_kwargs) as page:
                 # add the new page to the wrapped function kwargs
                 func_kwargs["page"] = page
 
                 # execute the function with the open page
-                output = func(*func_args, **func_kwargs)
+                return func(*func_args, **func_kwargs)
 
-                # close the page and browser
-                page.close()
-                browser.close()
+        @functools.wraps(func)
+        def generator_wrapper(*func_args, **func_kwargs):
+            # keep the page open until the generator is exhausted or closed
+            with open_page(func_args, func_kwargs) as page:
+                func_kwargs["page"] = page
+                yield from func(*func_args, **func_kwargs)
 
-            return output
+        if inspect.isgeneratorfunction(func):
+            return generator_wrapper
+        return func_wrapper
+
+    return decorator
+
+
+def _cookies_to_storage_state(cookies: list[dict] = None) -> dict:
+    """Convert cookies in the `BrowserContext.add_cookies` format to a storage state.
+
+    Args:
+        cookies (list[dict], optional): List of cookies, each with either a url or a domain and a path (default None).
+
+    Returns:
+        dict: A storage state holding the cookies.
+    """
+    storage_cookies = []
+    for cookie in cookies or []:
+        cookie = dict(cookie)
+        url = urlparse(cookie.pop("url", ""))
+        storage_cookies.append(
+            {
+                "domain": url.hostname,
+                "path": "/",
+                "expires": -1,
+                "httpOnly": False,
+                "secure": url.scheme == "https",
+                "sameSite": "Lax",
+                **cookie,
+            }
+        )
+    return {"cookies": storage_cookies, "origins": []}
+
+
+def with_api_request(**kwargs):
+    """Decorator giving an APIRequestContext to a function which only sends HTTP requests.
+
+    Args:
+        **kwargs: Keyword arguments for customizing the requests (proxy_info, cookies, pool).
+
+    Returns:
+        callable: A decorator function that wraps another function and passes it an `api_request` kwarg.
+
+    Note:
+        No page is opened. With a pool (the `pool` kwarg or the default pool), the requests are sent through a pooled browser context and share its cookies and proxy. Without a pool, a standalone request context is created, without launching a browser.
+    """
+
+    def decorator(func):
+        def func_wrapper(*func_args, **func_kwargs):
+            options = {"proxy_info": None, **kwargs}
+            options.update(func_kwargs)
+            pool = options.pop("pool", None)
+            func_kwargs.pop("pool", None)
+            if pool is None:
+                pool = _default_pool
+
+            if pool:
+                with pool.context(**options) as context:
+                    func_kwargs["api_request"] = context.request
+                    return func(*func_args, **func_kwargs)
+
+            with sync_playwright() as p:
+                api_request = p.request.new_context(
+                    proxy=options["proxy_info"],
+                    storage_state=_cookies_to_storage_state(options.get("cookies")),
+                )
+                func_kwargs["api_request"] = api_request
+                try:
+                    return func(*func_args, **func_kwargs)
+                finally:
+                    api_request.dispose()
 
         return func_wrapper
 
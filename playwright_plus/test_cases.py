@@ -1,9 +1,48 @@
+import asyncio
+import json
+import os
+import re
+import tempfile
+import threading
+import time
 import unittest
-from unittest.mock import MagicMock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
+from playwright.sync_api import Error as PlaywrightError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from pyee import EventEmitter
+from aio import (
+    BrowserPool as AsyncBrowserPool,
+    intercept_json_playwright as async_intercept_json_playwright,
+    request_json_playwright as async_request_json_playwright,
+    with_page as async_with_page,
+)
+from browser_surf import (
+    BrowserPool,
+    _as_domain_matcher,
+    _route_resources,
+    _stop_page,
+    create_block_resources,
+    with_page,
+)
+from utils.asset_cache import AssetCache
+from utils.blocklist import DomainMatcher, UrlPatternMatcher, read_blocklist
+from utils.json_decoder import JSON_DECODERS, decode_json, set_json_decoder
+from utils.latency_tracker import LatencyTracker, QuantileSketch
+from utils.matchers import ResponseMatcher
+from utils.proxy_pool import ProxyPool, with_proxy_pool
+from utils.result_cache import ResultCache
+from utils.retry_policy import RetryPolicy, with_retry
+from utils.single_flight import with_single_flight
+from worker_farm import WorkerFarm
 from web_intercept import (
     intercept_json_playwright,
     request_json_playwright,
+    intercept_json_playwright_many,
     intercept_json_playwright_multiple,
+    intercept_json_playwright_replay,
+    intercept_json_playwright_stream,
+    intercept_json_playwright_targets,
 )
 
 
@@ -17,6 +56,258 @@ class BaseJsonTest(unittest.TestCase):
     def json_parse_result(self, result):
         return {"success": True, "data": result}
 
+    def _mock_pool(self, url=None, body=None, headers=None, mock_page=None):
+        # Mock a pool whose page awaits a JSON response from `url`, or none without url
+        if mock_page is None:
+            mock_page = MagicMock()
+            if url is None:
+                mock_page.wait_for_event.side_effect = PlaywrightTimeoutError("none")
+        if url is not None:
+            mock_response = MagicMock(url=url)
+            mock_response.headers = {
+                "content-type": "application/json",
+                **(headers or {}),
+            }
+            mock_response.body.return_value = json.dumps(body).encode()
+            mock_page.wait_for_event.return_value = mock_response
+        mock_pool = MagicMock()
+        mock_pool.page.return_value.__enter__.return_value = mock_page
+        return mock_pool, mock_page
+
+
+class LocalJsonHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/api/slow"):
+            time.sleep(2)
+        if self.path.startswith("/api/"):
+            body, content_type = json.dumps({"path": self.path}), "application/json"
+        else:
+            body, content_type = "<html><body>Not found</body></html>", "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class FakePage(EventEmitter):
+    """Page emitting its responses while a response is awaited, as Playwright does.
+
+    The handlers registered with `on` get each response before the waiter, and a wait
+    whose predicate matches none of the remaining responses times out.
+    """
+
+    def __init__(self, responses: list):
+        super().__init__()
+        self.responses = list(responses)
+        self.timeouts = []
+
+    def goto(self, url, **kwargs):
+        pass
+
+    def wait_for_event(self, event, predicate=None, timeout=None):
+        awaited = []
+
+        def waiter(response):
+            if not awaited and (predicate is None or predicate(response)):
+                awaited.append(response)
+
+        self.on(event, waiter)
+        while self.responses and not awaited:
+            self.emit(event, self.responses.pop(0))
+        self.remove_listener(event, waiter)
+        if not awaited:
+            self.timeouts.append(timeout)
+            raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded")
+        return awaited[0]
+
+
+class AsyncFakePage(FakePage):
+    """Async page emitting its responses while a response is awaited, as FakePage does.
+
+    Its navigation takes `load_delay` seconds, then raises `goto_error` if any, and a
+    wait whose predicate matches none of the remaining responses lasts `timeout` ms.
+    """
+
+    def __init__(self, responses: list, load_delay: float = 0, goto_error=None):
+        super().__init__(responses)
+        self.load_delay = load_delay
+        self.goto_error = goto_error
+
+    async def goto(self, url, **kwargs):
+        await asyncio.sleep(self.load_delay)
+        if self.goto_error is not None:
+            raise self.goto_error
+
+    async def wait_for_event(self, event, predicate=None, timeout=None):
+        try:
+            return super().wait_for_event(event, predicate, timeout)
+        except PlaywrightTimeoutError:
+            await asyncio.sleep(timeout / 1000)
+            raise
+
+
+class LocalServerTest(BaseJsonTest):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), LocalJsonHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+class TestRequestJsonPlaywrightApi(LocalServerTest):
+    def test_request_json_playwright_api_success(self):
+        intercepted_json_response = request_json_playwright(
+            json_url=f"{self.base_url}/api/activity",
+            fetch_mode="api",
+            json_detect_error=self.json_detect_error,
+            json_parse_result=self.json_parse_result,
+        )
+        self.assertEqual(
+            intercepted_json_response,
+            {"success": True, "data": {"path": "/api/activity"}},
+        )
+
+    def test_request_json_playwright_api_error(self):
+        intercepted_json_response = asyncio.run(
+            async_request_json_playwright(
+                json_url="http://127.0.0.1:1/api/activity",
+                fetch_mode="api",
+                json_detect_error=self.json_detect_error,
+                json_parse_result=self.json_parse_result,
+            )
+        )
+        self.assertEqual(
+            intercepted_json_response.get("error"), "PlaywrightInterceptError"
+        )
+
+    def test_request_json_playwright_rejects_unknown_fetch_mode(self):
+        with self.assertRaises(ValueError):
+            request_json_playwright(json_url=f"{self.base_url}/api", fetch_mode="API")
+        with self.assertRaises(ValueError):
+            asyncio.run(
+                async_request_json_playwright(
+                    json_url=f"{self.base_url}/api", fetch_mode="apis"
+                )
+            )
+
+    def test_request_json_playwright_caches_each_mode_once(self):
+        # Mock the Page object, which receives the JSON page right away
+        mock_pool, _ = self._mock_pool(f"{self.base_url}/api/page", {"mode": "page"})
+        cache = ResultCache()
+
+        for _ in range(2):
+            request_json_playwright(
+                json_url=f"{self.base_url}/api/page", pool=mock_pool, result_cache=cache
+            )
+            request_json_playwright(
+                json_url=f"{self.base_url}/api/activity",
+                fetch_mode="api",
+                result_cache=cache,
+            )
+
+        # Perform assertions: one entry per call, the page mode navigating once
+        self.assertEqual(len(cache), 2)
+        mock_pool.page.assert_called_once()
+
+
+class TestWorkerFarm(LocalServerTest):
+    # API jobs without pool need no browser in the workers
+    def api_job(self, path: str) -> dict:
+        json_url = f"{self.base_url}{path}"
+        return {"json_url": json_url, "fetch_mode": "api", "pool": False}
+
+    def test_worker_farm_dispatches_jobs(self):
+        with WorkerFarm(nb_workers=2) as farm:
+            jobs = [self.api_job(f"/api/item/{i}") for i in range(4)]
+            results = list(farm.map("request_json_playwright", jobs))
+            stats = farm.stats()
+
+        # Perform assertions: each job got its own result, from both workers
+        self.assertEqual(len(results), 4)
+        for job, result in results:
+            self.assertTrue(job["json_url"].endswith(result["path"]))
+        self.assertEqual(sum(w["nb_jobs"] for w in stats["workers"]), 4)
+        self.assertTrue(all(w["nb_jobs"] for w in stats["workers"]))
+
+    def test_worker_farm_map_leaves_other_jobs_to_as_completed(self):
+        with WorkerFarm(nb_workers=1) as farm:
+            other_job_id = farm.submit(
+                "request_json_playwright", **self.api_job("/api/other")
+            )
+            jobs = [self.api_job(f"/api/item/{i}") for i in range(2)]
+            results = list(farm.map("request_json_playwright", jobs))
+            other_results = list(farm.as_completed(timeout=30))
+
+        # Perform assertions: each result went to the caller of its job
+        self.assertEqual([job for job, _ in results], jobs)
+        self.assertEqual(other_results, [(other_job_id, {"path": "/api/other"})])
+
+    def test_worker_farm_fails_jobs_no_worker_can_take(self):
+        def spawn(nb_restarts=0):
+            # Mock a worker process which died before it could read its job
+            conn = MagicMock()
+            conn.send.side_effect = BrokenPipeError()
+            process = MagicMock(exitcode=1)
+            process.is_alive.return_value = True
+            return {
+                "process": process,
+                "conn": conn,
+                "job_id": None,
+                "job_start": None,
+                "busy_time": 0.0,
+                "started_at": 0.0,
+                "nb_jobs": 0,
+                "nb_restarts": nb_restarts,
+            }
+
+        with patch.object(WorkerFarm, "_spawn", side_effect=spawn):
+            with WorkerFarm(nb_workers=1) as farm:
+                job_id = farm.submit("request_json_playwright", json_url="x")
+                results = list(farm.as_completed(timeout=1))
+
+        # Perform assertions: the job failed after a new worker was tried
+        self.assertEqual(results[0][0], job_id)
+        self.assertEqual(results[0][1]["error"], "PlaywrightWorkerError")
+
+    def test_worker_farm_back_pressure(self):
+        with WorkerFarm(nb_workers=1, max_pending=1) as farm:
+            queue_depths = []
+            for i in range(3):
+                farm.submit("request_json_playwright", **self.api_job(f"/api/{i}"))
+                queue_depths.append(farm.stats()["queue_depth"])
+            results = list(farm.as_completed(timeout=30))
+
+        # Perform assertions: submit waited for room instead of queueing every job
+        self.assertLessEqual(max(queue_depths), 1)
+        self.assertEqual(len(results), 3)
+
+    def test_worker_farm_respawns_dead_workers(self):
+        with WorkerFarm(nb_workers=1) as farm:
+            # the worker dies while running a job
+            farm.submit("request_json_playwright", **self.api_job("/api/slow"))
+            farm._workers[0]["process"].kill()
+            (_, crashed), = farm.as_completed(timeout=30)
+            # the new worker dies while idle, before the next job is sent to it
+            farm._workers[0]["process"].kill()
+            farm._workers[0]["process"].join()
+            farm.submit("request_json_playwright", **self.api_job("/api/activity"))
+            (_, result), = farm.as_completed(timeout=30)
+            nb_restarts = farm.stats()["workers"][0]["nb_restarts"]
+
+        # Perform assertions
+        self.assertEqual(crashed["error"], "PlaywrightWorkerError")
+        self.assertEqual(result, {"path": "/api/activity"})
+        self.assertEqual(nb_restarts, 2)
+
 
 class TestRequestJsonPlaywright(BaseJsonTest):
     def test_request_json_playwright_success(self):
@@ -48,6 +339,597 @@ class TestRequestJsonPlaywright(BaseJsonTest):
         )
 
 
+class TestInterceptJsonPlaywrightEvents(BaseJsonTest):
+    def test_intercept_json_playwright_completes_on_response(self):
+        # Mock the Page object, which receives the target response right away
+        mock_pool, mock_page = self._mock_pool(
+            "https://example.com/api/activity?id=1", {"activity": "read"}
+        )
+
+        intercepted_json_response = intercept_json_playwright(
+            page_url="https://example.com",
+            json_url_subpart="/api/activity",
+            pool=mock_pool,
+            json_detect_error=self.json_detect_error,
+            json_parse_result=self.json_parse_result,
+        )
+
+        # Perform assertions
+        self.assertEqual(
+            intercepted_json_response, {"success": True, "data": {"activity": "read"}}
+        )
+        mock_page.wait_for_timeout.assert_not_called()
+
+    def test_intercept_json_playwright_skips_unmatched_responses_unread(self):
+        def mock_response(method, status, content_type):
+            response = MagicMock(url="https://example.com/api/activity", status=status)
+            response.request.method = method
+            response.request.resource_type = "fetch"
+            response.headers = {"content-type": content_type}
+            response.body.return_value = json.dumps({"activity": method}).encode()
+            return response
+
+        # Mock the Page object, receiving a preflight, a redirect and the target response
+        responses = [
+            mock_response("OPTIONS", 204, ""),
+            mock_response("GET", 302, "text/html"),
+            mock_response("GET", 200, "application/json; charset=utf-8"),
+        ]
+        mock_pool, mock_page = self._mock_pool()
+        mock_page.goto.side_effect = lambda *args, **kwargs: [
+            mock_page.on.call_args.args[1](response) for response in responses
+        ]
+
+        intercepted_json_response = intercept_json_playwright(
+            page_url="https://example.com",
+            json_url_subpart=ResponseMatcher(
+                url_glob="**/api/*", method="GET", status=200, content_type="json"
+            ),
+            pool=mock_pool,
+            json_parse_result=self.json_parse_result,
+        )
+
+        # Perform assertions
+        self.assertEqual(
+            intercepted_json_response, {"success": True, "data": {"activity": "GET"}}
+        )
+        responses[0].body.assert_not_called()
+        responses[1].body.assert_not_called()
+
+    def test_intercept_json_playwright_skips_body_over_max_body_size(self):
+        # Fake a page receiving a too large target response only
+        mock_response = MagicMock(url="https://example.com/api/activity?id=1")
+        mock_response.headers = {
+            "content-type": "application/json",
+            "content-length": "5000000",
+        }
+        mock_pool, _ = self._mock_pool(mock_page=FakePage([mock_response]))
+
+        intercepted_json_response = intercept_json_playwright(
+            page_url="https://example.com",
+            json_url_subpart="/api/activity",
+            pool=mock_pool,
+            wait_until="commit",
+            timeout=50,
+            max_body_size=1000000,
+        )
+
+        # Perform assertions
+        self.assertEqual(intercepted_json_response["error"], "PlaywrightInterceptError")
+        mock_response.body.assert_not_called()
+
+    def test_intercept_json_playwright_waits_past_unreadable_responses(self):
+        # Fake a page receiving a redirect, whose body is unreadable, then the data
+        redirect = MagicMock(url="https://example.com/api/activity")
+        redirect.headers = {"content-type": "application/json"}
+        redirect.body.side_effect = Exception("Response body is unavailable")
+        mock_response = MagicMock(url="https://example.com/api/activity?id=1")
+        mock_response.headers = {"content-type": "application/json"}
+        mock_response.body.return_value = b'{"activity": "read"}'
+        page = FakePage([redirect, mock_response])
+        mock_pool, _ = self._mock_pool(mock_page=page)
+
+        intercepted_json_response = intercept_json_playwright(
+            page_url="https://example.com",
+            json_url_subpart="/api/activity",
+            pool=mock_pool,
+            wait_until="commit",
+        )
+
+        # Perform assertions: the redirect did not end the capture
+        self.assertEqual(intercepted_json_response, {"activity": "read"})
+        self.assertEqual(page.timeouts, [])
+
+    def test_intercept_json_playwright_returns_json_error_bodies_at_once(self):
+        # Fake a page receiving an error answer of the hidden API
+        mock_response = MagicMock(url="https://example.com/api/activity?id=1")
+        mock_response.headers = {"content-type": "application/json"}
+        mock_response.body.return_value = b'{"error": "not found"}'
+        page = FakePage([mock_response])
+        mock_pool, _ = self._mock_pool(mock_page=page)
+
+        intercepted_json_response = intercept_json_playwright(
+            page_url="https://example.com",
+            json_url_subpart="/api/activity",
+            pool=mock_pool,
+            wait_until="commit",
+        )
+
+        # Perform assertions: the error ended the capture, without waiting for more
+        self.assertEqual(intercepted_json_response["error_message"], "not found")
+        self.assertEqual(page.timeouts, [])
+
+    def test_intercept_json_playwright_captures_during_navigation(self):
+        # Mock the Page object, which receives the target response before it loads
+        mock_pool, mock_page = self._mock_pool(
+            "https://example.com/api/activity?id=1", {"activity": "read"}
+        )
+
+        intercepted_json_response = intercept_json_playwright(
+            page_url="https://example.com",
+            json_url_subpart="/api/activity",
+            pool=mock_pool,
+            wait_until="load",
+        )
+
+        # Perform assertions: the navigation only waited for the commit
+        self.assertEqual(intercepted_json_response, {"activity": "read"})
+        self.assertEqual(mock_page.goto.call_args.kwargs["wait_until"], "commit")
+        mock_page.once.assert_called_once_with("load", ANY)
+
+    def test_intercept_json_playwright_timeout_starts_after_load(self):
+        waits = []
+
+        def wait_for_event(event, predicate=None, timeout=None):
+            waits.append(timeout)
+            time.sleep(timeout / 1000)
+            if len(waits) == 2:
+                # the page loads at the end of the second wait
+                mock_page.once.call_args.args[1](mock_page)
+            raise PlaywrightTimeoutError("no target response")
+
+        # Mock the Page object, which never receives the target response
+        mock_pool, mock_page = self._mock_pool()
+        mock_page.wait_for_event.side_effect = wait_for_event
+
+        intercepted_json_response = intercept_json_playwright(
+            page_url="https://example.com",
+            json_url_subpart="/api/activity",
+            pool=mock_pool,
+            timeout=50,
+        )
+
+        # Perform assertions: the capture waited for the load, then `timeout` ms
+        self.assertEqual(intercepted_json_response["error"], "PlaywrightInterceptError")
+        self.assertEqual(len(waits), 3)
+        self.assertAlmostEqual(waits[2], 50, delta=10)
+
+    def test_intercept_json_playwright_early_stop(self):
+        # Mock the Page object, recording the order of the body read and of the navigations
+        calls = MagicMock()
+        mock_pool, mock_page = self._mock_pool(
+            "https://example.com/api/activity?id=1",
+            {"activity": "read"},
+            mock_page=calls.page,
+        )
+
+        for early_stop, stop_call in [
+            (True, ("page.goto", ("about:blank",))),
+            ("abort", ("page.route", ("**/*", ANY))),
+        ]:
+            calls.reset_mock()
+            intercept_json_playwright(
+                page_url="https://example.com",
+                json_url_subpart="/api/activity",
+                pool=mock_pool,
+                early_stop=early_stop,
+            )
+
+            # the page is stopped last, once the body is read
+            self.assertEqual(calls.mock_calls[-1][:2], stop_call)
+            self.assertIn(("page.wait_for_event().body", (), {}), calls.mock_calls[:-1])
+
+        self.assertRaises(ValueError, _stop_page, mock_page, "close")
+
+
+class TestAsyncInterceptJsonPlaywright(BaseJsonTest):
+    def _intercept(self, page, **kwargs):
+        # Mock the async BrowserPool object, which serves the fake page
+        mock_pool = MagicMock()
+        mock_pool.page.return_value.__aenter__.return_value = page
+        return asyncio.run(
+            async_intercept_json_playwright(
+                page_url="https://example.com",
+                json_url_subpart="/api/activity",
+                pool=mock_pool,
+                **kwargs,
+            )
+        )
+
+    def _mock_response(self, body: dict):
+        mock_response = MagicMock(url="https://example.com/api/activity?id=1")
+        mock_response.headers = {"content-type": "application/json"}
+        mock_response.body = AsyncMock(return_value=json.dumps(body).encode())
+        return mock_response
+
+    def test_async_intercept_json_playwright_captures_before_load(self):
+        # Fake a page receiving the target response long before it loads
+        page = AsyncFakePage([self._mock_response({"activity": "read"})], load_delay=5)
+
+        start = time.perf_counter()
+        intercepted_json_response = self._intercept(
+            page, json_parse_result=self.json_parse_result
+        )
+
+        # Perform assertions: the capture did not wait for the load
+        self.assertEqual(
+            intercepted_json_response, {"success": True, "data": {"activity": "read"}}
+        )
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(page.timeouts, [])
+
+    def test_async_intercept_json_playwright_timeout(self):
+        # Fake a page which loads without receiving the target response
+        page = AsyncFakePage([])
+
+        start = time.perf_counter()
+        intercepted_json_response = self._intercept(page, timeout=50)
+
+        # Perform assertions: the capture waited `timeout` ms after the load
+        self.assertEqual(intercepted_json_response["error"], "PlaywrightInterceptError")
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertAlmostEqual(page.timeouts[-1], 50, delta=10)
+
+    def test_async_intercept_json_playwright_failed_goto(self):
+        # Fake a page whose navigation fails
+        page = AsyncFakePage(
+            [], goto_error=PlaywrightError("net::ERR_NAME_NOT_RESOLVED")
+        )
+
+        start = time.perf_counter()
+        intercepted_json_response = self._intercept(
+            page, timeout=50, json_detect_error=self.json_detect_error
+        )
+
+        # Perform assertions: the error is returned `timeout` ms after the failure
+        self.assertEqual(intercepted_json_response["error"], "PlaywrightInterceptError")
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertAlmostEqual(page.timeouts[-1], 50, delta=10)
+
+    def test_async_intercept_json_playwright_returns_json_error_bodies_at_once(self):
+        # Fake a page receiving an error answer of the hidden API, then loading
+        page = AsyncFakePage([self._mock_response({"error": "not found"})])
+
+        intercepted_json_response = self._intercept(page, wait_until="commit")
+
+        # Perform assertions: the error ended the capture, without waiting for more
+        self.assertEqual(intercepted_json_response["error_message"], "not found")
+        self.assertEqual(page.timeouts, [])
+
+
+class TestInterceptJsonPlaywrightMany(BaseJsonTest):
+    def test_intercept_json_playwright_many_yields_each_job(self):
+        # Mock the context pages, which receive their target response on navigation
+        mock_context = MagicMock()
+        mock_pages = [MagicMock(context=mock_context) for _ in range(2)]
+        mock_context.new_page.side_effect = mock_pages[1:]
+
+        def mock_goto(page):
+            def goto(url, **kwargs):
+                mock_response = MagicMock(url=f"{url}/api/activity")
+                mock_response.frame.page = page
+                mock_response.headers = {"content-type": "application/json"}
+                mock_response.body.return_value = json.dumps({"page_url": url}).encode()
+                on_response = mock_context.on.call_args.args[1]
+                on_response(mock_response)
+
+            return goto
+
+        for mock_page in mock_pages:
+            mock_page.goto.side_effect = mock_goto(mock_page)
+        mock_pool = MagicMock()
+        mock_pool.page.return_value.__enter__.return_value = mock_pages[0]
+
+        jobs = [{"page_url": f"https://example.com/{i}"} for i in range(3)]
+        results = list(
+            intercept_json_playwright_many(
+                jobs,
+                concurrency=2,
+                pool=mock_pool,
+                json_url_subpart="/api/activity",
+                json_parse_result=self.json_parse_result,
+            )
+        )
+
+        # Perform assertions
+        self.assertEqual(len(results), 3)
+        for job, result in results:
+            self.assertEqual(result["data"]["page_url"], job["page_url"])
+
+    def test_intercept_json_playwright_many_fails_jobs_on_navigation_error(self):
+        # Mock the context page, whose navigation fails
+        mock_pool, mock_page = self._mock_pool()
+        mock_page.goto.side_effect = Exception("net::ERR_NAME_NOT_RESOLVED")
+        mock_page.context.wait_for_event.side_effect = PlaywrightTimeoutError("none")
+
+        start = time.perf_counter()
+        ((_, result),) = intercept_json_playwright_many(
+            [{"page_url": "https://unknown.example"}],
+            concurrency=1,
+            pool=mock_pool,
+            json_url_subpart="/api/activity",
+            timeout=50,
+        )
+
+        # Perform assertions: the job fails `timeout` ms after its navigation did
+        self.assertEqual(result["error"], "PlaywrightGotoError")
+        self.assertIn("ERR_NAME_NOT_RESOLVED", result["error_message"])
+        self.assertLess(time.perf_counter() - start, 1)
+
+    def test_intercept_json_playwright_many_waits_past_unreadable_responses(self):
+        def mock_response(body_error=None):
+            response = MagicMock(url="https://example.com/api/activity")
+            response.frame.page = mock_page
+            response.headers = {"content-type": "application/json"}
+            response.body.return_value = b'{"activity": "read"}'
+            response.body.side_effect = body_error
+            return response
+
+        def wait_for_event(event, predicate=None, timeout=None):
+            # the target response arrives after the redirect
+            response = mock_response()
+            mock_page.context.on.call_args.args[1](response)
+            return response
+
+        # Mock the context page, which receives a redirect whose body is unreadable
+        mock_pool, mock_page = self._mock_pool()
+        redirect = mock_response(Exception("Response body is unavailable"))
+        mock_page.goto.side_effect = lambda *args, **kwargs: (
+            mock_page.context.on.call_args.args[1](redirect)
+        )
+        mock_page.context.wait_for_event.side_effect = wait_for_event
+
+        ((_, result),) = intercept_json_playwright_many(
+            [{"page_url": "https://example.com"}],
+            concurrency=1,
+            pool=mock_pool,
+            json_url_subpart="/api/activity",
+        )
+
+        # Perform assertions: the redirect did not end the job
+        self.assertEqual(result, {"activity": "read"})
+
+
+class TestInterceptJsonPlaywrightReplay(BaseJsonTest):
+    def test_intercept_json_playwright_replay_variants(self):
+        # Mock the Page object, which intercepts the first page of the hidden API
+        mock_pool, mock_page = self._mock_pool(
+            "https://example.com/api/items?page=1", {"page": 1}
+        )
+        mock_response = mock_page.wait_for_event.return_value
+        mock_response.request.url = mock_response.url
+        mock_response.request.method = "GET"
+        mock_response.request.post_data = None
+        mock_response.request.all_headers.return_value = {
+            "x-token": "abc",
+            "cookie": "session=1",
+        }
+        mock_replay = mock_page.context.request.fetch.return_value
+        mock_replay.status = 200
+        mock_replay.headers = {"content-type": "application/json"}
+        mock_replay.body.return_value = json.dumps({"page": 2}).encode()
+
+        results = intercept_json_playwright_replay(
+            page_url="https://example.com",
+            json_url_subpart="/api/items",
+            variants=[{"params": {"page": 2}}],
+            pool=mock_pool,
+            json_parse_result=self.json_parse_result,
+        )
+
+        # Perform assertions
+        self.assertEqual([r["data"]["page"] for r in results], [1, 2])
+        mock_page.context.request.fetch.assert_called_once_with(
+            "https://example.com/api/items?page=2",
+            method="GET",
+            headers={"x-token": "abc"},
+            data=None,
+            timeout=30000,
+        )
+
+    def test_intercept_json_playwright_replay_renews_a_rejected_session(self):
+        # Mock the Page object, whose first replay is rejected as the session expired
+        mock_pool, mock_page = self._mock_pool(
+            "https://example.com/api/items", {"page": 1}
+        )
+        mock_response = mock_page.wait_for_event.return_value
+        mock_response.request.url = mock_response.url
+        mock_response.request.method = "POST"
+        mock_response.request.post_data = "page=1&sort=new"
+        mock_response.request.all_headers.return_value = {
+            "content-type": "application/x-www-form-urlencoded"
+        }
+        rejected_replay = MagicMock(status=403)
+        mock_replay = MagicMock(status=200)
+        mock_replay.headers = {"content-type": "application/json"}
+        mock_replay.body.return_value = json.dumps({"page": 2}).encode()
+        mock_page.context.request.fetch.side_effect = [rejected_replay, mock_replay]
+
+        results = intercept_json_playwright_replay(
+            page_url="https://example.com",
+            json_url_subpart="/api/items",
+            variants=[{"json": {"page": 2}}],
+            pool=mock_pool,
+            json_parse_result=self.json_parse_result,
+        )
+
+        # Perform assertions: page_url is opened again, then the variant is sent again
+        self.assertEqual([r["data"]["page"] for r in results], [1, 2])
+        self.assertEqual(
+            [c.args[0] for c in mock_page.goto.call_args_list],
+            ["https://example.com", "https://example.com"],
+        )
+        self.assertEqual(mock_page.context.request.fetch.call_count, 2)
+        self.assertEqual(
+            mock_page.context.request.fetch.call_args.kwargs["data"], "page=2&sort=new"
+        )
+
+    def test_intercept_json_playwright_replay_rejects_json_keys_in_a_text_body(self):
+        # Mock the Page object, whose hidden API request has a plain text body
+        mock_pool, mock_page = self._mock_pool("https://example.com/api/items", {})
+        mock_response = mock_page.wait_for_event.return_value
+        mock_response.request.url = mock_response.url
+        mock_response.request.method = "POST"
+        mock_response.request.post_data = "page 1"
+        mock_response.request.all_headers.return_value = {"content-type": "text/plain"}
+
+        results = intercept_json_playwright_replay(
+            page_url="https://example.com",
+            json_url_subpart="/api/items",
+            variants=[{"json": {"page": 2}}],
+            pool=mock_pool,
+        )
+
+        # Perform assertions: the variant gets an error without being sent
+        self.assertEqual(results[1]["error"], "PlaywrightInterceptError")
+        self.assertIn("text/plain", results[1]["error_message"])
+        mock_page.context.request.fetch.assert_not_called()
+        mock_page.goto.assert_called_once()
+
+
+class TestInterceptJsonPlaywrightStream(BaseJsonTest):
+    def test_intercept_json_playwright_stream_yields_each_response(self):
+        def mock_response(page_number):
+            response = MagicMock(url=f"https://example.com/api/feed?page={page_number}")
+            response.status = 200
+            response.headers = {"content-type": "application/json"}
+            response.body.return_value = json.dumps({"page": page_number}).encode()
+            return response
+
+        # Mock the Page object, which receives 3 pages of the feed, loads, then nothing
+        mock_pool, mock_page = self._mock_pool()
+        mock_page.goto.side_effect = lambda *args, **kwargs: [
+            mock_page.on.call_args.args[1](mock_response(i)) for i in range(3)
+        ] + [mock_page.once.call_args.args[1](mock_page)]
+        mock_page_cm = mock_pool.page.return_value
+
+        stream = intercept_json_playwright_stream(
+            page_url="https://example.com",
+            json_url_subpart="/api/feed",
+            pool=mock_pool,
+            json_parse_result=self.json_parse_result,
+        )
+        first_item = next(stream)
+
+        # Perform assertions: the page stays open while the stream is consumed
+        self.assertEqual(first_item["status"], 200)
+        self.assertEqual(first_item["data"], {"success": True, "data": {"page": 0}})
+        mock_page_cm.__exit__.assert_not_called()
+        self.assertEqual([item["data"]["data"]["page"] for item in stream], [1, 2])
+        mock_page_cm.__exit__.assert_called_once()
+
+    def test_intercept_json_playwright_stream_stops_after_max_responses(self):
+        # Mock the Page object, which keeps receiving feed pages
+        mock_pool, mock_page = self._mock_pool("https://example.com/api/feed", {"page": 1})
+        mock_page.wait_for_event.return_value.status = 200
+
+        items = list(
+            intercept_json_playwright_stream(
+                page_url="https://example.com",
+                json_url_subpart="/api/feed",
+                pool=mock_pool,
+                max_responses=2,
+            )
+        )
+
+        # Perform assertions
+        self.assertEqual(len(items), 2)
+
+    def test_intercept_json_playwright_stream_stops_the_page_when_closed_early(self):
+        # Mock the Page object, which keeps receiving feed pages
+        mock_pool, mock_page = self._mock_pool("https://example.com/api/feed", {"page": 1})
+        mock_page.wait_for_event.return_value.status = 200
+
+        stream = intercept_json_playwright_stream(
+            page_url="https://example.com",
+            json_url_subpart="/api/feed",
+            pool=mock_pool,
+            early_stop="stop",
+        )
+        next(stream)
+        mock_page.evaluate.assert_not_called()
+        stream.close()
+
+        # Perform assertions: the page is stopped once, before it is closed
+        mock_page.evaluate.assert_called_once_with("window.stop()")
+        mock_pool.page.return_value.__exit__.assert_called_once()
+
+
+class TestInterceptJsonPlaywrightTargets(BaseJsonTest):
+    def test_intercept_json_playwright_targets_from_one_navigation(self):
+        def mock_response(path, data):
+            response = MagicMock(url=f"https://example.com{path}")
+            response.headers = {"content-type": "application/json"}
+            response.body.return_value = json.dumps(data).encode()
+            return response
+
+        # Fake a page receiving the product and reviews APIs only, while it is awaited
+        page = FakePage(
+            [
+                mock_response("/api/product/1", {"name": "pen"}),
+                mock_response("/api/reviews?product=1", {"reviews": [5, 4]}),
+            ]
+        )
+        mock_pool, _ = self._mock_pool(mock_page=page)
+
+        results = intercept_json_playwright_targets(
+            page_url="https://example.com/product/1",
+            targets={
+                "product": "/api/product/",
+                "reviews": {
+                    "json_url_subpart": "/api/reviews",
+                    "json_parse_result": lambda result: result["reviews"],
+                },
+                "stock": {
+                    "json_url_subpart": "/api/stock",
+                    "json_detect_error": self.json_detect_error,
+                    "required": False,
+                },
+            },
+            pool=mock_pool,
+            wait_until="commit",
+            json_parse_result=self.json_parse_result,
+        )
+
+        # Perform assertions: the wait ends with the last required target, not on timeout
+        self.assertEqual(page.timeouts, [])
+        self.assertEqual(results["product"], {"success": True, "data": {"name": "pen"}})
+        self.assertEqual(results["reviews"], [5, 4])
+        self.assertEqual(results["stock"]["error"], "PlaywrightInterceptError")
+
+    def test_intercept_json_playwright_targets_wait_past_unreadable_responses(self):
+        # Fake a page receiving a redirect with an unreadable body, then an error answer
+        redirect = MagicMock(url="https://example.com/api/product/1")
+        redirect.headers = {"content-type": "application/json"}
+        redirect.body.side_effect = Exception("Response body is unavailable")
+        mock_response = MagicMock(url="https://example.com/api/product/1?v=2")
+        mock_response.headers = {"content-type": "application/json"}
+        mock_response.body.return_value = b'{"error": "out of stock"}'
+        page = FakePage([redirect, mock_response])
+        mock_pool, _ = self._mock_pool(mock_page=page)
+
+        results = intercept_json_playwright_targets(
+            page_url="https://example.com/product/1",
+            targets={"product": "/api/product/"},
+            pool=mock_pool,
+            wait_until="commit",
+        )
+
+        # Perform assertions: the redirect did not capture the target, the error did
+        self.assertEqual(results["product"]["error_message"], "out of stock")
+        self.assertEqual(page.timeouts, [])
+
+
 class TestInterceptJsonPlaywrightMultiple(BaseJsonTest):
     def test_intercept_json_playwright_multiple_success(self):
         # Mock the Page object
@@ -67,5 +949,768 @@ class TestInterceptJsonPlaywrightMultiple(BaseJsonTest):
         self.assertIsNone(intercepted_json_response.get("error"))
 
 
+class TestWithPagePool(unittest.TestCase):
+    def test_with_page_takes_page_from_pool(self):
+        # Mock the BrowserPool object
+        mock_pool = MagicMock()
+
+        @with_page(headless=True)
+        def get_page(page=None, **kwargs):
+            return page
+
+        page = get_page(pool=mock_pool, block_resources=False)
+
+        # Perform assertions
+        mock_pool.page.assert_called_once()
+        self.assertFalse(mock_pool.page.call_args.kwargs["block_resources"])
+        self.assertIs(page, mock_pool.page.return_value.__enter__.return_value)
+
+
+class TestAsyncWithPagePool(unittest.TestCase):
+    def test_async_with_page_takes_page_from_pool(self):
+        # Mock the async BrowserPool object
+        mock_pool = MagicMock()
+
+        @async_with_page(headless=True)
+        async def get_page(page=None, **kwargs):
+            return page
+
+        page = asyncio.run(get_page(pool=mock_pool))
+
+        # Perform assertions
+        mock_pool.page.assert_called_once()
+        self.assertIs(page, mock_pool.page.return_value.__aenter__.return_value)
+
+    def test_async_pool_spreads_concurrent_contexts_over_its_browsers(self):
+        async def new_context(browser, **kwargs):
+            # the task yields while the context is created, as with a real browser
+            await asyncio.sleep(0)
+            return MagicMock(browser=browser, close=AsyncMock())
+
+        async def open_context(pool):
+            async with pool.context() as context:
+                await asyncio.sleep(0.01)
+                return context.browser
+
+        async def open_contexts(pool):
+            return await asyncio.gather(*[open_context(pool) for _ in range(4)])
+
+        # Mock the Playwright driver and the launched browsers
+        pool = AsyncBrowserPool(size=2, keep_contexts=0)
+        with patch("aio.browser_surf.async_playwright") as mock_playwright, patch(
+            "aio.browser_surf._launch_browser",
+            AsyncMock(side_effect=lambda *args, **kwargs: MagicMock()),
+        ), patch("aio.browser_surf._new_context", new_context), patch(
+            "aio.browser_surf._route_resources", AsyncMock()
+        ):
+            mock_playwright.return_value.start = AsyncMock()
+            browsers = asyncio.run(open_contexts(pool))
+
+        # Perform assertions: both browsers serve 2 of the 4 contexts
+        self.assertEqual(len(pool._browsers), 2)
+        self.assertEqual(sorted(browsers.count(b) for b in set(browsers)), [2, 2])
+        self.assertEqual(list(pool._browsers.values()), [0, 0])
+
+
+class TestNativeResourceBlocking(unittest.TestCase):
+    def test_native_engine_routes_only_blocked_extensions(self):
+        # Mock the Page object
+        mock_page = MagicMock()
+        _route_resources(mock_page, block_resources=True, blocking_engine="native")
+
+        url_regex = mock_page.route.call_args.args[0]
+        self.assertTrue(url_regex.search("https://a.b/style.CSS?v=2"))
+        self.assertTrue(url_regex.search("https://a.b/img/logo.png"))
+        self.assertFalse(url_regex.search("https://a.b/api/items.json"))
+        self.assertFalse(url_regex.search("https://a.b/app.js"))
+
+    def test_native_engine_falls_back_for_types_without_extension(self):
+        # Mock the Page object
+        mock_page = MagicMock()
+        _route_resources(mock_page, block_resources=["xhr"], blocking_engine="native")
+
+        self.assertEqual(mock_page.route.call_args.args[0], "**/*")
+
+
+class TestAllowList(unittest.TestCase):
+    def test_allow_list_blocks_other_types_and_hosts(self):
+        # Mock the Page object
+        mock_page = MagicMock()
+        _route_resources(
+            mock_page,
+            block_resources=False,
+            allow_resources=True,
+            allow_hosts=["example.com"],
+            blocking_engine="native",
+        )
+        self.assertEqual(mock_page.route.call_args.args[0], "**/*")
+        handler = mock_page.route.call_args.args[1]
+
+        for url, resource_type, allowed in [
+            ("https://api.example.com/items", "fetch", True),
+            ("https://www.example.com/app.js", "script", True),
+            ("https://www.example.com/intro.mp4", "media", False),
+            ("https://cdn.tracker.net/tag.js", "script", False),
+        ]:
+            # Mock the Route object
+            mock_route = MagicMock()
+            mock_route.request.url = url
+            mock_route.request.resource_type = resource_type
+            handler(mock_route)
+            self.assertEqual(mock_route.continue_.called, allowed, url)
+            self.assertEqual(mock_route.abort.called, not allowed, url)
+
+    def test_with_page_rejects_other_browsers_than_the_pool_ones(self):
+        @with_page(headless=True)
+        def get_page(page=None, **kwargs):
+            return page
+
+        @async_with_page(headless=True)
+        async def async_get_page(page=None, **kwargs):
+            return page
+
+        pool = BrowserPool(headless=True, browser_type="chromium")
+        async_pool = AsyncBrowserPool(headless=True, browser_type="chromium")
+
+        # Perform assertions: the pool settings may be repeated, not changed
+        with self.assertRaises(ValueError):
+            get_page(pool=pool, browser_type="firefox")
+        with self.assertRaises(ValueError):
+            asyncio.run(async_get_page(pool=async_pool, headless=False))
+        pool.page = MagicMock()
+        get_page(pool=pool, headless=True)
+        pool.page.assert_called_once()
+
+    def test_with_page_allows_the_site_of_page_url(self):
+        # Mock the BrowserPool object
+        mock_pool = MagicMock()
+
+        @with_page(allow_hosts=True)
+        def get_page(page_url, page=None, **kwargs):
+            return page
+
+        get_page("https://www.example.com/products", pool=mock_pool)
+
+        self.assertEqual(mock_pool.page.call_args.kwargs["allow_hosts"], ["example.com"])
+
+    def test_with_page_allows_no_public_suffix(self):
+        # Mock the BrowserPool object
+        mock_pool = MagicMock()
+
+        @with_page(allow_hosts=True)
+        def get_page(page_url, page=None, **kwargs):
+            return page
+
+        for page_url, allow_hosts in [
+            ("https://www.example.co.uk/", ["example.co.uk"]),
+            ("https://shop.example.com.au/", ["example.com.au"]),
+            ("https://user.github.io/repo", ["user.github.io"]),
+            ("https://www.example.qc.ca/", ["www.example.qc.ca"]),
+            ("http://127.0.0.1:8000/", ["127.0.0.1"]),
+            ("http://localhost:8000/", ["localhost"]),
+        ]:
+            get_page(page_url, pool=mock_pool)
+            self.assertEqual(
+                mock_pool.page.call_args.kwargs["allow_hosts"], allow_hosts, page_url
+            )
+
+
+class TestResponseMatcher(unittest.TestCase):
+    def test_response_matcher_url_criteria(self):
+        response = MagicMock(url="https://a.b/api/v2/items?page=1")
+        self.assertTrue(ResponseMatcher("/api/v2/").matches(response))
+        self.assertTrue(ResponseMatcher(re.compile(r"/v\d/items")).matches(response))
+        self.assertTrue(ResponseMatcher(url_glob="**/api/*/items?*").matches(response))
+        self.assertTrue(ResponseMatcher(url_glob="**/{api,gql}/**").matches(response))
+        self.assertFalse(ResponseMatcher(url_glob="**/api/*").matches(response))
+        self.assertFalse(ResponseMatcher(predicate=lambda r: False).matches(response))
+
+
+class TestBlocklist(unittest.TestCase):
+    def test_domain_matcher_matches_subdomains_only(self):
+        matcher = DomainMatcher(["doubleclick.net", "Google-Analytics.com"])
+        self.assertTrue(matcher.matches("stats.g.doubleclick.net"))
+        self.assertTrue(matcher.matches_url("https://www.google-analytics.com/g"))
+        self.assertFalse(matcher.matches("notdoubleclick.net"))
+        self.assertFalse(matcher.matches("net"))
+
+    def test_url_pattern_matcher_matches_overlapping_patterns(self):
+        matcher = UrlPatternMatcher(["/gtag/js", "he", "she", "hers"])
+        self.assertTrue(matcher.matches("https://a.b/GTAG/js?id=1"))
+        self.assertTrue(matcher.matches("https://a.b/ushers"))
+        self.assertFalse(matcher.matches("https://a.b/api/items"))
+
+    def test_read_blocklist_hosts_file(self):
+        path = f"{tempfile.mkdtemp()}/hosts.txt"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(
+                "# hosts file\n"
+                "127.0.0.1 localhost\n"
+                "255.255.255.255\tbroadcasthost\n"
+                "0.0.0.0 ads.example.com # tracker\n"
+                "0.0.0.0 a.example.net b.example.net\n"
+                "||x.com^\n"
+                "/gtag/js\n"
+            )
+
+        # Perform assertions: the local names and the comments are not entries
+        self.assertEqual(
+            read_blocklist(path),
+            ["ads.example.com", "a.example.net", "b.example.net", "x.com", "/gtag/js"],
+        )
+
+    def test_blocklist_file_is_read_once_until_modified(self):
+        path = f"{tempfile.mkdtemp()}/hosts.txt"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("0.0.0.0 doubleclick.net\n")
+
+        matcher = _as_domain_matcher(path)
+        self.assertIs(_as_domain_matcher(path), matcher)
+        self.assertTrue(matcher.matches("stats.g.doubleclick.net"))
+
+        # the file is read again once modified
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("||google-analytics.com^\n")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        self.assertTrue(_as_domain_matcher(path).matches("www.google-analytics.com"))
+
+
+class TestAssetCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = AssetCache(tempfile.mkdtemp(), max_size=10)
+        self.addCleanup(self.cache.close)
+
+    def test_asset_cache_honours_cache_control_and_evicts(self):
+        headers = {"cache-control": "max-age=60", "content-encoding": "gzip"}
+        self.assertTrue(self.cache.put("https://a.b/app.js", 200, headers, b"123456"))
+        self.assertFalse(
+            self.cache.put("https://a.b/x.js", 200, {"cache-control": "no-store"}, b"1")
+        )
+        cached = self.cache.get("https://a.b/app.js")
+        self.assertTrue(cached["fresh"])
+        self.assertEqual(cached["headers"], {"cache-control": "max-age=60"})
+
+        # the least recently used asset is evicted once the cache is full
+        self.cache.put("https://a.b/lib.js", 200, {"etag": '"v1"'}, b"abcdef")
+        self.assertIsNone(self.cache.get("https://a.b/app.js"))
+        self.assertFalse(self.cache.get("https://a.b/lib.js")["fresh"])
+
+    def test_asset_cache_keeps_its_total_size_without_scanning(self):
+        headers = {"cache-control": "max-age=60"}
+        for url, body in [
+            ("https://a.b/1.js", b"1234"),
+            ("https://a.b/2.js", b"1234"),
+            ("https://a.b/1.js", b"56"),
+            ("https://a.b/3.js", b"789"),
+            ("https://a.b/4.js", b"abcdef"),
+        ]:
+            self.cache.put(url, 200, headers, body)
+            # the running total matches the size of the stored bodies, counted once
+            self.assertEqual(self.cache._total_size, self.cache._stored_size())
+            self.assertLessEqual(self.cache._total_size, 10)
+
+        # Perform assertions: the least recently used entries were evicted
+        self.assertIsNone(self.cache.get("https://a.b/2.js"))
+        self.assertIsNone(self.cache.get("https://a.b/1.js"))
+        self.assertEqual(self.cache.get("https://a.b/4.js")["body"], b"abcdef")
+        reopened = AssetCache(self.cache.directory, max_size=10)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened._total_size, 9)
+
+    def test_route_handler_serves_fresh_and_revalidates_stale_assets(self):
+        self.cache.put("https://a.b/app.js", 200, {"cache-control": "max-age=60"}, b"1")
+        self.cache.put("https://a.b/lib.js", 200, {"etag": '"v1"'}, b"2")
+        handler = create_block_resources([], asset_cache=self.cache)
+
+        # Mock the Route objects
+        fresh_route = MagicMock()
+        fresh_route.request.url = "https://a.b/app.js"
+        fresh_route.request.method = "GET"
+        fresh_route.request.resource_type = "script"
+        handler(fresh_route)
+        fresh_route.fetch.assert_not_called()
+        self.assertEqual(fresh_route.fulfill.call_args.kwargs["body"], b"1")
+
+        stale_route = MagicMock()
+        stale_route.request.url = "https://a.b/lib.js"
+        stale_route.request.method = "GET"
+        stale_route.request.resource_type = "script"
+        stale_route.request.headers = {}
+        stale_route.fetch.return_value.status = 304
+        stale_route.fetch.return_value.headers = {"cache-control": "max-age=60"}
+        handler(stale_route)
+        self.assertEqual(
+            stale_route.fetch.call_args.kwargs["headers"]["if-none-match"], '"v1"'
+        )
+        self.assertEqual(stale_route.fulfill.call_args.kwargs["body"], b"2")
+        self.assertTrue(self.cache.get("https://a.b/lib.js")["fresh"])
+
+
+class TestResultCache(BaseJsonTest):
+    def test_result_cache_ttl_and_lru(self):
+        cache = ResultCache(ttl=60, negative_ttl=0, max_entries=2)
+        self.assertTrue(cache.set("a", {"data": 1}))
+        self.assertFalse(cache.set("error", {"error": "PlaywrightInterceptError"}))
+        cache.set("b", {"data": 2})
+        cache.get("a")
+        cache.set("c", {"data": 3})
+
+        # the least recently used result is evicted, and hits are copies
+        self.assertIsNone(cache.get("b"))
+        cache.get("a")["data"] = 0
+        self.assertEqual(cache.get("a"), {"data": 1})
+        self.assertIsNone(cache.get("error"))
+        # a result with an empty error is no error
+        self.assertTrue(ResultCache(negative_ttl=0).set("a", {"error": None, "data": 1}))
+
+    def test_result_cache_disk_tier_survives_restarts(self):
+        path = f"{tempfile.mkdtemp()}/results.sqlite"
+        cache = ResultCache(path=path)
+        cache.set("a", {"data": 1})
+        cache.close()
+
+        cache = ResultCache(path=path)
+        self.addCleanup(cache.close)
+        self.assertEqual(cache.get("a"), {"data": 1})
+
+    def test_intercept_json_playwright_reuses_cached_result(self):
+        # Mock the Page object, which receives the target response right away
+        mock_pool, _ = self._mock_pool(
+            "https://example.com/api/activity?id=1", {"activity": "read"}
+        )
+        cache = ResultCache()
+
+        results = [
+            intercept_json_playwright(
+                "https://example.com",
+                "/api/activity",
+                pool=mock_pool,
+                json_parse_result=self.json_parse_result,
+                result_cache=cache,
+            )
+            for _ in range(2)
+        ]
+
+        # Perform assertions
+        mock_pool.page.assert_called_once()
+        self.assertEqual(results[0], results[1])
+
+    def test_result_cache_tells_parsers_apart(self):
+        # Mock the Page object, which receives the product response right away
+        mock_pool, _ = self._mock_pool(
+            "https://example.com/api/product/1", {"name": "pen", "price": 2}
+        )
+        cache = ResultCache()
+
+        def field(name):
+            return lambda result: result[name]
+
+        results = [
+            intercept_json_playwright(
+                "https://example.com",
+                "/api/product",
+                pool=mock_pool,
+                json_parse_result=field(name),
+                result_cache=cache,
+            )
+            for name in ["name", "price"]
+        ]
+
+        # Perform assertions: lambdas of the same path are different parsers
+        self.assertEqual(results, ["pen", 2])
+        self.assertEqual(mock_pool.page.call_count, 2)
+
+
+class TestSingleFlight(BaseJsonTest):
+    def test_concurrent_intercepts_share_one_navigation(self):
+        # Mock the Page object, whose navigation lasts until the second call waits for it
+        navigating, release = threading.Event(), threading.Event()
+        mock_pool, mock_page = self._mock_pool(
+            "https://example.com/api/activity?id=1", {"activity": "read"}
+        )
+        mock_page.goto.side_effect = lambda *args, **kwargs: (
+            navigating.set(),
+            release.wait(5),
+        )
+
+        results = []
+
+        def intercept():
+            results.append(
+                intercept_json_playwright(
+                    "https://example.com",
+                    "/api/activity",
+                    pool=mock_pool,
+                    json_parse_result=self.json_parse_result,
+                )
+            )
+
+        threads = [threading.Thread(target=intercept) for _ in range(2)]
+        threads[0].start()
+        navigating.wait(5)
+        threads[1].start()
+        threads[1].join(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        # Perform assertions
+        mock_pool.page.assert_called_once()
+        self.assertEqual(results[0], results[1])
+        self.assertIsNot(results[0], results[1])
+
+    def test_concurrent_intercepts_with_different_parsers_navigate_apart(self):
+        # Mock the Page object, whose navigation lasts until both calls started
+        release = threading.Event()
+        mock_pool, mock_page = self._mock_pool(
+            "https://example.com/api/product/1", {"name": "pen", "price": 2}
+        )
+        mock_page.goto.side_effect = lambda *args, **kwargs: release.wait(5)
+
+        def field(name):
+            return lambda result: result[name]
+
+        results = {}
+
+        def intercept(name):
+            results[name] = intercept_json_playwright(
+                "https://example.com",
+                "/api/product",
+                pool=mock_pool,
+                json_parse_result=field(name),
+            )
+
+        threads = [
+            threading.Thread(target=intercept, args=(name,))
+            for name in ["name", "price"]
+        ]
+        for thread in threads:
+            thread.start()
+        threads[1].join(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        # Perform assertions: each call ran its own parser
+        self.assertEqual(results, {"name": "pen", "price": 2})
+        self.assertEqual(mock_pool.page.call_count, 2)
+
+    def test_async_calls_share_one_execution(self):
+        nb_calls = []
+
+        @with_single_flight()
+        async def fetch(url, **kwargs):
+            nb_calls.append(url)
+            await asyncio.sleep(0.05)
+            return {"url": url}
+
+        async def main():
+            return await asyncio.gather(
+                fetch("a"), fetch("a"), fetch("b"), fetch("a", coalesce=False)
+            )
+
+        results = asyncio.run(main())
+
+        # Perform assertions
+        self.assertEqual(nb_calls, ["a", "b", "a"])
+        self.assertEqual(results[0], results[1])
+        self.assertIsNot(results[0], results[1])
+
+    def test_calls_run_apart_when_the_result_cannot_be_copied(self):
+        nb_calls = []
+        release = threading.Event()
+
+        @with_single_flight()
+        def open_lock(url):
+            nb_calls.append(url)
+            release.wait(5)
+            return {"url": url, "lock": threading.Lock()}
+
+        @with_single_flight()
+        async def async_open_lock(url):
+            nb_calls.append(url)
+            await asyncio.sleep(0.05)
+            return {"url": url, "lock": threading.Lock()}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(open_lock("a")))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        threads[1].join(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        async def main():
+            return await asyncio.gather(async_open_lock("b"), async_open_lock("b"))
+
+        results += asyncio.run(main())
+
+        # Perform assertions: the first calls got their result, the others ran apart
+        self.assertEqual([result["url"] for result in results], ["a", "a", "b", "b"])
+        self.assertEqual(nb_calls, ["a", "a", "b", "b"])
+
+
+class TestJsonDecoder(unittest.TestCase):
+    def test_set_json_decoder(self):
+        decoded = []
+        previous = set_json_decoder(lambda body: decoded.append(body) or {"a": 1})
+        self.addCleanup(set_json_decoder, previous)
+
+        # Perform assertions
+        self.assertEqual(decode_json(b'{"a": 2}'), {"a": 1})
+        self.assertEqual(decoded, [b'{"a": 2}'])
+        self.assertRaises(ValueError, set_json_decoder, "simdjson")
+
+    def test_every_decoder_accepts_stdlib_bodies(self):
+        body = b'{"price": NaN, "id": 123456789012345678901234567890}'
+        for name in JSON_DECODERS:
+            previous = set_json_decoder(name)
+            self.addCleanup(set_json_decoder, previous)
+            self.assertEqual(decode_json(body)["id"], 123456789012345678901234567890)
+
+
+class TestLatencyTracker(BaseJsonTest):
+    def test_quantile_sketch_relative_accuracy(self):
+        sketch = QuantileSketch(relative_accuracy=0.01, max_count=100000)
+        for value in range(1, 10001):
+            sketch.add(value)
+
+        # Perform assertions
+        self.assertAlmostEqual(sketch.quantile(0.5), 5000, delta=5000 * 0.02)
+        self.assertAlmostEqual(sketch.quantile(0.99), 9900, delta=9900 * 0.02)
+        self.assertLess(len(sketch.buckets), 1000)
+
+    def test_timeouts_are_derived_and_persisted(self):
+        path = f"{tempfile.mkdtemp()}/latencies.json"
+        tracker = LatencyTracker(path=path, min_samples=10, save_every=100)
+        for latency in [100] * 9:
+            tracker.record("fast.com", "capture:load", latency)
+        self.assertEqual(tracker.timeout("fast.com", "capture:load", 4000), 4000)
+        tracker.record("fast.com", "capture:load", 1000)
+        tracker.save()
+
+        # the timeout is the p99 with a margin, after a restart too
+        tracker = LatencyTracker(path=path, min_samples=10)
+        self.assertAlmostEqual(
+            tracker.timeout("fast.com", "capture:load", 4000), 1500, delta=30
+        )
+
+    def test_intercept_json_playwright_auto_timeout(self):
+        # Mock the Page object, which never receives the target response
+        mock_pool, mock_page = self._mock_pool()
+        tracker = LatencyTracker(min_samples=1, min_timeout=1)
+        tracker.record("example.com", "capture:commit", 20)
+
+        intercept_json_playwright(
+            page_url="https://example.com",
+            json_url_subpart="/api/activity",
+            pool=mock_pool,
+            wait_until="commit",
+            timeout="auto",
+            latency_tracker=tracker,
+        )
+
+        # Perform assertions: the derived timeout is used, and the failure recorded
+        self.assertAlmostEqual(
+            mock_page.wait_for_event.call_args_list[0].kwargs["timeout"], 30, delta=2
+        )
+        self.assertGreater(tracker.latency("example.com", "capture:commit"), 25)
+
+
+class TestRetryPolicy(BaseJsonTest):
+    def test_backoff_and_rules(self):
+        policy = RetryPolicy(
+            max_attempts=5, backoff=100, max_backoff=300, rules={"2": {"retry": False}}
+        )
+        for attempt, max_delay in [(1, 100), (2, 200), (3, 300), (4, 300)]:
+            self.assertLessEqual(policy.delay(attempt), max_delay)
+            self.assertGreaterEqual(policy.delay(attempt), 0)
+
+        # Perform assertions: the rules, the attempts and the deadline stop the retries
+        self.assertIsNone(policy.next_attempt(1, "2", time.perf_counter()))
+        self.assertIsNone(policy.next_attempt(5, "1", time.perf_counter()))
+        next_attempt = policy.next_attempt(1, "PlaywrightGotoError", time.perf_counter())
+        self.assertTrue(next_attempt[1])
+        policy.deadline = 50
+        self.assertIsNone(policy.next_attempt(1, "1", time.perf_counter() - 1))
+
+    def test_retries_in_one_pool_with_proxy_rotation(self):
+        calls = []
+        mock_pool_class = MagicMock()
+
+        @with_retry(mock_pool_class, lambda: None)
+        def flaky(pool=None, proxy_info=None):
+            calls.append((pool, proxy_info))
+            if len(calls) < 3:
+                return {"error": "PlaywrightGotoError", "error_message": "net::ERR"}
+            return {"data": 1}
+
+        proxies = [{"server": "http://a:1"}, {"server": "http://b:1"}]
+        result = flaky(retry_policy=RetryPolicy(backoff=1, proxies=proxies))
+
+        # Perform assertions: one pool for the 3 attempts, closed after them
+        self.assertEqual(result, {"data": 1})
+        mock_pool_class.assert_called_once()
+        self.assertEqual({pool for pool, _ in calls}, {mock_pool_class.return_value})
+        mock_pool_class.return_value.close.assert_called_once()
+        self.assertEqual([proxy for _, proxy in calls], proxies + proxies[:1])
+
+    def test_success_with_an_empty_error_is_not_retried(self):
+        calls = []
+
+        @with_retry()
+        def call():
+            calls.append(1)
+            return {"error": None, "data": 1}
+
+        result = call(retry_policy=RetryPolicy(backoff=1))
+
+        # Perform assertions
+        self.assertEqual(result, {"error": None, "data": 1})
+        self.assertEqual(len(calls), 1)
+
+    def test_intercept_json_playwright_retries_errors(self):
+        # Mock the Page object, which never receives the target response
+        mock_pool, mock_page = self._mock_pool()
+
+        result = intercept_json_playwright(
+            page_url="https://example.com",
+            json_url_subpart="/api/activity",
+            pool=mock_pool,
+            wait_until="commit",
+            timeout=10,
+            retry_policy=RetryPolicy(max_attempts=2, backoff=1),
+        )
+
+        # Perform assertions: the error is returned after the second attempt
+        self.assertEqual(result["error_code"], "1")
+        self.assertEqual(mock_pool.page.call_count, 2)
+
+
+class TestProxyPool(BaseJsonTest):
+    def test_quarantine_and_weighted_pick(self):
+        proxies = [{"server": "http://a:1"}, {"server": "http://b:1"}]
+        proxy_pool = ProxyPool(proxies, max_failures=2, quarantine_time=60000)
+        for _ in range(20):
+            proxy_pool.record(proxies[0], success=True, latency=100)
+            proxy_pool.record(proxies[1], success=True, latency=1000)
+        picks = [proxy_pool.pick()["server"] for _ in range(200)]
+        self.assertGreater(picks.count("http://a:1"), 150)
+
+        # Perform assertions: the failing proxy is quarantined, the other one is picked
+        proxy_pool.record(proxies[0], success=False)
+        proxy_pool.record(proxies[0], success=False, captcha=True)
+        self.assertTrue(proxy_pool.stats()["http://a:1"]["quarantined"])
+        self.assertEqual({proxy_pool.pick()["server"] for _ in range(20)}, {"http://b:1"})
+
+    def test_success_with_an_empty_error_is_recorded_as_success(self):
+        proxy_pool = ProxyPool([{"server": "http://a:1"}])
+
+        @with_proxy_pool()
+        def call(proxy_info=None):
+            return {"error": None, "data": 1}
+
+        call(proxy_pool=proxy_pool)
+
+        # Perform assertions
+        self.assertEqual(proxy_pool.stats()["http://a:1"]["success_rate"], 1)
+        self.assertIsNotNone(proxy_pool.stats()["http://a:1"]["latency"])
+
+    def test_intercept_json_playwright_records_proxy(self):
+        # Mock the Page object, which never receives the target response
+        mock_pool, mock_page = self._mock_pool()
+        proxy_pool = ProxyPool([{"server": "http://a:1"}])
+
+        intercept_json_playwright(
+            page_url="https://example.com",
+            json_url_subpart="/api/activity",
+            pool=mock_pool,
+            wait_until="commit",
+            timeout=10,
+            proxy_pool=proxy_pool,
+        )
+
+        # Perform assertions: the page gets the picked proxy, which gets the failure
+        self.assertEqual(
+            mock_pool.page.call_args.kwargs["proxy_info"], {"server": "http://a:1"}
+        )
+        self.assertEqual(proxy_pool.stats()["http://a:1"]["nb_calls"], 1)
+        self.assertLess(proxy_pool.stats()["http://a:1"]["success_rate"], 1)
+
+
+class TestBrowserPoolContexts(unittest.TestCase):
+    def test_contexts_are_reset_and_recycled(self):
+        # Mock the launched browser
+        mock_browser = MagicMock()
+        pool = BrowserPool(keep_contexts=1, recycle_after=2)
+        pool._acquire_browser = MagicMock(return_value=mock_browser)
+
+        for _ in range(3):
+            with pool.page(cookies=[{"name": "a", "value": "1", "url": "https://a.b"}]):
+                pass
+
+        # the context is reused once, then recycled after serving 2 pages
+        self.assertEqual(mock_browser.new_context.call_count, 2)
+        mock_context = mock_browser.new_context.return_value
+        self.assertEqual(mock_context.clear_cookies.call_count, 2)
+        mock_context.close.assert_called_once()
+
+    def test_storage_is_cleared_after_a_blank_stopped_job(self):
+        # Mock the launched browser, whose page is left on about:blank by early_stop
+        mock_browser = MagicMock()
+        mock_context = mock_browser.new_context.return_value
+        mock_context.pages = [MagicMock(frames=[MagicMock(url="about:blank")])]
+        pool = BrowserPool(keep_contexts=1)
+        pool._acquire_browser = MagicMock(return_value=mock_browser)
+
+        with pool.page():
+            # the page was redirected to another origin, which stored data
+            on_request = next(
+                c.args[1]
+                for c in mock_context.on.call_args_list
+                if c.args[0] == "request"
+            )
+            for url in ["https://example.com/", "https://www.example.com/api/items"]:
+                on_request(MagicMock(url=url))
+
+        # Perform assertions: both origins are cleared, then forgotten
+        mock_cdp_session = mock_context.new_cdp_session.return_value
+        self.assertEqual(
+            [c.args[1]["origin"] for c in mock_cdp_session.send.call_args_list],
+            ["https://example.com", "https://www.example.com"],
+        )
+        mock_cdp_session.reset_mock()
+        with pool.page():
+            pass
+        mock_cdp_session.send.assert_not_called()
+
+    def test_recording_context_is_closed_and_replay_is_strict(self):
+        # Mock the launched browser
+        mock_browser = MagicMock()
+        pool = BrowserPool(keep_contexts=1)
+        pool._acquire_browser = MagicMock(return_value=mock_browser)
+
+        with pool.page(record_har="run.har"):
+            pass
+        with pool.page(replay_har="run.har"):
+            pass
+
+        # the recording context is closed to save the HAR, never reused
+        self.assertEqual(
+            mock_browser.new_context.call_args_list[0].kwargs["record_har_path"],
+            "run.har",
+        )
+        self.assertEqual(mock_browser.new_context.call_count, 2)
+        mock_context = mock_browser.new_context.return_value
+        mock_context.route_from_har.assert_called_once_with(
+            "run.har", not_found="abort"
+        )
+        mock_context.close.assert_called_once()
+
+
 if __name__ == "__main__":
     unittest.main()
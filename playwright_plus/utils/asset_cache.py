@@ -0,0 +1,252 @@
+# Built-in imports
+import email.utils
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+__all__ = [
+    "AssetCache",
+]
+
+# Response headers which do not describe the stored (decoded) body
+UNSTORED_HEADERS = [
+    "connection",
+    "content-encoding",
+    "content-length",
+    "transfer-encoding",
+]
+
+
+def _parse_http_date(value: str) -> float | None:
+    """Return the timestamp of an HTTP date header, or None if it is invalid."""
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _freshness_lifetime(headers: dict, now: float) -> float | None:
+    """Return how long a response stays fresh in seconds, or None if it must not be stored."""
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+    max_age = re.search(r"max-age=(\d+)", cache_control)
+    if max_age:
+        return float(max_age.group(1))
+    if "expires" in headers:
+        expires = _parse_http_date(headers["expires"])
+        return max(expires - now, 0.0) if expires else 0.0
+    if "last-modified" in headers:
+        # heuristic freshness: 10% of the time since the last modification
+        last_modified = _parse_http_date(headers["last-modified"])
+        return max((now - last_modified) / 10, 0.0) if last_modified else 0.0
+    if "etag" in headers:
+        return 0.0
+    return None
+
+
+class AssetCache:
+    """On-disk cache of static asset responses, shared by the browser contexts.
+
+    The bodies are stored once per content, under their sha256 digest, and indexed by URL
+    in a sqlite database with their headers and expiry date computed from Cache-Control,
+    Expires or Last-Modified. When the total size of the bodies exceeds `max_size`, the
+    least recently used entries are evicted. An instance can be shared between threads.
+
+    Args:
+        directory (str): Directory of the cache, created if needed.
+        max_size (int, optional): Maximum total size of the stored bodies in bytes (default 500 MB).
+    """
+
+    def __init__(self, directory: str, max_size: int = 500 * 1024**2):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS assets (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        # the uses of a body are counted and the entries evicted without full scans
+        self._db.execute("CREATE INDEX IF NOT EXISTS assets_digest ON assets (digest)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS assets_last_access ON assets (last_access)"
+        )
+        self._db.commit()
+        # total size of the stored bodies, kept up to date by the stores and deletions
+        self._total_size = self._stored_size()
+
+    def _stored_size(self) -> int:
+        (size,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM assets)"
+        ).fetchone()
+        return size
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def get(self, url: str) -> dict | None:
+        """Return the cached response of a URL, if any.
+
+        Args:
+            url (str): URL of the asset.
+
+        Returns:
+            dict: The status, headers and body of the response, and whether it is still fresh, or None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, status, headers, size, expires_at FROM assets "
+                "WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            digest, status, headers, size, expires_at = row
+            try:
+                with open(self._path(digest), "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                self._delete(url, digest, size)
+                self._db.commit()
+                return None
+
+            now = time.time()
+            self._db.execute(
+                "UPDATE assets SET last_access = ? WHERE url = ?", (now, url)
+            )
+            self._db.commit()
+            return {
+                "status": status,
+                "headers": json.loads(headers),
+                "body": body,
+                "fresh": now < expires_at,
+            }
+
+    def put(self, url: str, status: int, headers: dict, body: bytes) -> bool:
+        """Store a response if its headers allow it.
+
+        Args:
+            url (str): URL of the asset.
+            status (int): Status of the response.
+            headers (dict): Headers of the response, with lower case names.
+            body (bytes): Decoded body of the response.
+
+        Returns:
+            bool: Whether the response was stored.
+        """
+        with self._lock:
+            now = time.time()
+            lifetime = _freshness_lifetime(headers, now)
+            if status != 200 or lifetime is None or len(body) > self.max_size:
+                return False
+
+            digest = hashlib.sha256(body).hexdigest()
+            path = self._path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(body)
+
+            headers = {k: v for k, v in headers.items() if k not in UNSTORED_HEADERS}
+            previous = self._db.execute(
+                "SELECT digest, size FROM assets WHERE url = ?", (url,)
+            ).fetchone()
+            if not self._is_used(digest):
+                self._total_size += len(body)
+            self._db.execute(
+                "INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    digest,
+                    status,
+                    json.dumps(headers),
+                    len(body),
+                    now + lifetime,
+                    now,
+                ),
+            )
+            if previous and previous[0] != digest:
+                self._delete_unused(*previous)
+            self._evict()
+            self._db.commit()
+            return True
+
+    def refresh(self, url: str, headers: dict):
+        """Extend the freshness of a cached response after a 304 Not Modified answer.
+
+        Args:
+            url (str): URL of the asset.
+            headers (dict): Headers of the 304 response, with lower case names.
+        """
+        with self._lock:
+            now = time.time()
+            lifetime = _freshness_lifetime(headers, now) or 0.0
+            self._db.execute(
+                "UPDATE assets SET expires_at = ?, last_access = ? WHERE url = ?",
+                (now + lifetime, now, url),
+            )
+            self._db.commit()
+
+    def _is_used(self, digest: str) -> bool:
+        row = self._db.execute(
+            "SELECT 1 FROM assets WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone()
+        return row is not None
+
+    def _delete(self, url: str, digest: str, size: int):
+        self._db.execute("DELETE FROM assets WHERE url = ?", (url,))
+        self._delete_unused(digest, size)
+
+    def _delete_unused(self, digest: str, size: int):
+        if not self._is_used(digest):
+            self._total_size -= size
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        while self._total_size > self.max_size:
+            # the least recently used entries whose sizes add up to the excess, read in
+            # one query: more are only needed when some of them share their body
+            excess = self._total_size - self.max_size
+            cursor = self._db.execute(
+                "SELECT url, digest, size FROM assets ORDER BY last_access"
+            )
+            rows = []
+            for row in cursor:
+                rows.append(row)
+                excess -= row[2]
+                if excess <= 0:
+                    break
+            cursor.close()
+            if not rows:
+                return
+            for url, digest, size in rows:
+                if self._total_size <= self.max_size:
+                    break
+                self._delete(url, digest, size)
+
+    def close(self):
+        """Close the index database."""
+        with self._lock:
+            self._db.close()
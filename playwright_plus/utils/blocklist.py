@@ -0,0 +1,161 @@
+# Built-in imports
+from collections import deque
+from urllib.parse import urlsplit
+
+__all__ = [
+    "DomainMatcher",
+    "UrlPatternMatcher",
+    "read_blocklist",
+]
+
+
+# Names of the local machine in hosts files, which are not blocked
+LOCAL_HOSTS = {
+    "0.0.0.0",
+    "broadcasthost",
+    "ip6-allhosts",
+    "ip6-allnodes",
+    "ip6-allrouters",
+    "ip6-localhost",
+    "ip6-loopback",
+    "local",
+    "localhost",
+    "localhost.localdomain",
+}
+
+
+def read_blocklist(path: str) -> list[str]:
+    """Read a blocklist file, one domain or URL pattern per line.
+
+    Args:
+        path (str): Path of the file. Empty lines, lines starting with "#" or "!" and comments starting with " #" are skipped, hosts file lines ("0.0.0.0 domain1 domain2") are reduced to their domains, except the names of the local machine (LOCAL_HOSTS), and adblock domain rules ("||domain^") to their domain.
+
+    Returns:
+        list[str]: The entries of the blocklist.
+    """
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(("#", "!")):
+                continue
+            if line.startswith("||"):
+                entries.append(line[2:].split("^")[0])
+                continue
+            fields = []
+            for field in line.split():
+                if field.startswith("#"):
+                    break
+                fields.append(field)
+            # a hosts file line starts with the address the domains resolve to
+            for entry in fields[1:] if len(fields) > 1 else fields:
+                if entry.lower() not in LOCAL_HOSTS:
+                    entries.append(entry)
+    return entries
+
+
+class DomainMatcher:
+    """Match hosts against a list of domains, including their subdomains.
+
+    The domains are stored in a trie of their labels, read from the top level domain,
+    so a lookup costs one dict access per label of the host whatever the size of the list.
+
+    Args:
+        domains (list[str]): Domains to match, e.g. ["doubleclick.net", "google-analytics.com"].
+    """
+
+    # key of the trie nodes ending a domain of the list
+    _END = ""
+
+    def __init__(self, domains: list[str] = ()):
+        self._root = {}
+        self.nb_domains = 0
+        for domain in domains:
+            self.add(domain)
+
+    def add(self, domain: str):
+        """Add a domain, and therefore its subdomains, to the matcher."""
+        node = self._root
+        for label in reversed(domain.strip(".").lower().split(".")):
+            node = node.setdefault(label, {})
+        if self._END not in node:
+            node[self._END] = True
+            self.nb_domains += 1
+
+    def matches(self, host: str) -> bool:
+        """Return whether the host is one of the domains or one of their subdomains."""
+        node = self._root
+        for label in reversed(host.lower().split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+    def matches_url(self, url: str) -> bool:
+        """Return whether the host of the URL is one of the domains or one of their subdomains."""
+        return self.matches(urlsplit(url).hostname or "")
+
+
+class UrlPatternMatcher:
+    """Match URLs containing any of a list of substrings.
+
+    The patterns are compiled into an Aho-Corasick automaton, so a lookup reads each
+    character of the URL once whatever the number of patterns.
+
+    Args:
+        patterns (list[str]): Substrings to look for, e.g. ["/gtag/js", "/analytics.js"].
+    """
+
+    def __init__(self, patterns: list[str] = ()):
+        # transitions, failure link and whether a pattern ends, for each automaton state
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [False]
+        self.nb_patterns = 0
+        for pattern in patterns:
+            self._add(pattern.lower())
+        self._build_failure_links()
+
+    def _add(self, pattern: str):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(False)
+            state = next_state
+        if not self._output[state]:
+            self._output[state] = True
+            self.nb_patterns += 1
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # a state matches if a pattern ends at its longest proper suffix
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def matches(self, url: str) -> bool:
+        """Return whether the URL contains one of the patterns."""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in url.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                return True
+        return False
@@ -57,3 +57,17 @@ class PlaywrightInterceptJsonError(PlaywrightPlusException):
     status_code = 400
     error = "PlaywrightInterceptError"
     error_message = "An empty json was collected after calling the hidden API."
+
+
+class PlaywrightPoolError(PlaywrightPlusException):
+    error_code = 3
+    status_code = 500
+    error = "PlaywrightPoolError"
+    error_message = "The browser pool could not provide a page."
+
+
+class PlaywrightWorkerError(PlaywrightPlusException):
+    error_code = 4
+    status_code = 500
+    error = "PlaywrightWorkerError"
+    error_message = "The worker process running the job stopped unexpectedly."
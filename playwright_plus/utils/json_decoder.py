@@ -0,0 +1,67 @@
+# Built-in imports
+import json
+
+__all__ = [
+    "JSON_DECODERS",
+    "decode_json",
+    "get_json_decoder",
+    "set_json_decoder",
+]
+
+# Decoders of JSON bodies by name, from bytes to Python objects
+JSON_DECODERS = {"json": json.loads}
+try:
+    import orjson
+
+    JSON_DECODERS["orjson"] = orjson.loads
+except ImportError:
+    pass
+try:
+    import ujson
+
+    JSON_DECODERS["ujson"] = ujson.loads
+except ImportError:
+    pass
+
+# The fastest installed decoder is used by default
+_json_decoder = JSON_DECODERS.get("orjson") or JSON_DECODERS.get("ujson") or json.loads
+
+
+def get_json_decoder() -> callable:
+    """Return the function decoding the captured JSON bodies."""
+    return _json_decoder
+
+
+def set_json_decoder(decoder: str = "json") -> callable:
+    """Set the function decoding the captured JSON bodies.
+
+    Args:
+        decoder (str | callable, optional): Name of an installed decoder of JSON_DECODERS ("json", "orjson" or "ujson"), or a function taking the body bytes and returning the decoded data (default "json", the standard library).
+
+    Returns:
+        callable: The previous decoder, to restore it.
+    """
+    global _json_decoder
+    if isinstance(decoder, str):
+        if decoder not in JSON_DECODERS:
+            raise ValueError(
+                f"JSON decoder {decoder} is not installed, choose one of {sorted(JSON_DECODERS)}"
+            )
+        decoder = JSON_DECODERS[decoder]
+    previous, _json_decoder = _json_decoder, decoder
+    return previous
+
+
+def decode_json(body: bytes):
+    """Decode a JSON body with the current decoder.
+
+    The bodies that a fast decoder rejects, such as NaN values or integers over 64 bits
+    for orjson, are decoded again by the standard library, so every decoder accepts the
+    same bodies.
+    """
+    try:
+        return _json_decoder(body)
+    except ValueError:
+        if _json_decoder is json.loads:
+            raise
+        return json.loads(body)
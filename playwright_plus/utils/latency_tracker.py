@@ -0,0 +1,199 @@
+# Built-in imports
+import json
+import math
+import os
+import threading
+
+__all__ = [
+    "LatencyTracker",
+    "QuantileSketch",
+    "get_default_latency_tracker",
+    "set_default_latency_tracker",
+]
+
+
+class QuantileSketch:
+    """Streaming sketch of the quantiles of positive values, within a relative accuracy.
+
+    The values are counted in buckets whose bounds grow geometrically, so the sketch keeps
+    a few hundred counts whatever the number of values, and a quantile is off by at most
+    `relative_accuracy` of its value. Once the values reach `max_count`, the counts are
+    halved, so that recent values weigh more than old ones.
+
+    Args:
+        relative_accuracy (float, optional): Maximum relative error of the quantiles (default 0.01).
+        max_count (float, optional): Number of values from which the counts are halved (default 1000).
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_count: float = 1000):
+        self.relative_accuracy = relative_accuracy
+        self.max_count = max_count
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        # bucket index -> count of the values in ]gamma**(index-1), gamma**index]
+        self.buckets = {}
+        # count of the values too small to have a bucket, i.e. 0
+        self.zero_count = 0.0
+        self.count = 0.0
+
+    def add(self, value: float):
+        """Count a value."""
+        if value < 1e-3:
+            self.zero_count += 1
+        else:
+            index = math.ceil(math.log(value, self._gamma))
+            self.buckets[index] = self.buckets.get(index, 0.0) + 1
+        self.count += 1
+        if self.count >= self.max_count:
+            self.zero_count /= 2
+            self.buckets = {i: c / 2 for i, c in self.buckets.items() if c > 0.5}
+            self.count = self.zero_count + sum(self.buckets.values())
+
+    def quantile(self, q: float) -> float:
+        """Return the value below which a fraction `q` of the values is, or None without values."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = self.zero_count
+        if seen >= rank:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # middle of the bucket, in relative terms
+                return 2 * self._gamma**index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.buckets) / (self._gamma + 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_count": self.max_count,
+            "zero_count": self.zero_count,
+            "buckets": {str(i): c for i, c in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"], data["max_count"])
+        sketch.zero_count = data["zero_count"]
+        sketch.buckets = {int(i): c for i, c in data["buckets"].items()}
+        sketch.count = sketch.zero_count + sum(sketch.buckets.values())
+        return sketch
+
+
+class LatencyTracker:
+    """Latencies observed per domain, from which timeouts suited to each domain are derived.
+
+    The intercept functions record their navigation and capture times when they are given
+    a tracker, and use it to choose their timeouts when they are called with
+    `timeout="auto"` or `goto_timeout="auto"`. A derived timeout is the `quantile` of the
+    recorded latencies times `margin`, within `min_timeout` and `max_timeout`, or the
+    default timeout of the caller until `min_samples` latencies were recorded. The sketches
+    are saved as JSON at `path` every `save_every` records. An instance can be shared
+    between threads.
+
+    Args:
+        path (str, optional): Path of the JSON file keeping the sketches across restarts (default None, i.e. memory only).
+        quantile (float, optional): Quantile of the latencies the timeouts are derived from (default 0.99).
+        margin (float, optional): Factor applied to the quantile (default 1.5).
+        min_samples (int, optional): Number of latencies of a domain before its timeouts are derived (default 20).
+        min_timeout (float, optional): Minimum derived timeout in milliseconds (default 1000).
+        max_timeout (float, optional): Maximum derived timeout in milliseconds (default 60000).
+        save_every (int, optional): Number of records after which the sketches are saved (default 20).
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        quantile: float = 0.99,
+        margin: float = 1.5,
+        min_samples: int = 20,
+        min_timeout: float = 1000,
+        max_timeout: float = 60000,
+        save_every: int = 20,
+    ):
+        self.path = path
+        self.quantile = quantile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        # (domain, metric) -> QuantileSketch of the latencies in milliseconds
+        self._sketches = {}
+        self._nb_unsaved = 0
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for domain, metrics in json.load(f).items():
+                    for metric, sketch in metrics.items():
+                        self._sketches[domain, metric] = QuantileSketch.from_dict(sketch)
+
+    def __len__(self) -> int:
+        return len(self._sketches)
+
+    def record(self, domain: str, metric: str, milliseconds: float):
+        """Record a latency of a domain, e.g. for the "capture" or "navigation" metric."""
+        with self._lock:
+            sketch = self._sketches.get((domain, metric))
+            if sketch is None:
+                sketch = self._sketches[domain, metric] = QuantileSketch()
+            sketch.add(milliseconds)
+            self._nb_unsaved += 1
+            if self.path and self._nb_unsaved >= self.save_every:
+                self._save()
+
+    def latency(self, domain: str, metric: str, q: float = None) -> float:
+        """Return the `q` quantile (default `quantile`) of the latencies of a domain, or None if unknown."""
+        with self._lock:
+            sketch = self._sketches.get((domain, metric))
+            if sketch is None:
+                return None
+            return sketch.quantile(self.quantile if q is None else q)
+
+    def timeout(self, domain: str, metric: str, default: float) -> float:
+        """Return the timeout in milliseconds suited to a domain, or `default` until enough latencies are known."""
+        with self._lock:
+            sketch = self._sketches.get((domain, metric))
+            if sketch is None or sketch.count < self.min_samples:
+                return default
+            latency = sketch.quantile(self.quantile)
+        return min(max(latency * self.margin, self.min_timeout), self.max_timeout)
+
+    def save(self):
+        """Save the sketches at `path`."""
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        data = {}
+        for (domain, metric), sketch in self._sketches.items():
+            data.setdefault(domain, {})[metric] = sketch.to_dict()
+        # write a new file then replace the old one, which is never left half written
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self._nb_unsaved = 0
+
+
+_default_latency_tracker = None
+
+
+def set_default_latency_tracker(latency_tracker: LatencyTracker = None):
+    """Set the tracker used by the intercept functions called with `timeout="auto"` and no `latency_tracker`.
+
+    Args:
+        latency_tracker (LatencyTracker, optional): The tracker to use by default, or None for a tracker in memory (default None).
+    """
+    global _default_latency_tracker
+    _default_latency_tracker = latency_tracker
+
+
+def get_default_latency_tracker() -> LatencyTracker:
+    """Return the tracker used by default, creating a tracker in memory if none was set."""
+    global _default_latency_tracker
+    if _default_latency_tracker is None:
+        _default_latency_tracker = LatencyTracker()
+    return _default_latency_tracker
@@ -0,0 +1,124 @@
+# Built-in imports
+import re
+
+__all__ = [
+    "ResponseMatcher",
+    "as_response_matcher",
+]
+
+
+def _glob_to_regex(glob: str) -> re.Pattern:
+    """Compile a URL glob: "**" matches any characters, "*" any characters but "/" and "{a,b}" either a or b."""
+    regex = ""
+    i = 0
+    while i < len(glob):
+        if glob.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        char = glob[i]
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "{":
+            regex += "(?:"
+        elif char == "}":
+            regex += ")"
+        elif char == ",":
+            regex += "|"
+        else:
+            regex += re.escape(char)
+        i += 1
+    return re.compile(regex)
+
+
+def _as_list(value) -> list:
+    if value is None or isinstance(value, (list, tuple, set, range)):
+        return value
+    return [value]
+
+
+class ResponseMatcher:
+    """Tell whether a response is the hidden API response to intercept.
+
+    Every given criterion must match. They only read the URL, status, headers and request
+    of the response, which the response event already carries, so non-matching responses
+    are discarded without fetching their body from the browser.
+
+    Args:
+        url (str | re.Pattern, optional): Substring of the URL, or a compiled regex searched in the URL (default None).
+        url_glob (str, optional): Glob matching the whole URL, e.g. "**/api/v*/items*" (default None).
+        method (str | list, optional): Allowed request methods, e.g. "GET" to skip the CORS preflights (default None).
+        status (int | list | range, optional): Allowed statuses, e.g. range(200, 300) to skip redirects and errors (default None).
+        resource_type (str | list, optional): Allowed resource types, e.g. ["xhr", "fetch"] (default None).
+        content_type (str | list, optional): Substrings of the Content-Type header, one of which must be present, e.g. "json" (default None).
+        predicate (callable, optional): Function taking the response and returning whether it matches, checked last (default None).
+    """
+
+    def __init__(
+        self,
+        url: str | re.Pattern = None,
+        url_glob: str = None,
+        method: str | list = None,
+        status: int | list | range = None,
+        resource_type: str | list = None,
+        content_type: str | list = None,
+        predicate: callable = None,
+    ):
+        self.url = url
+        self.url_glob = url_glob
+        self.method = [m.upper() for m in _as_list(method)] if method else None
+        self.status = _as_list(status)
+        self.resource_type = _as_list(resource_type)
+        self.content_type = (
+            [c.lower() for c in _as_list(content_type)] if content_type else None
+        )
+        self.predicate = predicate
+        self._url_glob_regex = _glob_to_regex(url_glob) if url_glob else None
+
+    def __repr__(self) -> str:
+        criteria = ", ".join(
+            f"{k}={v!r}" for k, v in vars(self).items() if v and not k.startswith("_")
+        )
+        return f"ResponseMatcher({criteria})"
+
+    def matches(self, response) -> bool:
+        """Return whether a Playwright response matches every criterion."""
+        if self.url is not None:
+            if isinstance(self.url, re.Pattern):
+                if not self.url.search(response.url):
+                    return False
+            elif self.url not in response.url:
+                return False
+        if self._url_glob_regex and not self._url_glob_regex.fullmatch(response.url):
+            return False
+        if self.status is not None and response.status not in self.status:
+            return False
+        if self.method and response.request.method.upper() not in self.method:
+            return False
+        if (
+            self.resource_type
+            and response.request.resource_type not in self.resource_type
+        ):
+            return False
+        if self.content_type:
+            content_type = response.headers.get("content-type", "").lower()
+            if not any(c in content_type for c in self.content_type):
+                return False
+        if self.predicate is not None and not self.predicate(response):
+            return False
+        return True
+
+    __call__ = matches
+
+
+def as_response_matcher(json_url_subpart) -> ResponseMatcher:
+    """Build a ResponseMatcher from a URL substring, a compiled regex, a predicate or a ResponseMatcher."""
+    if isinstance(json_url_subpart, ResponseMatcher):
+        return json_url_subpart
+    if isinstance(json_url_subpart, (str, re.Pattern)):
+        return ResponseMatcher(url=json_url_subpart)
+    if callable(json_url_subpart):
+        return ResponseMatcher(predicate=json_url_subpart)
+    raise TypeError(
+        f"json_url_subpart must be a string, a regex, a predicate or a ResponseMatcher, not {type(json_url_subpart).__name__}"
+    )
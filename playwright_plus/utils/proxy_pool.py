@@ -0,0 +1,211 @@
+# Built-in imports
+import functools
+import inspect
+import logging
+import random
+import threading
+import time
+
+# Local functions and relative imports
+from utils.retry_policy import _error_key
+
+__all__ = [
+    "ProxyPool",
+    "with_proxy_pool",
+]
+
+
+class _ProxyStats:
+    """Recent performance of a proxy, as moving averages."""
+
+    def __init__(self, proxy_info: dict):
+        self.proxy_info = proxy_info
+        # optimistic until the first calls, so that every proxy gets tried
+        self.success_rate = 1.0
+        self.captcha_rate = 0.0
+        self.latency = None
+        self.nb_calls = 0
+        self.nb_failures_in_row = 0
+        self.quarantined_until = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "success_rate": self.success_rate,
+            "captcha_rate": self.captcha_rate,
+            "latency": self.latency,
+            "nb_calls": self.nb_calls,
+            "quarantined": self.quarantined_until > time.monotonic(),
+        }
+
+
+class ProxyPool:
+    """Proxies picked per call according to their recent success rate, captcha rate and latency.
+
+    The intercept functions called with a `proxy_pool` and no `proxy_info` use a proxy
+    picked by the pool and record how the call went. A proxy is picked at random with a
+    weight of its success rate times its rate of calls without captcha, divided by its
+    latency, each an exponential moving average of weight `alpha` on the last call. After
+    `max_failures` failed calls in a row, a proxy is quarantined for `quarantine_time` ms,
+    then a single failure quarantines it again. When every proxy is quarantined, the one
+    released first is picked.
+
+    With a BrowserPool (the `pool` kwarg or the default pool), the proxy is set per browser
+    context, so a single browser serves every proxy of the pool. An instance can be shared
+    between threads.
+
+    Args:
+        proxies (list): `proxy_info` dicts, e.g. {"server": "http://proxyserver:port"}.
+        alpha (float, optional): Weight of the last call in the moving averages (default 0.2).
+        max_failures (int, optional): Number of failed calls in a row which quarantines a proxy (default 3).
+        quarantine_time (float, optional): Duration of a quarantine in milliseconds (default 60000).
+        default_latency (float, optional): Latency of the proxies without successful call yet, in milliseconds (default 1000).
+    """
+
+    def __init__(
+        self,
+        proxies: list,
+        alpha: float = 0.2,
+        max_failures: int = 3,
+        quarantine_time: float = 60000,
+        default_latency: float = 1000,
+    ):
+        if not proxies:
+            raise ValueError("a ProxyPool needs at least one proxy")
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.quarantine_time = quarantine_time
+        self.default_latency = default_latency
+        self._lock = threading.Lock()
+        # proxy server -> _ProxyStats
+        self._stats = {proxy["server"]: _ProxyStats(proxy) for proxy in proxies}
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def __contains__(self, proxy_info: dict) -> bool:
+        return isinstance(proxy_info, dict) and proxy_info.get("server") in self._stats
+
+    def _weight(self, stats: _ProxyStats) -> float:
+        latency = stats.latency or self.default_latency
+        # a floor keeps every available proxy in use, so that it can recover
+        return max(stats.success_rate * (1 - stats.captcha_rate), 0.01) / latency
+
+    def pick(self) -> dict:
+        """Return the `proxy_info` of a proxy, picked by recent performance among the available ones."""
+        with self._lock:
+            now = time.monotonic()
+            available = [s for s in self._stats.values() if s.quarantined_until <= now]
+            if not available:
+                stats = min(self._stats.values(), key=lambda s: s.quarantined_until)
+                return stats.proxy_info
+            weights = [self._weight(s) for s in available]
+            return random.choices(available, weights)[0].proxy_info
+
+    def record(
+        self,
+        proxy_info: dict,
+        success: bool,
+        latency: float = None,
+        captcha: bool = False,
+    ):
+        """Record how a call through a proxy went.
+
+        Args:
+            proxy_info (dict): The proxy of the call. The proxies which are not in the pool are ignored.
+            success (bool): Whether the call returned its data.
+            latency (float, optional): Duration of the successful call in milliseconds (default None).
+            captcha (bool, optional): Whether the call raised a captcha, which is a failure (default False).
+        """
+        if proxy_info not in self:
+            return
+        with self._lock:
+            stats = self._stats[proxy_info["server"]]
+            stats.nb_calls += 1
+            stats.success_rate += self.alpha * (success - stats.success_rate)
+            stats.captcha_rate += self.alpha * (captcha - stats.captcha_rate)
+            if success:
+                stats.nb_failures_in_row = 0
+                if latency is not None:
+                    if stats.latency is None:
+                        stats.latency = latency
+                    else:
+                        stats.latency += self.alpha * (latency - stats.latency)
+                return
+            stats.nb_failures_in_row += 1
+            if stats.nb_failures_in_row >= self.max_failures:
+                stats.quarantined_until = time.monotonic() + self.quarantine_time / 1000
+                # on probation once released: the next failure quarantines it again
+                stats.nb_failures_in_row = self.max_failures - 1
+                logging.debug(
+                    f"[playwright_plus] proxy {proxy_info['server']} quarantined for {self.quarantine_time} ms"
+                )
+
+    def stats(self) -> dict:
+        """Return the performance of each proxy, by proxy server."""
+        with self._lock:
+            return {server: s.to_dict() for server, s in self._stats.items()}
+
+
+def with_proxy_pool():
+    """Decorator running a function through a proxy of the ProxyPool given as `proxy_pool` kwarg.
+
+    When the call gets no `proxy_info`, it gets the proxy picked by the pool. A call
+    returning an error envelope or raising is a failure of its proxy, a "CaptchaRaisedError"
+    a captcha, and the duration of the other calls is the latency of the proxy.
+
+    Returns:
+        callable: A decorator function. Without a `proxy_pool` kwarg, the calls are unchanged.
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_func_wrapper(*args, **kwargs):
+                proxy_pool = kwargs.pop("proxy_pool", None)
+                if proxy_pool is None:
+                    return await func(*args, **kwargs)
+                if kwargs.get("proxy_info") is None:
+                    kwargs["proxy_info"] = proxy_pool.pick()
+                start = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception:
+                    proxy_pool.record(kwargs["proxy_info"], success=False)
+                    raise
+                key = _error_key(result)
+                proxy_pool.record(
+                    kwargs["proxy_info"],
+                    success=key is None,
+                    latency=(time.perf_counter() - start) * 1000,
+                    captcha=key == "CaptchaRaisedError",
+                )
+                return result
+
+            return async_func_wrapper
+
+        @functools.wraps(func)
+        def func_wrapper(*args, **kwargs):
+            proxy_pool = kwargs.pop("proxy_pool", None)
+            if proxy_pool is None:
+                return func(*args, **kwargs)
+            if kwargs.get("proxy_info") is None:
+                kwargs["proxy_info"] = proxy_pool.pick()
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                proxy_pool.record(kwargs["proxy_info"], success=False)
+                raise
+            key = _error_key(result)
+            proxy_pool.record(
+                kwargs["proxy_info"],
+                success=key is None,
+                latency=(time.perf_counter() - start) * 1000,
+                captcha=key == "CaptchaRaisedError",
+            )
+            return result
+
+        return func_wrapper
+
+    return decorator
@@ -0,0 +1,300 @@
+# Built-in imports
+import functools
+import inspect
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+__all__ = [
+    "ResultCache",
+    "with_result_cache",
+]
+
+# Default value of ResultCache.get telling a missing result from a cached None
+_MISSING = object()
+# Tokens of the callables without a path, see _callable_token
+_PROCESS_TOKEN = os.urandom(4).hex()
+_callable_tokens = weakref.WeakKeyDictionary()
+_callable_counter = itertools.count()
+_callable_tokens_lock = threading.Lock()
+
+
+def _is_error_result(result) -> bool:
+    """Tell whether a result is an error envelope, such as the ones of PlaywrightInterceptError."""
+    # a successful result may carry an empty error, e.g. {"error": None, "data": ...}
+    return isinstance(result, dict) and bool(result.get("error"))
+
+
+class ResultCache:
+    """Cache of intercepted results, in memory and optionally on disk.
+
+    The results are stored as JSON, so each hit returns a new copy, and results which are
+    not JSON serializable are not cached. The memory tier keeps the most recently used
+    results within `max_entries` and `max_bytes`. The disk tier is a sqlite database which
+    survives restarts and refills the memory tier on a hit. An instance can be shared
+    between threads.
+
+    Args:
+        ttl (float, optional): Lifetime of the results in seconds (default 600).
+        negative_ttl (float, optional): Lifetime of the error results in seconds, 0 not to cache them (default 60).
+        max_entries (int, optional): Maximum number of results kept in memory (default 1024).
+        max_bytes (int, optional): Maximum total size of the results kept in memory, in bytes of JSON (default None, i.e. no limit).
+        path (str, optional): Path of the sqlite database of the disk tier (default None, i.e. memory only).
+        disk_max_bytes (int, optional): Maximum total size of the results kept on disk, in bytes of JSON (default 100 MB).
+        is_error (callable, optional): Function telling whether a result is an error (default: a dict with an "error" key, as the error envelopes).
+    """
+
+    def __init__(
+        self,
+        ttl: float = 600,
+        negative_ttl: float = 60,
+        max_entries: int = 1024,
+        max_bytes: int = None,
+        path: str = None,
+        disk_max_bytes: int = 100 * 1024**2,
+        is_error: callable = None,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.is_error = is_error or _is_error_result
+        self._lock = threading.RLock()
+        # key -> (expiry timestamp, JSON of the result), the most recently used last
+        self._entries = OrderedDict()
+        self._nb_bytes = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, default=None):
+        """Return a copy of the cached result of a key, or `default` if it is missing or expired."""
+        with self._lock:
+            now = time.time()
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    return json.loads(entry[1])
+                self._pop(key)
+
+            if self._db is None:
+                return default
+            row = self._db.execute(
+                "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return default
+            value, expires_at = row
+            if expires_at <= now:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._db.commit()
+                return default
+            self._db.execute(
+                "UPDATE results SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            self._set_in_memory(key, value, expires_at)
+            return json.loads(value)
+
+    def set(self, key: str, result) -> bool:
+        """Cache a result, for `negative_ttl` seconds if it is an error, else `ttl` seconds.
+
+        Returns:
+            bool: Whether the result was cached.
+        """
+        ttl = self.negative_ttl if self.is_error(result) else self.ttl
+        if not ttl or ttl <= 0:
+            return False
+        try:
+            value = json.dumps(result)
+        except (TypeError, ValueError):
+            return False
+
+        with self._lock:
+            now = time.time()
+            self._set_in_memory(key, value, now + ttl)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now + ttl, now),
+                )
+                self._db.commit()
+                self._evict_from_disk()
+        return True
+
+    def _set_in_memory(self, key: str, value: str, expires_at: float):
+        self._pop(key)
+        self._entries[key] = (expires_at, value)
+        self._nb_bytes += len(value)
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._nb_bytes > self.max_bytes)
+        ):
+            # evict the least recently used result
+            self._pop(next(iter(self._entries)))
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._nb_bytes -= len(entry[1])
+
+    def _evict_from_disk(self):
+        (nb_bytes,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        for key, size in self._db.execute(
+            "SELECT key, size FROM results ORDER BY last_access"
+        ).fetchall():
+            if nb_bytes <= self.disk_max_bytes:
+                break
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            nb_bytes -= size
+        self._db.commit()
+
+    def clear(self):
+        """Remove every cached result, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._nb_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def close(self):
+        """Close the database of the disk tier."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def _has_path(value) -> bool:
+    """Tell whether a function or class can be found by its module and qualified name."""
+    obj = sys.modules.get(value.__module__)
+    for name in value.__qualname__.split("."):
+        obj = getattr(obj, name, None)
+    return obj is value
+
+
+def _callable_token(value) -> str:
+    """Return a token identifying an object in this process, never reused after it is collected.
+
+    Raises:
+        TypeError: If the object does not support weak references.
+    """
+    with _callable_tokens_lock:
+        token = _callable_tokens.get(value)
+        if token is None:
+            token = f"{_PROCESS_TOKEN}:{next(_callable_counter)}"
+            _callable_tokens[value] = token
+    return token
+
+
+def _key_default(value) -> str:
+    # the module-level functions are named by their path, which is the same after a
+    # restart, unlike their repr. Lambdas, closures and bound methods sharing a path may
+    # compute different results, so they are named by the instance, in this process only
+    if inspect.ismethod(value):
+        return f"{_key_default(value.__func__)}@{_callable_token(value.__self__)}"
+    if callable(value) and hasattr(value, "__qualname__"):
+        path = f"{value.__module__}.{value.__qualname__}"
+        if _has_path(value):
+            return path
+        return f"{path}@{_callable_token(value)}"
+    return repr(value)
+
+
+def _call_key(
+    func, signature: inspect.Signature, args: tuple, kwargs: dict, key_args=None
+) -> str:
+    """Identify a call of a function by the given arguments, or by all of them if `key_args` is None.
+
+    Raises:
+        TypeError: If an argument cannot be identified, e.g. a callable without path which does not support weak references.
+    """
+    arguments = signature.bind_partial(*args, **kwargs).arguments
+    # the arguments which are not parameters of the function are in its **kwargs
+    extra_kwargs = {}
+    for parameter in signature.parameters.values():
+        if parameter.kind == parameter.VAR_KEYWORD:
+            extra_kwargs = arguments.pop(parameter.name, {})
+    if key_args is None:
+        values = sorted({**arguments, **extra_kwargs}.items())
+    else:
+        values = [arguments.get(name, extra_kwargs.get(name)) for name in key_args]
+    return json.dumps([func.__qualname__, values], default=_key_default)
+
+
+def with_result_cache(*key_args: str):
+    """Decorator caching the results of a function in the ResultCache given as `result_cache` kwarg.
+
+    Args:
+        *key_args (str): Names of the arguments identifying a result, e.g. "page_url" and "json_url_subpart".
+
+    Returns:
+        callable: A decorator function. Without a `result_cache` kwarg, or with an argument which cannot be identified, the calls are not cached.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def cache_key(args: tuple, kwargs: dict) -> str:
+            try:
+                return _call_key(func, signature, args, kwargs, key_args)
+            except TypeError:
+                return None
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_func_wrapper(*args, **kwargs):
+                result_cache = kwargs.pop("result_cache", None)
+                key = None if result_cache is None else cache_key(args, kwargs)
+                if key is None:
+                    return await func(*args, **kwargs)
+                result = result_cache.get(key, _MISSING)
+                if result is _MISSING:
+                    result = await func(*args, **kwargs)
+                    result_cache.set(key, result)
+                return result
+
+            return async_func_wrapper
+
+        @functools.wraps(func)
+        def func_wrapper(*args, **kwargs):
+            result_cache = kwargs.pop("result_cache", None)
+            key = None if result_cache is None else cache_key(args, kwargs)
+            if key is None:
+                return func(*args, **kwargs)
+            result = result_cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(*args, **kwargs)
+                result_cache.set(key, result)
+            return result
+
+        return func_wrapper
+
+    return decorator
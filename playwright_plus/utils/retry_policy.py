@@ -0,0 +1,249 @@
+# Built-in imports
+import asyncio
+import functools
+import inspect
+import logging
+import random
+import time
+
+# Local functions and relative imports
+from utils.exceptions import PlaywrightPlusException
+
+__all__ = [
+    "RETRY_RULES",
+    "RetryPolicy",
+    "with_retry",
+]
+
+# Default rules by error code or error name: the navigation errors and captchas are often
+# tied to the proxy, the empty captures (code 1) are retried with the same proxy
+RETRY_RULES = {
+    "1": {"retry": True, "rotate_proxy": False},
+    "CaptchaRaisedError": {"retry": True, "rotate_proxy": True},
+    "PlaywrightGotoError": {"retry": True, "rotate_proxy": True},
+    "TimeoutError": {"retry": True, "rotate_proxy": True},
+}
+
+
+def _error_key(result) -> str:
+    """Return the error code of an error envelope, or its error name if it has no code."""
+    # a successful result may carry an empty error, e.g. {"error": None, "data": ...}
+    if isinstance(result, dict) and result.get("error"):
+        return str(result.get("error_code") or result["error"])
+    return None
+
+
+class RetryPolicy:
+    """When and how to retry a call whose result is an error.
+
+    A call is attempted up to `max_attempts` times, waiting between attempts a delay which
+    starts at `backoff` ms and is multiplied by `backoff_factor` after each attempt, up to
+    `max_backoff` ms, and reduced by a random fraction up to `jitter` so that failing calls
+    do not retry in lockstep. No attempt starts after `deadline` ms since the first one.
+
+    Each error is handled by the rule of its error code, else of its error name, else by
+    `default_rule`. A rule is a dict with "retry" (whether to retry the error),
+    "rotate_proxy" (whether the next attempt uses the next proxy of `proxies`) and
+    optionally "max_attempts" (a lower limit for this error).
+
+    Args:
+        max_attempts (int, optional): Maximum number of attempts, including the first one (default 3).
+        backoff (float, optional): Delay before the second attempt, in milliseconds (default 500).
+        backoff_factor (float, optional): Factor applied to the delay after each attempt (default 2).
+        max_backoff (float, optional): Maximum delay between two attempts, in milliseconds (default 10000).
+        jitter (float, optional): Maximum fraction of the delay removed at random, 1 for "full jitter" (default 1).
+        deadline (float, optional): Time after which no attempt starts, in milliseconds since the first one (default None, i.e. no deadline).
+        rules (dict, optional): Rules by error code or error name, added to RETRY_RULES (default None).
+        default_rule (dict, optional): Rule of the errors without their own (default: retry without rotating the proxy).
+        proxies (list, optional): `proxy_info` dicts the attempts rotate through, starting with the first one (default None, i.e. the proxy of the call).
+        error_key (callable, optional): Function returning the error code or name of a result, or None if it is not an error (default: the code of the error envelopes).
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff: float = 500,
+        backoff_factor: float = 2,
+        max_backoff: float = 10000,
+        jitter: float = 1,
+        deadline: float = None,
+        rules: dict = None,
+        default_rule: dict = None,
+        proxies: list = None,
+        error_key: callable = None,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.rules = {**RETRY_RULES, **(rules or {})}
+        self.default_rule = default_rule or {"retry": True, "rotate_proxy": False}
+        self.proxies = list(proxies or [])
+        self.error_key = error_key or _error_key
+
+    def rule(self, key: str) -> dict:
+        """Return the rule of an error code or name."""
+        return self.rules.get(key, self.default_rule)
+
+    def delay(self, attempt: int) -> float:
+        """Return the delay in milliseconds before the attempt following attempt number `attempt` (from 1)."""
+        delay = min(self.backoff * self.backoff_factor ** (attempt - 1), self.max_backoff)
+        return delay * (1 - self.jitter * random.random())
+
+    def next_attempt(self, attempt: int, key: str, started_at: float) -> tuple:
+        """Tell whether to retry after attempt number `attempt` failed with the error `key`.
+
+        Returns:
+            tuple: None if the call must not be retried, else the delay in milliseconds before the next attempt and whether it rotates the proxy.
+        """
+        rule = self.rule(key)
+        max_attempts = min(self.max_attempts, rule.get("max_attempts", self.max_attempts))
+        if not rule.get("retry", True) or attempt >= max_attempts:
+            return None
+        delay = self.delay(attempt)
+        if self.deadline is not None:
+            elapsed = (time.perf_counter() - started_at) * 1000
+            if elapsed + delay >= self.deadline:
+                return None
+        return delay, rule.get("rotate_proxy", False)
+
+
+def _exception_key(err: Exception) -> str:
+    if isinstance(err, PlaywrightPlusException):
+        return str(err.error_code)
+    return err.__class__.__name__
+
+
+def with_retry(pool_class=None, get_default_pool: callable = None):
+    """Decorator retrying a function according to the RetryPolicy given as `retry_policy` kwarg.
+
+    The results which are error envelopes and the Playwright and PlaywrightPlus exceptions
+    are retried, the other exceptions are raised at once. When the call gets no `pool` and
+    there is no default pool, a pool is opened for its attempts, so that they reuse the
+    same warm browser instead of launching one each, with the proxy set per context.
+
+    Args:
+        pool_class (type, optional): Class of the pool to open for the attempts, e.g. BrowserPool (default None, i.e. none).
+        get_default_pool (callable, optional): Function returning the default pool, if any (default None).
+
+    Returns:
+        callable: A decorator function. Without a `retry_policy` kwarg, the calls are made once.
+    """
+
+    def retryable(err: Exception) -> bool:
+        module = err.__class__.__module__ or ""
+        return isinstance(err, PlaywrightPlusException) or module.startswith("playwright")
+
+    def first_proxy(policy: RetryPolicy, kwargs: dict):
+        if policy.proxies and kwargs.get("proxy_info") is None:
+            kwargs["proxy_info"] = policy.proxies[0]
+
+    def rotate_proxy(policy: RetryPolicy, kwargs: dict):
+        if not policy.proxies:
+            return
+        try:
+            index = policy.proxies.index(kwargs.get("proxy_info"))
+        except ValueError:
+            index = -1
+        kwargs["proxy_info"] = policy.proxies[(index + 1) % len(policy.proxies)]
+
+    def own_pool(kwargs: dict):
+        if pool_class is None or kwargs.get("pool") is not None:
+            return None
+        if get_default_pool is not None and get_default_pool():
+            return None
+        return pool_class(
+            headless=kwargs.get("headless", True),
+            browser_type=kwargs.get("browser_type", "chromium"),
+        )
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_func_wrapper(*args, **kwargs):
+                policy = kwargs.pop("retry_policy", None)
+                if policy is None:
+                    return await func(*args, **kwargs)
+                first_proxy(policy, kwargs)
+                pool = own_pool(kwargs) if policy.max_attempts > 1 else None
+                if pool is not None:
+                    kwargs["pool"] = pool
+                started_at = time.perf_counter()
+                attempt = 0
+                try:
+                    while True:
+                        attempt += 1
+                        try:
+                            result = await func(*args, **kwargs)
+                            key = policy.error_key(result)
+                            if key is None:
+                                return result
+                            error = None
+                        except Exception as err:
+                            if not retryable(err):
+                                raise
+                            key, error = _exception_key(err), err
+                        next_attempt = policy.next_attempt(attempt, key, started_at)
+                        if next_attempt is None:
+                            if error is not None:
+                                raise error
+                            return result
+                        delay, rotate = next_attempt
+                        logging.debug(
+                            f"[playwright_plus] attempt {attempt} failed with {key}, retry in {delay:.0f} ms"
+                        )
+                        if rotate:
+                            rotate_proxy(policy, kwargs)
+                        await asyncio.sleep(delay / 1000)
+                finally:
+                    if pool is not None:
+                        await pool.close()
+
+            return async_func_wrapper
+
+        @functools.wraps(func)
+        def func_wrapper(*args, **kwargs):
+            policy = kwargs.pop("retry_policy", None)
+            if policy is None:
+                return func(*args, **kwargs)
+            first_proxy(policy, kwargs)
+            pool = own_pool(kwargs) if policy.max_attempts > 1 else None
+            if pool is not None:
+                kwargs["pool"] = pool
+            started_at = time.perf_counter()
+            attempt = 0
+            try:
+                while True:
+                    attempt += 1
+                    try:
+                        result = func(*args, **kwargs)
+                        key = policy.error_key(result)
+                        if key is None:
+                            return result
+                        error = None
+                    except Exception as err:
+                        if not retryable(err):
+                            raise
+                        key, error = _exception_key(err), err
+                    next_attempt = policy.next_attempt(attempt, key, started_at)
+                    if next_attempt is None:
+                        if error is not None:
+                            raise error
+                        return result
+                    delay, rotate = next_attempt
+                    logging.debug(
+                        f"[playwright_plus] attempt {attempt} failed with {key}, retry in {delay:.0f} ms"
+                    )
+                    if rotate:
+                        rotate_proxy(policy, kwargs)
+                    time.sleep(delay / 1000)
+            finally:
+                if pool is not None:
+                    pool.close()
+
+        return func_wrapper
+
+    return decorator
@@ -0,0 +1,146 @@
+# Built-in imports
+import asyncio
+import copy
+import functools
+import inspect
+import threading
+
+# Local functions and relative imports
+from utils.result_cache import _call_key
+
+__all__ = [
+    "with_single_flight",
+]
+
+
+# result of a call which cannot be deep copied, whose waiting calls run it themselves
+_NOT_SHARED = object()
+
+
+class _Flight:
+    """Call in progress, whose result is shared with the identical calls made meanwhile."""
+
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        self.done = threading.Event()
+        self.result = _NOT_SHARED
+        self.error = None
+
+
+# calls in progress by key, and by (event loop, key) for the coroutine functions
+_flights = {}
+_async_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _shared_result(result):
+    """Copy the result of a call for the waiting calls, as the caller may change it."""
+    try:
+        return copy.deepcopy(result)
+    except Exception:
+        return _NOT_SHARED
+
+
+def with_single_flight():
+    """Decorator sharing one execution between the concurrent identical calls of a function.
+
+    The first call runs the function, the calls made with the same arguments before it
+    returns wait for it and receive a deep copy of its result, or its exception, and run
+    the function themselves if the result cannot be copied. Calls are identical when all
+    their arguments are, module-level functions being compared by their path and the
+    other callables, such as lambdas and closures, by instance. Pass `coalesce=False` to
+    run a call on its own, as the calls whose arguments cannot be identified are.
+
+    Returns:
+        callable: A decorator function, for functions called from several threads or coroutine functions called from several tasks.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_func_wrapper(*args, **kwargs):
+                if not kwargs.pop("coalesce", True):
+                    return await func(*args, **kwargs)
+                loop = asyncio.get_running_loop()
+                try:
+                    key = (loop, _call_key(func, signature, args, kwargs))
+                except TypeError:
+                    return await func(*args, **kwargs)
+                flight = _async_flights.get(key)
+                if flight is not None:
+                    try:
+                        result = await asyncio.shield(flight)
+                    except asyncio.CancelledError:
+                        if not flight.cancelled():
+                            raise
+                        # the first call was cancelled, not this one: run it
+                        return await async_func_wrapper(*args, **kwargs)
+                    if result is _NOT_SHARED:
+                        return await func(*args, **kwargs)
+                    return copy.deepcopy(result)
+
+                flight = _async_flights[key] = loop.create_future()
+                try:
+                    result = await func(*args, **kwargs)
+                except asyncio.CancelledError:
+                    flight.cancel()
+                    raise
+                except BaseException as err:
+                    flight.set_exception(err)
+                    # the waiting calls get the exception: do not log it as never retrieved
+                    flight.exception()
+                    raise
+                else:
+                    flight.set_result(_shared_result(result))
+                    return result
+                finally:
+                    del _async_flights[key]
+
+            return async_func_wrapper
+
+        @functools.wraps(func)
+        def func_wrapper(*args, **kwargs):
+            if not kwargs.pop("coalesce", True):
+                return func(*args, **kwargs)
+            try:
+                key = _call_key(func, signature, args, kwargs)
+            except TypeError:
+                return func(*args, **kwargs)
+            with _flights_lock:
+                flight = _flights.get(key)
+                is_leader = flight is None
+                if is_leader:
+                    flight = _flights[key] = _Flight()
+                elif flight.thread_id == threading.get_ident():
+                    # a call made by the thread running the first one cannot wait for it
+                    flight = None
+
+            if flight is None:
+                return func(*args, **kwargs)
+            if not is_leader:
+                flight.done.wait()
+                if flight.error is not None:
+                    raise flight.error
+                if flight.result is _NOT_SHARED:
+                    return func(*args, **kwargs)
+                return copy.deepcopy(flight.result)
+
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as err:
+                flight.error = err
+                raise
+            else:
+                flight.result = _shared_result(result)
+                return result
+            finally:
+                with _flights_lock:
+                    del _flights[key]
+                flight.done.set()
+
+        return func_wrapper
+
+    return decorator
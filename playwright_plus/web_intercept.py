@@ -1,37 +1,332 @@
 from copy import deepcopy
+import json
 import logging
 import time
-from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+from playwright.sync_api import (
+    APIRequestContext,
+    Page,
+    TimeoutError as PlaywrightTimeoutError,
+)
 from asyncio.exceptions import CancelledError
 from utils.exceptions import PlaywrightInterceptError
-from browser_surf import with_page
+from utils.json_decoder import decode_json
+from utils.latency_tracker import LatencyTracker, get_default_latency_tracker
+from utils.matchers import ResponseMatcher, as_response_matcher
+from utils.proxy_pool import with_proxy_pool
+from utils.result_cache import with_result_cache
+from utils.retry_policy import with_retry
+from utils.single_flight import with_single_flight
+from browser_surf import (
+    BrowserPool,
+    _stop_page,
+    get_default_pool,
+    with_api_request,
+    with_page,
+)
 
+# Replayed requests answering with these statuses are rejected
+REPLAY_REJECTED_STATUSES = [401, 403, 429]
+# Headers of an intercepted request which are not sent again by a replay
+REPLAY_DROPPED_HEADERS = ["content-length", "cookie", "host"]
+# Content types which cannot hold JSON: the body of such a response is not read
+NON_JSON_CONTENT_TYPES = [
+    "audio/",
+    "font/",
+    "image/",
+    "text/css",
+    "text/html",
+    "video/",
+]
+# Load states a navigation can wait for before the capture times out, as page.goto
+WAIT_UNTIL_STATES = ["commit", "domcontentloaded", "load", "networkidle"]
+# How `request_json_playwright` gets the JSON: by opening it in a page or with a request
+FETCH_MODES = ["page", "api"]
+# Timeouts of the calls with timeout="auto" or goto_timeout="auto", until their domain
+# has enough recorded latencies
+AUTO_TIMEOUT_DEFAULTS = {"timeout": 4000, "goto_timeout": 30000}
 
+
+def _wait_for_target_response(
+    page: Page, captured: list, is_target: callable, timeout: float
+):
+    """Wait until a matching response is captured or the timeout expires.
+
+    Args:
+        page (Page): Playwright Page object on which the responses are captured.
+        captured (list): Matching responses captured so far and not processed yet.
+        is_target (callable): Function telling whether a response is a matching one.
+        timeout (float): Maximum time to wait in milliseconds.
+    """
+    if captured or timeout <= 0:
+        return
+    try:
+        response = page.wait_for_event("response", predicate=is_target, timeout=timeout)
+        if response not in captured:
+            captured.append(response)
+    except PlaywrightTimeoutError:
+        pass
+
+
+def _start_navigation(
+    page: Page, page_url: str, wait_until: str = "load", goto_timeout=30000
+) -> dict:
+    """Navigate to a page without waiting for it to load, so that the capture runs meanwhile.
+
+    page.goto returns as soon as the navigation commits, except for "networkidle" which
+    has no page event and is awaited by page.goto. The responses arriving meanwhile are
+    captured by the response handlers of the caller.
+
+    Args:
+        page (Page): Playwright Page object to navigate.
+        page_url (str): The URL of the web page.
+        wait_until (str): Load state of WAIT_UNTIL_STATES after which the capture times out (default "load").
+        goto_timeout: Timeout for page navigation (default 30000 milliseconds).
+
+    Returns:
+        dict: The navigation, with its "started_at" time, its "loaded_at" time set once the page reaches `wait_until` or the navigation fails, its "error", if any, and the "captured_at" time set by `_wait_during_navigation` once the capture is done.
+    """
+    if wait_until not in WAIT_UNTIL_STATES:
+        raise ValueError(
+            f"wait_until must be one of {WAIT_UNTIL_STATES}, not {wait_until}"
+        )
+    navigation = {
+        "started_at": time.perf_counter(),
+        "loaded_at": None,
+        "goto_timeout": goto_timeout,
+        "error": None,
+        "captured_at": None,
+    }
+
+    def on_load(*args):
+        if navigation["loaded_at"] is None:
+            navigation["loaded_at"] = time.perf_counter()
+
+    if wait_until in ["domcontentloaded", "load"]:
+        page.once(wait_until, on_load)
+    try:
+        page.goto(
+            page_url,
+            timeout=goto_timeout,
+            wait_until="networkidle" if wait_until == "networkidle" else "commit",
+        )
+    except Exception as err:
+        navigation["error"] = err
+        # the page will not load any further
+        on_load()
+    if wait_until in ["commit", "networkidle"]:
+        on_load()
+    return navigation
+
+
+def _navigation_deadline(navigation: dict, timeout: float, now: float) -> float:
+    """Return the time until which to wait for the targets: `timeout` ms after the page loaded.
+
+    Before the load, the deadline is `timeout` ms from now, to check the load again then,
+    and the navigation counts as loaded once `goto_timeout` expired, as page.goto would.
+    """
+    if navigation["loaded_at"] is None:
+        latest = navigation["started_at"] + navigation["goto_timeout"] / 1000
+        if now < latest:
+            return now + timeout / 1000
+        navigation["loaded_at"] = latest
+    return navigation["loaded_at"] + timeout / 1000
+
+
+def _wait_during_navigation(
+    page: Page,
+    navigation: dict,
+    is_done: callable,
+    predicate: callable,
+    timeout: float,
+    since: float = None,
+    until: float = None,
+    captured: list = None,
+):
+    """Wait until the capture is done or `timeout` ms after the page loaded.
+
+    Args:
+        page (Page): Playwright Page object on which the responses are captured.
+        navigation (dict): Navigation returned by `_start_navigation`.
+        is_done (callable): Function telling whether the capture is done.
+        predicate (callable): Function telling whether a response may complete the capture.
+        timeout (float): Maximum time to wait after the page loaded, in milliseconds.
+        since (float): Time after which to wait `timeout` ms, if it is after the load (optional).
+        until (float): Time after which not to wait anymore, whatever the load (optional).
+        captured (list): Matching responses, to which an awaited response is added if the response handler did not (optional).
+    """
+    while not is_done():
+        now = time.perf_counter()
+        deadline = _navigation_deadline(navigation, timeout, now)
+        if since is not None:
+            deadline = max(deadline, since + timeout / 1000)
+        if until is not None:
+            deadline = min(deadline, until)
+        if deadline <= now:
+            return
+        try:
+            # the page load events do not wake this wait up, the deadline is checked after it
+            response = page.wait_for_event(
+                "response", predicate=predicate, timeout=(deadline - now) * 1000
+            )
+            if captured is not None and response not in captured:
+                captured.append(response)
+        except PlaywrightTimeoutError:
+            pass
+    if navigation["captured_at"] is None:
+        navigation["captured_at"] = time.perf_counter()
+
+
+def _resolve_auto_timeouts(
+    latency_tracker: LatencyTracker,
+    page_url: str,
+    wait_until: str,
+    timeout,
+    goto_timeout,
+) -> tuple:
+    """Replace the "auto" timeouts of a call by the ones its latency tracker derives for the domain."""
+    domain = urlparse(page_url).hostname or page_url
+    if timeout == "auto":
+        timeout = latency_tracker.timeout(
+            domain, f"capture:{wait_until}", AUTO_TIMEOUT_DEFAULTS["timeout"]
+        )
+    if goto_timeout == "auto":
+        goto_timeout = latency_tracker.timeout(
+            domain, f"navigation:{wait_until}", AUTO_TIMEOUT_DEFAULTS["goto_timeout"]
+        )
+    return timeout, goto_timeout
+
+
+def _record_latencies(
+    latency_tracker: LatencyTracker, page_url: str, wait_until: str, navigation: dict
+):
+    """Record the navigation time and the capture time after the load of a call.
+
+    A capture or a navigation which timed out is recorded with the time it waited, which is
+    a lower bound of the latency of the domain: the timeouts derived from it grow until the
+    calls succeed.
+    """
+    domain = urlparse(page_url).hostname or page_url
+    loaded_at = navigation["loaded_at"]
+    if loaded_at is None:
+        # the target arrived before the page loaded, and before its timeout started
+        latency_tracker.record(domain, f"capture:{wait_until}", 0)
+        return
+    if navigation["error"] is None or isinstance(
+        navigation["error"], PlaywrightTimeoutError
+    ):
+        latency_tracker.record(
+            domain,
+            f"navigation:{wait_until}",
+            (loaded_at - navigation["started_at"]) * 1000,
+        )
+    done_at = navigation["captured_at"] or time.perf_counter()
+    latency_tracker.record(
+        domain, f"capture:{wait_until}", max(done_at - loaded_at, 0) * 1000
+    )
+
+
+def _check_response_headers(response, max_body_size: int = None):
+    """Raise a ValueError if the headers of a response show that its body is not worth reading."""
+    content_type = response.headers.get("content-type", "").lower()
+    if any(t in content_type for t in NON_JSON_CONTENT_TYPES):
+        raise ValueError(f"the response is not JSON but {content_type}")
+    content_length = response.headers.get("content-length", "")
+    if (
+        max_body_size is not None
+        and content_length.isdigit()
+        and int(content_length) > max_body_size
+    ):
+        raise ValueError(f"the body of {content_length} bytes exceeds max_body_size")
+
+
+def _decode_response_json(response, max_body_size: int = None):
+    """Read and decode the JSON body of a response, raising if it cannot be decoded.
+
+    The headers are checked first, so that the body of an HTML page or of a response larger
+    than `max_body_size` bytes is never fetched from the browser. The body bytes are decoded
+    by the decoder of `utils.json_decoder`, orjson or ujson when installed.
+    """
+    _check_response_headers(response, max_body_size)
+    body = response.body()
+    if max_body_size is not None and len(body) > max_body_size:
+        raise ValueError(f"the body of {len(body)} bytes exceeds max_body_size")
+    return decode_json(body)
+
+
+def _read_response_json(response, max_body_size: int = None) -> dict:
+    """Read the JSON body of a response, or an error dict if it cannot be decoded."""
+    try:
+        return _decode_response_json(response, max_body_size)
+    except Exception as jde:
+        return {"error": f"exception when trying to intercept:{str(jde)}"}
+
+
+def _read_target_json(response, max_body_size: int = None) -> tuple:
+    """Read the target json of a response, and whether its body was JSON which decoded.
+
+    A JSON body with an "error" key is the answer of the API, so it decoded even though
+    its target json is an error response. A response which is not JSON or does not
+    decode, e.g. a redirect, may precede the answer of the API.
+    """
+    try:
+        buffer = _decode_response_json(response, max_body_size)
+    except Exception as jde:
+        buffer = {"error": f"exception when trying to intercept:{str(jde)}"}
+        is_json = False
+    else:
+        is_json = True
+    if not "error" in buffer:
+        return buffer, is_json
+    # Add coustom Exception
+    return PlaywrightInterceptError(message=buffer["error"]).get_response(), is_json
+
+
+def _response_to_target_json(response, max_body_size: int = None) -> dict:
+    """Read the JSON body of a response, or the error response if it is an error."""
+    return _read_target_json(response, max_body_size)[0]
+
+
+@with_result_cache(
+    "page_url", "json_url_subpart", "json_detect_error", "json_parse_result"
+)
+@with_single_flight()
+@with_retry(BrowserPool, get_default_pool)
+@with_proxy_pool()
 @with_page(headless=True)
 def intercept_json_playwright(
     page_url: str,
-    json_url_subpart: str,
+    json_url_subpart: str | ResponseMatcher,
     page: Page = None,
     json_detect_error: callable = None,
     json_parse_result: callable = None,
     captcha_solver_function: callable = None,
     max_refresh: int = 1,
-    timeout: int = 4000,
+    timeout: int | str = 4000,
     goto_timeout=30000,
+    wait_until: str = "load",
+    latency_tracker: LatencyTracker = None,
+    max_body_size: int = None,
+    early_stop: bool | str = False,
     **kwargs,
 ) -> dict:
     """Intercept JSON data using Playwright, handle errors, and parse the result.
 
     Args:
         page_url (str): The URL of the web page.
-        json_url_subpart (str): Subpart of the JSON URL to intercept.
+        json_url_subpart (str | ResponseMatcher): Subpart of the JSON URL to intercept, or a ResponseMatcher also checking the method, status, resource type or content type before the body is read.
         page (Page): Playwright Page object (optional).
         json_detect_error (callable): Function to detect and handle JSON errors (optional).
         json_parse_result (callable): Function to parse the JSON result (optional).
         captcha_solver_function (callable): Function to solve captchas (optional).
         max_refresh (int): Maximum number of page refresh attempts (default 1).
-        timeout (int): Maximum time to wait for JSON data (default 4000 milliseconds).
-        goto_timeout: Timeout for page navigation (default 30000 milliseconds).
+        timeout (int | str): Maximum time to wait for JSON data, or "auto" for the timeout that the latency tracker derives for the domain (default 4000 milliseconds).
+        goto_timeout: Timeout for page navigation, or "auto" as for `timeout` (default 30000 milliseconds).
+        wait_until (str): Load state of WAIT_UNTIL_STATES ("commit", "domcontentloaded", "load" or "networkidle") after which `timeout` starts; the capture runs during the navigation and completes as soon as a target response decodes as JSON, an error body included, else returns the error of the last one (default "load").
+        latency_tracker (LatencyTracker): Tracker recording the navigation and capture times of the domain, from which the "auto" timeouts are derived (optional, default `get_default_latency_tracker()` for the "auto" timeouts).
+        max_body_size (int): Maximum size in bytes of the JSON body, larger responses are an error without being read (optional).
+        early_stop (bool | str): Once the capture is over, stop the page loading: "stop", "abort", "blank" or True for "blank", see EARLY_STOP_MODES (default False).
+        **kwargs: Browser settings of `with_page`, e.g. `record_har` to save the traffic of the call or `replay_har` to replay it offline, `result_cache` (a ResultCache) to reuse a recent result for the same page_url and json_url_subpart, `coalesce=False` not to share the navigation of an identical call in progress, `retry_policy` (a RetryPolicy) to retry the errors, possibly with another proxy of the policy, in the same browser, and `proxy_pool` (a ProxyPool) to use a proxy picked by recent performance and record how it went.
 
     Returns:
         dict: The intercepted JSON data or an error message.
@@ -40,33 +335,64 @@ def intercept_json_playwright(
     nb_refresh = 0
     captcha_to_solve = False
     is_error = False
-    target_json = {}
+    # matching responses not read yet, in arrival order
+    captured = []
+    # target jsons of the matching responses read and not processed yet, which decoded,
+    # JSON error bodies included
+    decoded = []
+    # error response of the last matching response which was not JSON or did not decode
+    last_error = {}
+
+    is_target = as_response_matcher(json_url_subpart)
 
     def handle_response(response):
-        if json_url_subpart in response.url:
-            try:
-                buffer = response.json()
-            except Exception as jde:
-                buffer = {"error": f"exception when trying to intercept:{str(jde)}"}
+        if is_target(response):
+            captured.append(response)
+
+    page.on("response", handle_response)
 
-            if not "error" in buffer:
-                target_json["data"] = buffer
+    def read_captured() -> bool:
+        # a redirect or an HTML error page may precede the answer of the API: the
+        # capture completes on a body which decodes, else ends with the last error
+        nonlocal last_error
+        while captured:
+            target_json, is_json = _read_target_json(captured.pop(0), max_body_size)
+            if is_json:
+                decoded.append(target_json)
             else:
-                # Add coustom Exception
-                target_json["data"] = PlaywrightInterceptError(
-                    message=buffer["error"]
-                ).get_response()
+                last_error = target_json
+        return bool(decoded)
 
-    page.on("response", handle_response)
+    if latency_tracker is None and "auto" in [timeout, goto_timeout]:
+        latency_tracker = get_default_latency_tracker()
+    if latency_tracker is not None:
+        timeout, goto_timeout = _resolve_auto_timeouts(
+            latency_tracker, page_url, wait_until, timeout, goto_timeout
+        )
 
-    try:
-        page.goto(page_url, timeout=goto_timeout)
-    except:
-        pass
+    navigation = _start_navigation(page, page_url, wait_until, goto_timeout)
+    _wait_during_navigation(
+        page,
+        navigation,
+        read_captured,
+        is_target,
+        timeout,
+        captured=captured,
+    )
+    if latency_tracker is not None:
+        _record_latencies(latency_tracker, page_url, wait_until, navigation)
 
+    start = navigation["loaded_at"] or time.perf_counter()
     while (time_spent <= timeout) and (nb_refresh < max_refresh):
-        s = time.perf_counter()
-        target_json = target_json.get("data", {})
+        # wait until a matching response decodes, instead of polling for it
+        remaining = timeout - (time.perf_counter() - start) * 1000
+        while not read_captured() and remaining > 0:
+            _wait_for_target_response(page, captured, is_target, remaining)
+            remaining = timeout - (time.perf_counter() - start) * 1000
+        # the last matching response wins
+        target_json = decoded[-1] if decoded else last_error
+        decoded.clear()
+        last_error = {}
         logging.debug(
             f"time_spent : {time_spent}. target_json keys: {target_json.keys()}"
         )
@@ -91,7 +417,6 @@ def intercept_json_playwright(
             ask_for_refresh, captcha_solved = captcha_solver_function(page)
             if captcha_solved:
                 captcha_to_solve = False
-                target_json = {}
                 result = {}
 
             if ask_for_refresh:
@@ -103,13 +428,8 @@ def intercept_json_playwright(
                 except:
                     pass
 
-        duration = time.perf_counter() - s
-        if duration * 1000 < 500:
-            remaining_sleep_time = 500 - int(duration * 1000)
-            page.wait_for_timeout(remaining_sleep_time)
-
-        duration = time.perf_counter() - s
-        time_spent += duration * 1000
+        time_spent = (time.perf_counter() - start) * 1000
+    _stop_page(page, early_stop)
     if (not is_error) and callable(json_parse_result):
         result = json_parse_result(result)
 
@@ -195,58 +515,56 @@ def intercept_json_playwright_old(
     return result
 
 
+@with_proxy_pool()
 @with_page(headless=True)
 def intercept_json_playwright_multiple(
     page_url: str,
-    json_url_subpart: str,
+    json_url_subpart: str | ResponseMatcher,
     page=None,
     json_detect_error: callable = None,
     json_parse_result: callable = None,
     wait_seconds: int = 4,
     expect_more: int = 0,
+    wait_until: str = "load",
+    max_body_size: int = None,
+    early_stop: bool | str = False,
     **kwargs,
 ) -> dict:
     """Intercept JSON data using Playwright, handle multiple responses, errors, and parse the result.
 
     Args:
         page_url (str): The URL of the web page.
-        json_url_subpart (str): Subpart of the JSON URL to intercept.
+        json_url_subpart (str | ResponseMatcher): Subpart of the JSON URL to intercept, or a ResponseMatcher also checking the method, status, resource type or content type before the body is read.
         page (Page): Playwright Page object (optional).
         json_detect_error (callable): Function to detect and handle JSON errors (optional).
         json_parse_result (callable): Function to parse the JSON result (optional).
         wait_seconds (int): Maximum wait time in seconds for JSON data (default 4 seconds).
         expect_more (int): Number of additional expected responses (default 0).
+        wait_until (str): Load state of WAIT_UNTIL_STATES ("commit", "domcontentloaded", "load" or "networkidle") after which `wait_seconds` starts; the capture runs during the navigation and completes as soon as a response without error arrives (default "load").
+        max_body_size (int): Maximum size in bytes of the JSON bodies, larger responses are an error without being read (optional).
+        early_stop (bool | str): Once the capture is over, stop the page loading: "stop", "abort", "blank" or True for "blank", see EARLY_STOP_MODES (default False).
+        **kwargs: Browser settings of `with_page`, and `proxy_pool` (a ProxyPool) to use a proxy picked by recent performance and record how it went.
 
     Returns:
         dict: The intercepted JSON data or an error message.
+
+    Note:
+        Only the last matching response is kept, use `intercept_json_playwright_stream` to get every one of them.
     """
-    target_json = {}
+    # matching responses not processed yet, in arrival order
+    captured = []
 
-    def handle_response(response):
-        try:
-            if json_url_subpart in response.url:
-                try:
-                    buffer = response.json()
-                except Exception as jde:
-                    buffer = {"error": f"exception when trying to intercept:{str(jde)}"}
+    is_target = as_response_matcher(json_url_subpart)
 
-                if not buffer.get("error"):
-                    target_json["data"] = buffer
-                else:
-                    # Add coustom Exception
-                    target_json["data"] = PlaywrightInterceptError(
-                        message=buffer["error"]
-                    ).get_response()
-        except CancelledError:
-            logging.debug("handle_response was correctly canceled")
+    def handle_response(response):
+        if is_target(response):
+            captured.append(response)
 
     page.on("response", handle_response)
 
-    try:
-        page.goto(page_url)
-    except PlaywrightTimeoutError as err:
-        pass
-    except Exception as err:
+    navigation = _start_navigation(page, page_url, wait_until)
+    err = navigation["error"]
+    if err is not None and not isinstance(err, PlaywrightTimeoutError):
         return {"error": "PlaywrightGotoError", "error_message": str(err), "data": {}}
 
     is_error = True
@@ -255,9 +573,34 @@ def intercept_json_playwright_multiple(
         message="An empty json was collected after calling the hidden API."
     ).get_response()
 
-    for _ in range(wait_seconds * 2):
-        page.wait_for_timeout(500)
-        target_json = target_json.get("data", {})
+    _wait_during_navigation(
+        page,
+        navigation,
+        lambda: bool(captured),
+        is_target,
+        wait_seconds * 1000,
+        captured=captured,
+    )
+    time_spent = 0
+    start = navigation["loaded_at"] or time.perf_counter()
+    while time_spent <= wait_seconds * 1000:
+        # wait until a new matching response arrives, instead of polling for it
+        remaining = wait_seconds * 1000 - (time.perf_counter() - start) * 1000
+        _wait_for_target_response(page, captured, is_target, remaining)
+        time_spent = (time.perf_counter() - start) * 1000
+        if not captured:
+            continue
+
+        # the last matching response wins
+        buffer = _read_response_json(captured[-1], max_body_size)
+        captured.clear()
+        if not buffer.get("error"):
+            target_json = buffer
+        else:
+            # Add coustom Exception
+            target_json = PlaywrightInterceptError(
+                message=buffer["error"]
+            ).get_response()
 
         logging.debug(f"target_json keys: {target_json.keys()}")
         if target_json:
@@ -271,16 +614,569 @@ def intercept_json_playwright_multiple(
             else:
                 expect_more -= 1
 
+    _stop_page(page, early_stop)
     if (not is_error) and callable(json_parse_result):
         result = json_parse_result(result)
 
     return result
 
 
+@with_page(headless=True)
+def intercept_json_playwright_stream(
+    page_url: str,
+    json_url_subpart: str | ResponseMatcher,
+    page: Page = None,
+    json_detect_error: callable = None,
+    json_parse_result: callable = None,
+    max_responses: int = None,
+    idle_timeout: int = 4000,
+    total_timeout: int = 30000,
+    goto_timeout=30000,
+    wait_until: str = "load",
+    max_body_size: int = None,
+    early_stop: bool | str = False,
+    **kwargs,
+):
+    """Intercept every matching JSON response of a page, yielding each one as soon as it is parsed.
+
+    Args:
+        page_url (str): The URL of the web page.
+        json_url_subpart (str | ResponseMatcher): Subpart of the JSON URL to intercept, or a ResponseMatcher also checking the method, status, resource type or content type before the body is read.
+        page (Page): Playwright Page object (optional).
+        json_detect_error (callable): Function to detect and handle JSON errors, applied to each response (optional).
+        json_parse_result (callable): Function to parse the JSON result of each response without error (optional).
+        max_responses (int): Number of responses after which the stream stops (optional, default no limit).
+        idle_timeout (int): Time without a new matching response after which the stream stops (default 4000 milliseconds).
+        total_timeout (int): Time since the start of the navigation after which the stream stops (default 30000 milliseconds).
+        goto_timeout: Timeout for page navigation (default 30000 milliseconds).
+        wait_until (str): Load state of WAIT_UNTIL_STATES ("commit", "domcontentloaded", "load" or "networkidle") before which the stream is not idle; the responses are yielded during the navigation (default "load").
+        max_body_size (int): Maximum size in bytes of the JSON bodies, larger responses are an error without being read (optional).
+        early_stop (bool | str): Once the capture is over, stop the page loading: "stop", "abort", "blank" or True for "blank", see EARLY_STOP_MODES (default False).
+
+    Yields:
+        dict: The "url" and "status" of the response, the "elapsed" milliseconds since the start of the navigation, and its parsed JSON data or error message as "data".
+
+    Note:
+        Unlike `intercept_json_playwright_multiple`, which keeps the last matching response, every response of an infinite scroll or paginated feed is yielded, and only the responses not consumed yet are kept in memory. The page stays open until the generator is exhausted or closed, and is stopped per `early_stop` either way.
+    """
+    # matching responses not yielded yet, in arrival order
+    captured = []
+
+    is_target = as_response_matcher(json_url_subpart)
+
+    def handle_response(response):
+        if is_target(response):
+            captured.append(response)
+
+    page.on("response", handle_response)
+
+    start = time.perf_counter()
+    navigation = _start_navigation(page, page_url, wait_until, goto_timeout)
+    err = navigation["error"]
+    if err is not None and not isinstance(err, PlaywrightTimeoutError):
+        yield {
+            "url": page_url,
+            "status": None,
+            "elapsed": (time.perf_counter() - start) * 1000,
+            "data": {
+                "error": "PlaywrightGotoError",
+                "error_message": str(err),
+                "data": {},
+            },
+        }
+        return
+
+    nb_responses = 0
+    last_response_at = None
+    stopped = False
+    try:
+        while max_responses is None or nb_responses < max_responses:
+            # wait until a new matching response arrives, instead of polling for it
+            _wait_during_navigation(
+                page,
+                navigation,
+                lambda: bool(captured),
+                is_target,
+                idle_timeout,
+                since=last_response_at,
+                until=start + total_timeout / 1000,
+                captured=captured,
+            )
+            if not captured:
+                break
+
+            response = captured.pop(0)
+            last_response_at = time.perf_counter()
+            result = _response_to_target_json(response, max_body_size)
+            is_error = False
+            if callable(json_detect_error):
+                is_error, result = json_detect_error(result)
+            if (not is_error) and callable(json_parse_result):
+                result = json_parse_result(result)
+
+            nb_responses += 1
+            if nb_responses == max_responses:
+                # the consumer may not ask for another item after the last one
+                _stop_page(page, early_stop)
+                stopped = True
+            yield {
+                "url": response.url,
+                "status": response.status,
+                "elapsed": (last_response_at - start) * 1000,
+                "data": result,
+            }
+    finally:
+        # also when the consumer closes the stream before its end
+        if not stopped:
+            _stop_page(page, early_stop)
+
+
+def _as_capture_target(
+    spec, json_detect_error: callable = None, json_parse_result: callable = None
+) -> dict:
+    """Normalize a target of `intercept_json_playwright_targets` into a dict with a ResponseMatcher."""
+    if not isinstance(spec, dict):
+        spec = {"json_url_subpart": spec}
+    return {
+        "is_target": as_response_matcher(spec["json_url_subpart"]),
+        "json_detect_error": spec.get("json_detect_error", json_detect_error),
+        "json_parse_result": spec.get("json_parse_result", json_parse_result),
+        "required": spec.get("required", True),
+    }
+
+
+@with_proxy_pool()
+@with_page(headless=True)
+def intercept_json_playwright_targets(
+    page_url: str,
+    targets: dict,
+    page: Page = None,
+    json_detect_error: callable = None,
+    json_parse_result: callable = None,
+    timeout: int = 4000,
+    goto_timeout=30000,
+    wait_until: str = "load",
+    max_body_size: int = None,
+    early_stop: bool | str = False,
+    **kwargs,
+) -> dict:
+    """Intercept several hidden APIs of a page with a single navigation.
+
+    Args:
+        page_url (str): The URL of the web page.
+        targets (dict): Names of the targets and their `json_url_subpart` (a URL subpart or a ResponseMatcher), or dicts with a "json_url_subpart" and optionally their own "json_detect_error", "json_parse_result" and "required" (default True).
+        page (Page): Playwright Page object (optional).
+        json_detect_error (callable): Function to detect and handle JSON errors, for the targets without their own (optional).
+        json_parse_result (callable): Function to parse the JSON result, for the targets without their own (optional).
+        timeout (int): Maximum time to wait for the required targets after the page loaded (default 4000 milliseconds).
+        goto_timeout: Timeout for page navigation (default 30000 milliseconds).
+        wait_until (str): Load state of WAIT_UNTIL_STATES ("commit", "domcontentloaded", "load" or "networkidle") after which `timeout` starts; the capture runs during the navigation and completes as soon as every required target arrived (default "load").
+        max_body_size (int): Maximum size in bytes of the JSON bodies, larger responses are an error without being read (optional).
+        early_stop (bool | str): Once the capture is over, stop the page loading: "stop", "abort", "blank" or True for "blank", see EARLY_STOP_MODES (default False).
+        **kwargs: Browser settings of `with_page`, and `proxy_pool` (a ProxyPool) to use a proxy picked by recent performance and record how it went.
+
+    Returns:
+        dict: The intercepted JSON data or error message of each target, by name.
+
+    Note:
+        The capture completes as soon as every required target has a matching response which decodes as JSON, an error body included. Each target keeps its last matching response which decodes, else the error of its last one, and its result is built as by `intercept_json_playwright`, a target without a response getting the empty json error. Captchas are not solved.
+    """
+    targets = {
+        name: _as_capture_target(spec, json_detect_error, json_parse_result)
+        for name, spec in targets.items()
+    }
+    # matching responses of each target not read yet, in arrival order
+    captured = {name: [] for name in targets}
+    # target json of the last matching response of each target which decoded
+    decoded = {}
+    # error response of the last matching response of each target which did not
+    last_errors = {}
+
+    def handle_response(response):
+        for name, target in targets.items():
+            if target["is_target"](response):
+                captured[name].append(response)
+
+    page.on("response", handle_response)
+
+    # the response handler records a response before this predicate sees it, so it
+    # cannot tell a missing target: the completion is checked after each wake up
+    def is_required_target(response):
+        return any(t["required"] and t["is_target"](response) for t in targets.values())
+
+    def read_captured(name: str) -> bool:
+        # as in `intercept_json_playwright`, a body which decodes captures the target
+        while captured[name]:
+            target_json, is_json = _read_target_json(
+                captured[name].pop(0), max_body_size
+            )
+            if is_json:
+                decoded[name] = target_json
+            else:
+                last_errors[name] = target_json
+        return name in decoded
+
+    def is_complete():
+        return all(read_captured(n) for n, t in targets.items() if t["required"])
+
+    navigation = _start_navigation(page, page_url, wait_until, goto_timeout)
+    # wait until the missing targets arrive, instead of polling for them
+    _wait_during_navigation(page, navigation, is_complete, is_required_target, timeout)
+
+    results = {}
+    for name, target in targets.items():
+        read_captured(name)
+        target_json = decoded.get(name, last_errors.get(name, {}))
+        results[name] = _target_json_to_result(
+            target_json, target["json_detect_error"], target["json_parse_result"]
+        )
+    _stop_page(page, early_stop)
+    return results
+
+
+def intercept_json_playwright_many(
+    jobs,
+    concurrency: int = 4,
+    pool: BrowserPool = None,
+    **kwargs,
+):
+    """Intercept JSON data for many pages at once, sharing one browser context.
+
+    Args:
+        jobs (iterable): Dicts of `intercept_json_playwright` arguments (page_url, json_url_subpart, json_detect_error, json_parse_result, timeout, goto_timeout, wait_until, max_body_size, early_stop), one per page. The pages load concurrently, so "networkidle" is waited for as "load". A page stopped early navigates to its next job, so `early_stop` only applies once no job is left.
+        concurrency (int): Maximum number of pages navigated at the same time (default 4).
+        pool (BrowserPool): Pool giving the browser context (optional, default pool or a pool for this call only).
+        **kwargs: Default arguments of the jobs and browser settings of the context.
+
+    Yields:
+        tuple: The job and its intercepted JSON data or error message, in completion order.
+
+    Note:
+        As in `intercept_json_playwright`, a job completes on a matching response which decodes as JSON, an error body included, and fails when none arrived `timeout` ms after its page loaded or its navigation failed (or `goto_timeout` ms after its navigation started), with the PlaywrightGotoError of the failed navigations. Captchas are not solved.
+    """
+    jobs = iter(jobs)
+    # job state of each page currently navigating
+    active = {}
+    own_pool = None
+    if pool is None:
+        pool = get_default_pool()
+    if not pool:
+        pool = own_pool = BrowserPool()
+
+    def on_response(response):
+        try:
+            state = active.get(response.frame.page)
+        except Exception:
+            # service worker responses have no page
+            return
+        if state and state["is_target"](response):
+            state["captured"].append(response)
+
+    def start_job(page, early_stop=False):
+        job = next(jobs, None)
+        if job is None:
+            # no job left for this page, stop it until the other pages are done
+            _stop_page(page, early_stop)
+            return
+        options = {
+            "timeout": 4000,
+            "goto_timeout": 30000,
+            "wait_until": "load",
+            **kwargs,
+            **job,
+        }
+        state = active[page] = {
+            "job": job,
+            "options": options,
+            "is_target": as_response_matcher(options["json_url_subpart"]),
+            "captured": [],
+            "decoded": [],
+            "last_error": {},
+        }
+        # the pages load concurrently, so the navigation does not wait for the network
+        # idle state, which has no page event
+        wait_until = options["wait_until"]
+        state["navigation"] = _start_navigation(
+            page,
+            options["page_url"],
+            "load" if wait_until == "networkidle" else wait_until,
+            options["goto_timeout"],
+        )
+
+    def deadline(state, now):
+        return _navigation_deadline(
+            state["navigation"], state["options"]["timeout"], now
+        )
+
+    def read_captured(state) -> bool:
+        # as in `intercept_json_playwright`, a job completes on a body which decodes
+        while state["captured"]:
+            target_json, is_json = _read_target_json(
+                state["captured"].pop(0), state["options"].get("max_body_size")
+            )
+            if is_json:
+                state["decoded"].append(target_json)
+            else:
+                state["last_error"] = target_json
+        return bool(state["decoded"])
+
+    def job_result(state) -> dict:
+        options = state["options"]
+        err = state["navigation"]["error"]
+        if not state["decoded"] and not state["last_error"] and err is not None:
+            return {
+                "error": "PlaywrightGotoError",
+                "error_message": str(err),
+                "data": {},
+            }
+        return _target_json_to_result(
+            state["decoded"][-1] if state["decoded"] else state["last_error"],
+            options.get("json_detect_error"),
+            options.get("json_parse_result"),
+        )
+
+    try:
+        with pool.page(**kwargs) as first_page:
+            context = first_page.context
+            context.on("response", on_response)
+            pages = [first_page]
+            try:
+                while len(pages) < concurrency:
+                    pages.append(context.new_page())
+                for page in pages:
+                    start_job(page)
+
+                while active:
+                    now = time.perf_counter()
+                    for page, state in list(active.items()):
+                        if read_captured(state) or now >= deadline(state, now):
+                            del active[page]
+                            yield state["job"], job_result(state)
+                            start_job(page, state["options"].get("early_stop"))
+                    if not active:
+                        break
+
+                    # wait until a page captures its target response or reaches its deadline
+                    timeout = min(deadline(s, now) for s in active.values()) - now
+                    try:
+                        context.wait_for_event(
+                            "response",
+                            predicate=lambda response: any(
+                                s["captured"] for s in active.values()
+                            ),
+                            timeout=max(timeout * 1000, 1),
+                        )
+                    except PlaywrightTimeoutError:
+                        pass
+            finally:
+                # the context may be reused by the pool
+                context.remove_listener("response", on_response)
+                for page in pages[1:]:
+                    page.close()
+    finally:
+        if own_pool is not None:
+            own_pool.close()
+
+
+def _target_json_to_result(
+    target_json: dict,
+    json_detect_error: callable = None,
+    json_parse_result: callable = None,
+) -> dict:
+    """Build the result of a capture the way `intercept_json_playwright` does."""
+    result = target_json
+    is_error = False
+    if not target_json or result.get("error") == "CaptchaRaisedError":
+        if not target_json:
+            # Add coustom Exception
+            result = PlaywrightInterceptError(
+                message="An empty json was collected after calling the hidden API."
+            ).get_response()
+        if callable(json_detect_error):
+            is_error, result = json_detect_error(result)
+
+    if (not is_error) and callable(json_parse_result):
+        result = json_parse_result(result)
+
+    return result
+
+
+@with_page(headless=True)
+def intercept_json_playwright_replay(
+    page_url: str,
+    json_url_subpart: str | ResponseMatcher,
+    variants: list,
+    page: Page = None,
+    json_detect_error: callable = None,
+    json_parse_result: callable = None,
+    timeout: int = 4000,
+    goto_timeout=30000,
+    wait_until: str = "load",
+    **kwargs,
+) -> list:
+    """Intercept the hidden API request of a page once, then replay variants of it without navigating.
+
+    Args:
+        page_url (str): The URL of the web page.
+        json_url_subpart (str | ResponseMatcher): Subpart of the JSON URL to intercept, or a ResponseMatcher also checking the method, status, resource type or content type before the body is read.
+        variants (list): Changes to apply to the captured request, one per replay. Either a dict with any of "params" (query parameters to set), "json" (keys to set in a JSON or form-encoded body), "url", "method", "headers", "data" and "page_url" (page to navigate to if the replay is rejected), or a function taking and returning a request dict with "url", "method", "headers" and "data" keys.
+        page (Page): Playwright Page object (optional).
+        json_detect_error (callable): Function to detect and handle JSON errors (optional).
+        json_parse_result (callable): Function to parse the JSON result (optional).
+        timeout (int): Maximum time to wait for JSON data after a navigation (default 4000 milliseconds).
+        goto_timeout: Timeout for page navigation and replayed requests (default 30000 milliseconds).
+        wait_until (str): Load state of WAIT_UNTIL_STATES ("commit", "domcontentloaded", "load" or "networkidle") after which `timeout` starts, for each navigation; the capture completes as soon as the target arrives (default "load").
+
+    Returns:
+        list: The intercepted JSON data or error message of the page, followed by the one of each variant.
+
+    Note:
+        The variants are sent through the page context request API, so they share the cookies obtained by the navigation. A replay is rejected when it answers with a status in REPLAY_REJECTED_STATUSES or without JSON; if the variant has a "page_url", the page is then opened and its request is intercepted and used for the next replays. Otherwise, the first rejected replay opens `page_url` again to renew the session and is sent once more. A variant which cannot be applied to the captured request, e.g. "json" keys on a body which is neither JSON nor form-encoded, gets an error without being sent.
+    """
+    # matching responses not processed yet, in arrival order
+    captured = []
+
+    is_target = as_response_matcher(json_url_subpart)
+
+    def handle_response(response):
+        if is_target(response):
+            captured.append(response)
+
+    page.on("response", handle_response)
+
+    def navigate(url: str):
+        captured.clear()
+        navigation = _start_navigation(page, url, wait_until, goto_timeout)
+        _wait_during_navigation(
+            page,
+            navigation,
+            lambda: bool(captured),
+            is_target,
+            timeout,
+            captured=captured,
+        )
+        if not captured:
+            return None, {}
+        response = captured[-1]
+        return _replay_request_spec(response.request), _response_to_target_json(
+            response
+        )
+
+    def replay(variant) -> tuple:
+        """Send a variant, returning its target json and whether it was rejected."""
+        if request_spec is None:
+            return {}, True
+        try:
+            variant_spec = _apply_replay_variant(request_spec, variant)
+        except ValueError as err:
+            return PlaywrightInterceptError(message=str(err)).get_response(), False
+        target_json = {}
+        try:
+            response = page.context.request.fetch(
+                variant_spec["url"],
+                method=variant_spec["method"],
+                headers=variant_spec["headers"],
+                data=variant_spec["data"],
+                timeout=goto_timeout,
+            )
+            if response.status not in REPLAY_REJECTED_STATUSES:
+                target_json = _response_to_target_json(response)
+        except Exception as err:
+            logging.debug(f"[playwright_plus] replay failed: {err}")
+        rejected = not target_json or (
+            isinstance(target_json, dict)
+            and target_json.get("error") == PlaywrightInterceptError.error
+        )
+        return target_json, rejected
+
+    request_spec, target_json = navigate(page_url)
+    results = [_target_json_to_result(target_json, json_detect_error, json_parse_result)]
+    # the session is renewed from page_url at most once per call
+    renewed = False
+
+    for variant in variants:
+        target_json, rejected = replay(variant)
+        if rejected and isinstance(variant, dict) and variant.get("page_url"):
+            logging.debug("[playwright_plus] replay rejected, navigating instead")
+            new_request_spec, target_json = navigate(variant["page_url"])
+            request_spec = new_request_spec or request_spec
+        elif rejected and not renewed:
+            logging.debug("[playwright_plus] replay rejected, renewing the session")
+            renewed = True
+            new_request_spec, _ = navigate(page_url)
+            if new_request_spec is not None:
+                request_spec = new_request_spec
+                target_json, _ = replay(variant)
+
+        results.append(
+            _target_json_to_result(target_json, json_detect_error, json_parse_result)
+        )
+
+    return results
+
+
+def _replay_request_spec(request) -> dict:
+    """Describe an intercepted request so that it can be sent again."""
+    headers = {
+        name: value
+        for name, value in request.all_headers().items()
+        if name not in REPLAY_DROPPED_HEADERS and not name.startswith(":")
+    }
+    return {
+        "url": request.url,
+        "method": request.method,
+        "headers": headers,
+        "data": request.post_data,
+    }
+
+
+def _apply_replay_variant(request_spec: dict, variant) -> dict:
+    """Build the request of a replay variant from the intercepted request.
+
+    Raises:
+        ValueError: If the variant sets "json" keys in a body which is neither a JSON object nor form-encoded.
+    """
+    request_spec = deepcopy(request_spec)
+    if callable(variant):
+        return variant(request_spec)
+
+    for key in ["url", "method", "headers", "data"]:
+        if key in variant:
+            request_spec[key] = variant[key]
+    if "params" in variant:
+        url = urlparse(request_spec["url"])
+        query = dict(parse_qsl(url.query, keep_blank_values=True))
+        query.update(variant["params"])
+        request_spec["url"] = urlunparse(url._replace(query=urlencode(query)))
+    if "json" in variant:
+        content_type = {
+            name.lower(): value for name, value in request_spec["headers"].items()
+        }.get("content-type", "")
+        if "application/x-www-form-urlencoded" in content_type:
+            body = dict(parse_qsl(request_spec["data"] or "", keep_blank_values=True))
+            body.update(variant["json"])
+            request_spec["data"] = urlencode(body)
+        else:
+            try:
+                body = json.loads(request_spec["data"] or "{}")
+            except json.JSONDecodeError:
+                body = None
+            if not isinstance(body, dict):
+                raise ValueError(
+                    "cannot set the 'json' keys of a variant in a body which is "
+                    f"neither JSON nor form-encoded ({content_type or 'no content-type'})"
+                )
+            body.update(variant["json"])
+            request_spec["data"] = json.dumps(body)
+
+    return request_spec
+
+
 def request_json_playwright(
     json_url: str,
     json_detect_error: callable = None,
     json_parse_result: callable = None,
+    fetch_mode: str = "page",
     **kwargs,
 ) -> dict:
     """Request JSON data using Playwright, handle errors, and parse the result.
@@ -289,11 +1185,26 @@ def request_json_playwright(
         json_url (str): The URL of the JSON data.
         json_detect_error (callable): Function to detect and handle JSON errors (optional).
         json_parse_result (callable): Function to parse the JSON result (optional).
-        **kwargs: Additional keyword arguments to pass to `intercept_json_playwright`.
+        fetch_mode (str): One of FETCH_MODES, "page" to open the URL in a web page, or "api" to send a plain request through Playwright's APIRequestContext, without rendering (default "page").
+        **kwargs: Additional keyword arguments to pass to `intercept_json_playwright`, `result_cache` (a ResultCache) to reuse a recent result for the same json_url, and `coalesce=False` not to share an identical call in progress.
 
     Returns:
         dict: The intercepted JSON data or an error message.
+
+    Raises:
+        ValueError: If `fetch_mode` is not one of FETCH_MODES.
     """
+    if fetch_mode not in FETCH_MODES:
+        raise ValueError(f"fetch_mode must be one of {FETCH_MODES}, not {fetch_mode}")
+    # the page mode is cached and coalesced by `intercept_json_playwright`
+    if fetch_mode == "api":
+        return _request_json_api(
+            json_url=json_url,
+            json_detect_error=json_detect_error,
+            json_parse_result=json_parse_result,
+            **kwargs,
+        )
+
     result = intercept_json_playwright(
         page_url=json_url,
         json_url_subpart=json_url,
@@ -303,3 +1214,36 @@ def request_json_playwright(
     )
 
     return result
+
+
+@with_result_cache("json_url", "json_detect_error", "json_parse_result")
+@with_single_flight()
+@with_api_request()
+def _request_json_api(
+    json_url: str,
+    api_request: APIRequestContext = None,
+    json_detect_error: callable = None,
+    json_parse_result: callable = None,
+    goto_timeout=30000,
+    **kwargs,
+) -> dict:
+    """Request JSON data with an APIRequestContext and build the same result as `intercept_json_playwright`.
+
+    Args:
+        json_url (str): The URL of the JSON data.
+        api_request (APIRequestContext): Playwright APIRequestContext object (optional).
+        json_detect_error (callable): Function to detect and handle JSON errors (optional).
+        json_parse_result (callable): Function to parse the JSON result (optional).
+        goto_timeout: Timeout for the request (default 30000 milliseconds).
+
+    Returns:
+        dict: The requested JSON data or an error message.
+    """
+    target_json = {}
+    try:
+        response = api_request.get(json_url, timeout=goto_timeout)
+        target_json = _response_to_target_json(response)
+    except Exception as err:
+        logging.debug(f"[playwright_plus] request to {json_url} failed: {err}")
+
+    return _target_json_to_result(target_json, json_detect_error, json_parse_result)
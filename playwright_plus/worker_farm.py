@@ -0,0 +1,314 @@
+# Built-in imports
+import logging
+import multiprocessing
+import time
+from collections import deque
+from itertools import count
+from multiprocessing.connection import wait
+
+# Public 3rd party packages imports
+# Private packages imports
+# Local functions and relative imports
+from browser_surf import BrowserPool, set_default_pool
+from utils.exceptions import PlaywrightPlusException, PlaywrightWorkerError
+from web_intercept import (
+    intercept_json_playwright,
+    intercept_json_playwright_targets,
+    request_json_playwright,
+)
+
+# Constants imports
+# New constants
+WORKER_FUNCTIONS = {
+    "intercept_json_playwright": intercept_json_playwright,
+    "intercept_json_playwright_targets": intercept_json_playwright_targets,
+    "request_json_playwright": request_json_playwright,
+}
+
+__all__ = [
+    "WorkerFarm",
+]
+
+
+def _worker_main(conn, pool_options: dict):
+    """Run the jobs received on `conn` with a browser pool owned by this process.
+
+    Args:
+        conn: Connection on which the jobs are received and the results sent back.
+        pool_options (dict): Keyword arguments of the worker BrowserPool.
+    """
+    pool = BrowserPool(**pool_options)
+    set_default_pool(pool)
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+
+            job_id, func_name, kwargs = message
+            start = time.perf_counter()
+            try:
+                result = WORKER_FUNCTIONS[func_name](**kwargs)
+            except PlaywrightPlusException as err:
+                result = err.get_response()
+            except Exception as err:
+                result = PlaywrightPlusException(
+                    message=f"[{func_name}] {err}"
+                ).get_response()
+            conn.send((job_id, result, time.perf_counter() - start))
+    finally:
+        pool.close()
+
+
+class WorkerFarm:
+    """Dispatch intercept jobs to worker processes, each with its own Playwright driver.
+
+    Each worker owns a BrowserPool used by default by the intercept functions, so the
+    Python side of the jobs (route handlers, JSON decoding, parsing) runs on several cores.
+    A job is sent to a worker only when it is idle, and `submit` blocks while
+    `max_pending` jobs are waiting, so the queue never grows unbounded. A worker which
+    dies is respawned: the job it was running gets a PlaywrightWorkerError response, and
+    a job sent to it while it was idle goes to the new worker.
+
+    Args:
+        nb_workers (int, optional): Number of worker processes (default 2).
+        max_pending (int, optional): Maximum number of jobs waiting for a worker (default 2 * nb_workers).
+        **pool_options: Keyword arguments of the BrowserPool of each worker (size, headless, keep_contexts...).
+
+    Note:
+        The workers are spawned, so the job arguments (including json_detect_error and json_parse_result) must be picklable, e.g. module-level functions.
+    """
+
+    def __init__(self, nb_workers: int = 2, max_pending: int = None, **pool_options):
+        self.nb_workers = nb_workers
+        self.max_pending = max_pending or 2 * nb_workers
+        self.pool_options = pool_options
+        self._mp_context = multiprocessing.get_context("spawn")
+        self._job_ids = count()
+        self._pending = deque()
+        self._done = deque()
+        self._jobs = {}
+        self._workers = [self._spawn() for _ in range(nb_workers)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _spawn(self, nb_restarts: int = 0) -> dict:
+        parent_conn, child_conn = self._mp_context.Pipe()
+        process = self._mp_context.Process(
+            target=_worker_main, args=(child_conn, self.pool_options), daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return {
+            "process": process,
+            "conn": parent_conn,
+            "job_id": None,
+            "job_start": None,
+            "busy_time": 0.0,
+            "started_at": time.perf_counter(),
+            "nb_jobs": 0,
+            "nb_restarts": nb_restarts,
+        }
+
+    def _respawn(self, i: int):
+        worker = self._workers[i]
+        logging.warning(
+            f"[playwright_plus] worker {worker['process'].pid} stopped with exit code {worker['process'].exitcode}, respawning it"
+        )
+        worker["conn"].close()
+        self._workers[i] = self._spawn(worker["nb_restarts"] + 1)
+
+    def _send(self, i: int) -> bool:
+        """Send the next pending job to the idle worker `i`, telling if it got it."""
+        worker = self._workers[i]
+        job_id = self._pending.popleft()
+        func_name, kwargs = self._jobs[job_id]
+        try:
+            worker["conn"].send((job_id, func_name, kwargs))
+        except (BrokenPipeError, EOFError, OSError):
+            self._pending.appendleft(job_id)
+            return False
+        worker["job_id"] = job_id
+        worker["job_start"] = time.perf_counter()
+        return True
+
+    def _dispatch(self):
+        for i in range(len(self._workers)):
+            if not self._pending:
+                break
+            if self._workers[i]["job_id"] is not None:
+                continue
+            if not self._workers[i]["process"].is_alive():
+                # the worker died while idle
+                self._respawn(i)
+            if self._send(i):
+                continue
+            # the worker died since: the job goes to a new worker
+            self._workers[i]["process"].join(timeout=1)
+            self._respawn(i)
+            if not self._send(i):
+                # the new worker died at once too: fail the job, do not retry forever
+                job_id = self._pending.popleft()
+                del self._jobs[job_id]
+                result = PlaywrightWorkerError(
+                    message="No worker process could be started to run the job."
+                ).get_response()
+                self._done.append((job_id, result))
+
+    def _pump(self, timeout: float = None):
+        """Dispatch the pending jobs and collect the results or crashes of the workers."""
+        self._dispatch()
+        busy = [w for w in self._workers if w["job_id"] is not None]
+        if not busy:
+            # every job was sent or failed by the dispatch: nothing to wait for
+            return
+
+        ready = wait(
+            [w["conn"] for w in busy] + [w["process"].sentinel for w in busy],
+            timeout=timeout,
+        )
+        for i, worker in enumerate(self._workers):
+            if worker["job_id"] is None:
+                continue
+            if worker["conn"] in ready:
+                try:
+                    job_id, result, duration = worker["conn"].recv()
+                except (EOFError, OSError):
+                    # the worker died while sending, handled with its sentinel below
+                    pass
+                else:
+                    self._finish(worker, job_id, result, duration)
+                    continue
+            if worker["process"].sentinel in ready or not worker["process"].is_alive():
+                result = PlaywrightWorkerError(
+                    message=f"The worker process running the job stopped with exit code {worker['process'].exitcode}."
+                ).get_response()
+                self._finish(
+                    worker,
+                    worker["job_id"],
+                    result,
+                    time.perf_counter() - worker["job_start"],
+                )
+                self._respawn(i)
+        self._dispatch()
+
+    def _finish(self, worker: dict, job_id: int, result: dict, duration: float):
+        worker["job_id"] = None
+        worker["job_start"] = None
+        worker["busy_time"] += duration
+        worker["nb_jobs"] += 1
+        del self._jobs[job_id]
+        self._done.append((job_id, result))
+
+    def submit(self, func_name: str, **kwargs) -> int:
+        """Queue a job, waiting for room in the queue if it is full.
+
+        Args:
+            func_name (str): Name of the function to run ("intercept_json_playwright" or "request_json_playwright").
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            int: The id of the job, given back with its result.
+        """
+        if func_name not in WORKER_FUNCTIONS:
+            raise ValueError(
+                f"`{func_name}` is not one of {', '.join(WORKER_FUNCTIONS)}."
+            )
+        # back-pressure: wait for the workers to take jobs before queueing more
+        while len(self._pending) >= self.max_pending:
+            self._pump()
+
+        job_id = next(self._job_ids)
+        self._jobs[job_id] = (func_name, kwargs)
+        self._pending.append(job_id)
+        self._dispatch()
+        return job_id
+
+    def as_completed(self, timeout: float = None):
+        """Yield the job ids and results of the submitted jobs, in completion order.
+
+        Args:
+            timeout (float, optional): Maximum time in seconds to wait for a result (default None, no limit).
+
+        Yields:
+            tuple: The job id and its result.
+        """
+        while self._done or self._jobs:
+            if not self._done:
+                self._pump(timeout)
+                if not self._done and timeout is not None:
+                    raise TimeoutError(f"No job finished in {timeout} seconds.")
+            while self._done:
+                yield self._done.popleft()
+
+    def map(self, func_name: str, jobs):
+        """Run a function over many jobs and yield the results, in completion order.
+
+        Args:
+            func_name (str): Name of the function to run ("intercept_json_playwright" or "request_json_playwright").
+            jobs (iterable): Dicts of keyword arguments of the function, one per job.
+
+        Yields:
+            tuple: The job and its result. The results of the jobs submitted apart are left to `as_completed`.
+        """
+        submitted = {}
+        for job in jobs:
+            submitted[self.submit(func_name, **job)] = job
+            for job_id, result in self._pop_done(submitted):
+                yield submitted.pop(job_id), result
+
+        while submitted:
+            self._pump()
+            for job_id, result in self._pop_done(submitted):
+                yield submitted.pop(job_id), result
+
+    def _pop_done(self, job_ids) -> list:
+        """Take the results of the given jobs, leaving the others to `as_completed`."""
+        done = [item for item in self._done if item[0] in job_ids]
+        self._done = deque(item for item in self._done if item[0] not in job_ids)
+        return done
+
+    def stats(self) -> dict:
+        """Return the queue depth and the utilization of each worker.
+
+        Returns:
+            dict: The number of pending and running jobs and, for each worker, its pid, number of jobs, restarts and share of time spent running jobs.
+        """
+        now = time.perf_counter()
+        workers = []
+        for worker in self._workers:
+            busy_time = worker["busy_time"]
+            if worker["job_start"] is not None:
+                busy_time += now - worker["job_start"]
+            workers.append(
+                {
+                    "pid": worker["process"].pid,
+                    "busy": worker["job_id"] is not None,
+                    "nb_jobs": worker["nb_jobs"],
+                    "nb_restarts": worker["nb_restarts"],
+                    "utilization": busy_time / max(now - worker["started_at"], 1e-9),
+                }
+            )
+        return {
+            "queue_depth": len(self._pending),
+            "running": sum(w["busy"] for w in workers),
+            "workers": workers,
+        }
+
+    def close(self):
+        """Stop the workers, after their current job."""
+        for worker in self._workers:
+            try:
+                worker["conn"].send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self._workers:
+            worker["process"].join(timeout=10)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+            worker["conn"].close()
+        self._workers = []
@@ -16,9 +16,10 @@ setuptools.setup(
     },
     packages=[
         'playwright_plus',
+        'playwright_plus.aio',
         'playwright_plus.utils',
     ],
     install_requires=[
-        'playwright==1.25.2 ',
+        'playwright>=1.38.0',
     ],
 )